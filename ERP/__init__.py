@@ -1,5 +1,8 @@
 # coding=utf-8
 
-import pymysql
-pymysql.install_as_MySQLdb()
-
+try:
+    import pymysql
+except ImportError:  # 只在使用 MySQL 时需要
+    pymysql = None
+else:
+    pymysql.install_as_MySQLdb()
@@ -13,4 +13,6 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ERP.settings")
 
+# 看板实时刷新接口 /api/live/ 是异步视图返回的 Server-Sent Events 长连接，在 ASGI 下只占用事件循环中的一个协程，
+# 生产环境请用 ASGI 服务器运行本应用，例如：uvicorn ERP.asgi:application --workers 2
 application = get_asgi_application()
@@ -43,8 +43,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # 放在最前面，统计整个请求（含其他中间件）的查询与耗时
+    "ErpSim.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    # 会话中选择查看的比赛
+    "ErpSim.middleware.GameScopeMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -75,22 +79,76 @@ WSGI_APPLICATION = "ERP.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# 由环境变量选择数据库：默认使用项目目录下的 SQLite 文件，比赛现场的笔记本上无需数据库服务；
+# ERPSIM_DB_ENGINE=mysql 时连接 MySQL，连接参数取 ERPSIM_DB_NAME/USER/PASSWORD/HOST/PORT。
+
+# WAL 模式下读取不阻塞导入写入；synchronous=NORMAL 在 WAL 下不会损坏数据库，只是断电时可能丢失最后提交的事务；
+# 页缓存 64MB、临时表放内存、读取走内存映射，加快看板的分组聚合
+SQLITE_PRAGMAS = ';'.join([
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',
+])
+
+DB_ENGINE = os.environ.get('ERPSIM_DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'mysql':
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.mysql",
+            "NAME": os.environ.get('ERPSIM_DB_NAME', 'erp_analysis'),
+            "USER": os.environ.get('ERPSIM_DB_USER', 'root'),
+            "PASSWORD": os.environ.get('ERPSIM_DB_PASSWORD', ''),
+            "HOST": os.environ.get('ERPSIM_DB_HOST', '127.0.0.1'),
+            "PORT": os.environ.get('ERPSIM_DB_PORT', '3306'),
+            "OPTIONS": {
+                "init_command": "SET sql_mode='STRICT_TRANS_TABLES'",
+                "charset": "utf8mb4"
+            }
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get('ERPSIM_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+            "OPTIONS": {
+                # 写事务开始时即取得写锁，并发写入在 timeout 秒内排队等待，而不是在提交时报 database is locked
+                "transaction_mode": "IMMEDIATE",
+                "timeout": 20,
+                "init_command": SQLITE_PRAGMAS,
+            },
+        }
+    }
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# 看板计算结果缓存，文件缓存可在多个 worker 进程间共享且无需额外服务
 
-DATABASES = {
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.mysql",
-        "NAME": "erp_analysis",
-        "USER": "root",
-        "PASSWORD": "123456",
-        "HOST": "127.0.0.1",
-        "PORT": "3306",
-        "OPTIONS": {
-            "init_command": "SET sql_mode='STRICT_TRANS_TABLES'",
-            "charset": "utf8mb4"
-        }
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(BASE_DIR, 'cache'),
     }
 }
 
+# 看板缓存过期时间（秒），数据变化时通过版本号立即失效
+ERPSIM_CACHE_TIMEOUT = 3600
+
+# 后台用户的响应附带 Server-Timing 头（查询数、SQL 耗时、各看板区块耗时）
+ERPSIM_SERVER_TIMING = True
+# 在看板页面底部显示可折叠的请求耗时面板
+ERPSIM_TIMING_PANEL = DEBUG
+
+# 看板中较重的分组聚合的执行后端：'django'（经 ORM 在上面的数据库中执行）或 'duckdb'（需要 pip install duckdb）
+ERPSIM_ANALYTICS_BACKEND = os.environ.get('ERPSIM_ANALYTICS_BACKEND', 'django')
+# DuckDB 读取的数据：'parquet' 为按数据版本导出的 Parquet 快照，'sqlite' 为直接挂载上面的 SQLite 数据库文件
+# （需要 DuckDB 的 sqlite 扩展，离线环境请预先执行 INSTALL sqlite）
+ERPSIM_DUCKDB_SOURCE = os.environ.get('ERPSIM_DUCKDB_SOURCE', 'parquet')
+ERPSIM_PARQUET_DIR = os.environ.get('ERPSIM_PARQUET_DIR', os.path.join(BASE_DIR, 'cache', 'parquet'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
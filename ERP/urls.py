@@ -15,7 +15,7 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, re_path
+from django.urls import include, path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import RedirectView
@@ -25,6 +25,7 @@ from django.views.generic import RedirectView
 urlpatterns = [
 
     path('admin/', admin.site.urls),
+    path('api/', include('ErpSim.urls')),  # 看板图表的 JSON 接口
    
     re_path(r'^$', RedirectView.as_view(url='/admin/', permanent=False)),  # 首页重定向到admin
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,15 +1,43 @@
 from django.contrib import admin
 from import_export import resources, fields
 from import_export.admin import ImportExportModelAdmin
-from .models import MarketSalesData, GroupSalesData
-from datetime import datetime, date, timedelta
-from django.db.models import Sum, F, Max
-from django.utils.html import format_html
-import json
-from collections import defaultdict
+from .models import (
+    MarketSalesData, GroupSalesData, Game, InventoryData, Material, MaterialCost, ProductionOrder, RoundCalendar,
+)
+from .analytics.cache import cached_section, get_data_version
+from .analytics.forecast import refit_forecasts
+from .analytics.games import SESSION_GAME_KEY, active_game_id, game_rows, import_game_id
+from .analytics.inventory import days_of_cover, production_summary
+from .analytics.live import live_state
+from .analytics.group_chart import group_charts
+from .analytics.market import product_list
+from .analytics.pricing import price_recommendations
+from .analytics.profit import current_costs, save_costs
+from .analytics.rounds import get_calendar
+from .analytics.service import compute_sections, market_sections
+from .analytics.summary import refresh_market_summary
+from .importers import bulk_import, GROUP_SPEC, INVENT_SPEC, MARKET_SPEC, PRODUCTION_SPEC
+from .purge import purge
+from django import forms
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
+
+class GameScopedResource(resources.ModelResource):
+    """
+    逐行导入只在导入目标比赛内按 import_id_fields 查找已有记录，新记录由 pre_save 信号归入同一场比赛。
+
+    不按会话所查看的比赛查找，否则会改写所查看比赛的行，而新增行与汇总刷新落在导入目标比赛。
+    """
+
+    def get_queryset(self):
+        return game_rows(self._meta.model, import_game_id())
 
 # 导入数据资源
-class MarketData(resources.ModelResource):
+class MarketData(GameScopedResource):
     date = fields.Field(attribute='date', column_name='Date')
     material_description = fields.Field(attribute='material_description', column_name='Material Description')
     area = fields.Field(attribute='area', column_name='Area')
@@ -21,194 +49,165 @@ class MarketData(resources.ModelResource):
         # 假设日期格式为 MM/DD
         if 'Date' in row and row['Date']:
             try:
-                # 自动补全年份为今年
-                row['Date'] = datetime.now().strftime('%Y') + '-' + row['Date'].replace('/', '-')
-                # 如果你想强制2024年，可以写成：
-                # row['Date'] = '2024-' + row['Date'].replace('/', '-')
+                # 补全年份：比赛日历设置了年份时用该年份，否则为今年
+                row['Date'] = f"{self.calendar.import_year()}-" + row['Date'].replace('/', '-')
             except Exception:
                 pass
 
+    def before_import(self, dataset, **kwargs):
+        # 记录本次导入涉及的日期，导入完成后增量刷新汇总表
+        self.touched_dates = set()
+        self.calendar = get_calendar()
+
+    def before_save_instance(self, instance, row, **kwargs):
+        # 按比赛日历写入轮次与游戏日，看板按 (物料, 轮次, 天) 直接分组/关联
+        instance.round, instance.game_day = self.calendar.round_day(instance.date)
+
+    def after_save_instance(self, instance, row, **kwargs):
+        self.touched_dates.add(instance.date)
+
+    def after_import(self, dataset, result, **kwargs):
+        super().after_import(dataset, result, **kwargs)
+        if not kwargs.get('dry_run') and not result.has_errors():
+            refresh_market_summary(self.touched_dates, game=import_game_id())
+
     class Meta:
         model = MarketSalesData
         import_id_fields = ('date', 'material_description', 'area')
         fields = ('date', 'material_description', 'area', 'qty', 'value', 'price')
 
+class BulkImportForm(forms.Form):
+    import_file = forms.FileField(label="Excel 文件（.xlsx）")
+
+
+def live_context():
+    """页面渲染时的数据版本、比赛与最新日期，作为看板实时刷新（/api/live/）的起点；版本号先于各区块读取"""
+    version = get_data_version()
+    game, cursor = cached_section('live_state', live_state)
+    return {'version': version, 'game': game, 'cursor': cursor}
+
+
+class GameScopedAdminMixin:
+    """列表、导出与批量操作只涉及所查看比赛的数据"""
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(game_id=active_game_id())
+
+
+class BulkImportMixin:
+    """在后台增加“快速导入”页面：流式读取 Excel 后分批写入，适合大文件"""
+    bulk_import_spec = None
+
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+        return [
+            path('bulk-import/', self.admin_site.admin_view(self.bulk_import_view), name='%s_%s_bulk_import' % info),
+        ] + super().get_urls()
+
+    def bulk_import_view(self, request):
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+        form = BulkImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            try:
+                stats = bulk_import(form.cleaned_data['import_file'], self.bulk_import_spec)
+            except Exception as e:
+                self.message_user(request, f"快速导入失败：{e}", level='ERROR')
+            else:
+                self.message_user(
+                    request,
+                    f"快速导入完成：读取 {stats['rows']} 行，新增 {stats['created']}，更新 {stats['updated']}，"
+                    f"跳过重复 {stats['skipped']}，无效 {stats['invalid']}，耗时 {stats['seconds']} 秒",
+                )
+                return redirect('admin:%s_%s_changelist' % (self.opts.app_label, self.opts.model_name))
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.opts,
+            form=form,
+            title=f"快速导入{self.opts.verbose_name}",
+        )
+        return TemplateResponse(request, 'admin/bulk_import.html', context)
+
+
 @admin.register(MarketSalesData)
-class MarketSalesDataAdmin(ImportExportModelAdmin):
+class MarketSalesDataAdmin(GameScopedAdminMixin, BulkImportMixin, ImportExportModelAdmin):
     resource_class = MarketData
+    bulk_import_spec = MARKET_SPEC
     list_display = ['date', 'material_description', 'area', 'qty', 'value', 'price']
-    actions = ['delete_all_records']
+    actions = ['delete_all_records', 'update_forecasts']
     change_list_template = "admin/market_change_list.html"  # 使用独立模板，避免覆盖默认模板
 
-    @admin.action(description='一键删除所有市场销售数据')
+    @admin.action(description='一键删除当前比赛的所有市场销售数据')
     def delete_all_records(self, request, queryset):
-        self.model.objects.all().delete()
-        self.message_user(request, "所有市场销售数据已被删除！", level='WARNING')
+        # 汇总行与需求预测在同一事务内一并删除
+        count = purge(self.model)
+        self.message_user(request, f"当前比赛的所有市场销售数据（{count} 条）已被删除！", level='WARNING')
 
-    def changelist_view(self, request, extra_context=None):
-        # 轮次与时间区间定义
-        round_ranges = [
-            (1, '01-05', '01-20'),
-            (2, '02-05', '02-20'),
-            (3, '03-05', '03-20'),
-            (4, '04-05', '04-20'),
-        ]
-        round_data = {}
-        for round_num, start_day, end_day in round_ranges:
-            # 构造日期范围
-            year = datetime.now().year
-            start_date = f"{year}-{start_day}"
-            end_date = f"{year}-{end_day}"
-            # 查询该轮数据
-            qs = MarketSalesData.objects.filter(date__gte=start_date, date__lte=end_date)
-            agg = (
-                qs.values('material_description')
-                .annotate(qty_sum=Sum('qty'))
-                .order_by('-qty_sum')
-            )
-            chart_data = [
-                {'name': d['material_description'], 'qty': d['qty_sum']}
-                for d in agg
-            ]
-            round_data[str(round_num)] = chart_data
+    @admin.action(description='更新需求预测（只处理新增日期）')
+    def update_forecasts(self, request, queryset):
+        stats = refit_forecasts()
+        self.message_user(
+            request,
+            f"需求预测已更新：重新拟合 {stats['fitted']}，增量更新 {stats['incremental']}，"
+            f"无变化 {stats['unchanged']}，耗时 {stats['seconds']} 秒",
+        )
+
+    # 后台单条编辑/删除后同步刷新汇总表
+    def save_model(self, request, obj, form, change):
+        old_date = form.initial.get('date') if change else None
+        obj.round, obj.game_day = get_calendar().round_day(obj.date)
+        super().save_model(request, obj, form, change)
+        refresh_market_summary([obj.date, old_date], game=obj.game_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_market_summary([obj.date], game=obj.game_id)
+
+    def delete_queryset(self, request, queryset):
+        dates = set(queryset.values_list('date', flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_market_summary(dates, game=active_game_id())
 
+    def changelist_view(self, request, extra_context=None):
         # ========== 利润排行逻辑 ===========
-        # 获取所有产品
-        all_products = MarketSalesData.objects.values('material_description').distinct()
-        # 获取页面传入的成本价
-        cost_dict = {}
+        # 页面提交的成本价存入成本价表（全队共用），保存时重算利润排行，之后重定向回列表页
         if request.method == 'POST' and 'cost_update' in request.POST:
-            for p in all_products:
-                mat = p['material_description']
+            cost_dict = {}
+            for mat, _ in cached_section('market_products', product_list):
                 cost_val = request.POST.get(f'cost_{mat}', '')
                 try:
                     cost_dict[mat] = float(cost_val)
                 except:
                     cost_dict[mat] = 0.0
-            request.session['market_cost_dict'] = cost_dict
-        else:
-            cost_dict = request.session.get('market_cost_dict', {})
-        # 统计qty之和
-        qty_agg = MarketSalesData.objects.values('material_description').annotate(qty_sum=Sum('qty'))
-        qty_map = {d['material_description']: d['qty_sum'] for d in qty_agg}
-        # 统计每个产品最新一天的最高市场价
-        price_map = {}
-        for p in all_products:
-            mat = p['material_description']
-            # 找到该产品的最新一天
-            last = MarketSalesData.objects.filter(material_description=mat).order_by('-date').first()
-            if last:
-                # 取最新一天所有该产品的最高价
-                max_price = MarketSalesData.objects.filter(material_description=mat, date=last.date).aggregate(maxp=Max('price'))['maxp']
-                price_map[mat] = max_price
-            else:
-                price_map[mat] = 0.0
-        # 计算单个利润
-        profit_list = []
-        for mat in qty_map:
-            qty = qty_map[mat]
-            price = price_map.get(mat, 0.0)
-            cost = cost_dict.get(mat, 0.0)
-            profit = price - cost
-            profit_list.append({'material_description': mat, 'qty': qty, 'profit': profit, 'cost': cost, 'price': price})
-        # 按qty排序（用于配色）
-        qty_sorted = sorted(profit_list, key=lambda x: x['qty'], reverse=True)
-        qty_rank_map = {x['material_description']: i+1 for i, x in enumerate(qty_sorted)}
-        # 按单个利润排序
-        profit_sorted = sorted(profit_list, key=lambda x: x['profit'], reverse=True)
-        for i, item in enumerate(profit_sorted):
-            item['rank'] = i+1
-            item['qty_rank'] = qty_rank_map[item['material_description']]
-
-        # ========== 分地区偏好排行逻辑 ===========
-        # 统计每个产品各地区qty总和
-        region_agg = MarketSalesData.objects.values('material_description', 'area').annotate(qty_sum=Sum('qty'))
-        # 构建产品-地区-qty字典
-        region_map = {}
-        for row in region_agg:
-            mat = row['material_description']
-            area = row['area'].strip().lower()
-            qty = row['qty_sum']
-            if mat not in region_map:
-                region_map[mat] = {'north': 0, 'south': 0, 'west': 0}
-            if area == 'north':
-                region_map[mat]['north'] += qty
-            elif area == 'south':
-                region_map[mat]['south'] += qty
-            elif area == 'west':
-                region_map[mat]['west'] += qty
-        # 总体偏好排序（按qty总和降序）
-        total_qty_map = {mat: sum(vals.values()) for mat, vals in region_map.items()}
-        sorted_mats = sorted(total_qty_map.items(), key=lambda x: x[1], reverse=True)
-        region_list = []
-        for idx, (mat, total_qty) in enumerate(sorted_mats):
-            north = region_map[mat]['north']
-            south = region_map[mat]['south']
-            west = region_map[mat]['west']
-            # 计算比例
-            total = north + south + west
-            if total > 0:
-                n_ratio = north / total
-                s_ratio = south / total
-                w_ratio = west / total
-                # 比例化为1.x格式
-                n_show = round(n_ratio * 4, 1)
-                s_show = round(s_ratio * 4, 1)
-                w_show = round(w_ratio * 4, 1)
-                ratio_str = f"{n_show} : {s_show} : {w_show}"
-            else:
-                n_ratio = s_ratio = w_ratio = 1/3
-                ratio_str = "0 : 0 : 0"
-            # 应分配库存逻辑
-            if idx < 4:
-                max_stock = 12000
-            elif idx < 7:
-                max_stock = 10000
-            elif idx < 10:
-                max_stock = 8000
-            else:
-                max_stock = 0
-            # 找到最大值归属地区
-            ratios = [n_ratio, s_ratio, w_ratio]
-            max_idx = ratios.index(max(ratios))
-            stock = [0, 0, 0]
-            if max_stock > 0:
-                stock[max_idx] = max_stock
-                # 其余两个地区按比例分配
-                other_idxs = [i for i in range(3) if i != max_idx]
-                # 计算剩余比例
-                remain = 1 - ratios[max_idx]
-                if remain > 0:
-                    stock[other_idxs[0]] = int(round(max_stock * ratios[other_idxs[0]] / ratios[max_idx]))
-                    stock[other_idxs[1]] = int(round(max_stock * ratios[other_idxs[1]] / ratios[max_idx]))
-                else:
-                    stock[other_idxs[0]] = 0
-                    stock[other_idxs[1]] = 0
-            stock_str = f"{stock[0]} : {stock[1]} : {stock[2]}"
-            region_list.append({
-                'rank': idx+1,
-                'material_description': mat,
-                'north': north,
-                'south': south,
-                'west': west,
-                'ratio': ratio_str,
-                'stock': stock_str
-            })
+            count = save_costs(cost_dict)
+            self.message_user(request, f"成本价已保存（{count} 项有变化），利润排行已更新")
+            return redirect(request.get_full_path())
+        # 各区块结果按数据版本缓存，分页/筛选等重复请求直接读缓存；轮次图表数据由前端从接口按需加载
+        live = live_context()
+        cost_dict = cached_section('material_costs', current_costs)
+        # 产品列表、利润排行、分地区偏好排行与需求预测相互独立，并发计算
+        sections = compute_sections(market_sections())
+        products = sections['market_products']
+        all_prod_list = [mat for mat, _ in products]
+        profit_sorted = sections['market_profit']
+        region_areas, region_list = sections['market_region_allocation']
 
         extra_context = extra_context or {}
-        extra_context['round_chart_data'] = json.dumps(round_data, ensure_ascii=False)
         extra_context['profit_sorted'] = profit_sorted
-        all_prod_list = [p['material_description'] for p in all_products]
         extra_context['all_products'] = all_prod_list
-        # 拆分为1kg与500g两组，便于模板渲染两列
-        extra_context['all_products_1kg'] = [m for m in all_prod_list if '1kg' in str(m).lower()]
-        extra_context['all_products_500g'] = [m for m in all_prod_list if '500g' in str(m).lower()]
+        # 按物料维表的包装规格拆分为1kg与500g两组，便于模板渲染两列
+        extra_context['all_products_1kg'] = [mat for mat, size in products if size == '1kg']
+        extra_context['all_products_500g'] = [mat for mat, size in products if size == '500g']
         extra_context['cost_dict'] = cost_dict
         extra_context['region_list'] = region_list
+        extra_context['region_areas'] = region_areas
+        extra_context['forecast_rows'] = sections['market_forecast']
+        extra_context['round_labels'] = get_calendar().labels()
+        extra_context['live_state'] = live
         return super().changelist_view(request, extra_context=extra_context)
 
 # 组数据资源
-class GroupSalesDataResource(resources.ModelResource):
+class GroupSalesDataResource(GameScopedResource):
     round = fields.Field(attribute='round', column_name='Round')
     day = fields.Field(attribute='day', column_name='Day')
     area = fields.Field(attribute='area', column_name='Area')
@@ -233,8 +232,9 @@ class GroupSalesDataResource(resources.ModelResource):
         )
 
 @admin.register(GroupSalesData)
-class GroupSalesDataAdmin(ImportExportModelAdmin):
+class GroupSalesDataAdmin(GameScopedAdminMixin, BulkImportMixin, ImportExportModelAdmin):
     resource_class = GroupSalesDataResource
+    bulk_import_spec = GROUP_SPEC
     list_display = [
         'round', 'day', 'area', 'sloc', 'distribution_channel',
         'material', 'material_description', 'price', 'qty', 'value', 'cost'
@@ -242,187 +242,148 @@ class GroupSalesDataAdmin(ImportExportModelAdmin):
     actions = ['delete_all_records']
     change_list_template = "admin/group_change_list.html"  # 指定自定义模板
 
-    @admin.action(description='一键删除所有小组销售数据')
+    @admin.action(description='一键删除当前比赛的所有小组销售数据')
     def delete_all_records(self, request, queryset):
-        self.model.objects.all().delete()
-        self.message_user(request, "所有小组销售数据已被删除！", level='WARNING')
+        count = purge(self.model)
+        self.message_user(request, f"当前比赛的所有小组销售数据（{count} 条）已被删除！", level='WARNING')
 
     def changelist_view(self, request, extra_context=None):
-        # 1. 定义轮次和日期区间
-        round_ranges = {
-            1: ('01-05', '01-20'),
-            2: ('02-05', '02-20'),
-            3: ('03-05', '03-20'),
-            4: ('04-05', '04-20'),
-        }
-        # 轮次->所有天
-        round_days = {}
-        for r, (start, end) in round_ranges.items():
-            start_date = date(2025, int(start.split('-')[0]), int(start.split('-')[1]))
-            end_date = date(2025, int(end.split('-')[0]), int(end.split('-')[1]))
-            days = []
-            d = start_date
-            while d <= end_date:
-                days.append(d)
-                d += timedelta(days=1)
-            round_days[r] = days
-
-        # 2. 获取所有material description（大包装/小包装）
-        all_market = MarketSalesData.objects.all().values('material_description')
-        all_group = GroupSalesData.objects.all().values('material_description')
-        all_mats = set([x['material_description'] for x in all_market] + [x['material_description'] for x in all_group])
-        mats_1kg = [m for m in all_mats if '1kg' in m]
-        mats_500g = [m for m in all_mats if '500g' in m]
-
-        # 3. 市场数据补全区间
-        market_data = MarketSalesData.objects.all().values('material_description', 'date', 'price')
-        market_dict = defaultdict(lambda: defaultdict(list))  # mat -> date -> [price]
-        for row in market_data:
-            market_dict[row['material_description']][str(row['date'])].append(row['price'])
-
-        print('market_dict', dict(market_dict))
-
-        # 4. 小组数据
-        group_data = GroupSalesData.objects.all().values('material_description', 'round', 'day', 'price')
-        group_dict = defaultdict(lambda: defaultdict(dict))  # mat -> round -> day -> price
-        for row in group_data:
-            mat = row['material_description']
-            r = int(row['round'])
-            d = int(row['day'])
-            group_dict[mat][r][d] = row['price']
-
-        # 5. 构造前端需要的数据结构
-        def build_chart_data(mats, round_days, market_data_list):
-            # 自动获取实际年份
-            all_years = set()
-            for row in market_data_list:
-                y = str(row['date'])[:4]
-                all_years.add(y)
-            if all_years:
-                use_year = sorted(all_years)[-1]  # 取最大年份
-            else:
-                use_year = str(datetime.now().year)
-
-            # 定义每轮的区间分组（严格按你的要求）
-            group_ranges = [
-                (1, [(1,5,5),(6,10,10),(11,15,15),(16,20,20)]),
-                (2, [(5,10,10),(11,15,15),(16,20,20)]),
-                (3, [(5,10,10),(11,15,15),(16,20,20)]),
-                (4, [(5,10,10),(11,15,15),(16,20,20)])
-            ]
-            round_group = {r:grps for r,grps in group_ranges}
-
-            result = {}
-            for r, days in round_days.items():
-                result[r] = {}
-                for mat in mats:
-                    mat_market = market_dict[mat]
-                    # 构造区间映射
-                    day_to_market = {}
-                    grps = round_group[r]
-                    for start, end, ref_day in grps:
-                        # 取区间指定ref_day的市场价
-                        ref_date = date(2025, r, ref_day)
-                        ref_date_str = f"{use_year}-{r:02d}-{ref_day:02d}"
-                        prices = mat_market.get(ref_date_str, [])
-                        if prices:
-                            max_price = max(prices)
-                            min_price = min(prices)
-                        else:
-                            max_price = None
-                            min_price = None
-                        for d in days:
-                            if start <= d.day <= end:
-                                day_to_market[d] = {'max': max_price, 'min': min_price}
-                    # 小组价格
-                    group_prices = group_dict[mat][r] if mat in group_dict and r in group_dict[mat] else {}
-                    # 组装x轴和y轴
-                    x_list = []
-                    market_max = []
-                    market_min = []
-                    group_price = []
-                    for d in days:
-                        x = f"{r}-{d.day:02d}"
-                        x_list.append(x)
-                        market_price_data = day_to_market.get(d, {'max': None, 'min': None})
-                        max_val = market_price_data['max'] if market_price_data['max'] is not None else None
-                        min_val = market_price_data['min'] if market_price_data['min'] is not None else None
-                        group_val = group_prices.get(d.day, None) if group_prices.get(d.day, None) is not None else None
-                        market_max.append(max_val)
-                        market_min.append(min_val)
-                        group_price.append(group_val)
-                    result[r][mat] = {
-                        'x': x_list,
-                        'market_max': market_max,
-                        'market_min': market_min,
-                        'group_price': group_price,
-                    }
-            return result
-
-        chart_1kg = build_chart_data(mats_1kg, round_days, market_data)
-        chart_500g = build_chart_data(mats_500g, round_days, market_data)
+        # 页面只带产品列表，选中轮次与产品的价格序列由前端从接口按需加载
+        live = live_context()
+        _, _, mats_1kg, mats_500g = cached_section('group_chart_series', group_charts)
+        extra_context = extra_context or {}
+        extra_context['live_state'] = live
+        extra_context['group_materials'] = {'1kg': mats_1kg, '500g': mats_500g}
+        extra_context['round_labels'] = get_calendar().labels()
+        # 定价建议使用全队共用的当前成本价
+        extra_context['price_rows'] = price_recommendations()
+        return super().changelist_view(request, extra_context=extra_context)
 
+# 库存数据资源
+class InventoryDataResource(GameScopedResource):
+    storage_location = fields.Field(attribute='storage_location', column_name='Storage Location')
+    material = fields.Field(attribute='material', column_name='Material')
+    material_description = fields.Field(attribute='material_description', column_name='Material Description')
+    stock = fields.Field(attribute='stock', column_name='Stock')
+    reserved = fields.Field(attribute='reserved', column_name='Reserved')
+    unit = fields.Field(attribute='unit', column_name='Base Unit of Measure')
+
+    class Meta:
+        model = InventoryData
+        import_id_fields = ('storage_location', 'material')
+        fields = ('storage_location', 'material', 'material_description', 'stock', 'reserved', 'unit')
+
+@admin.register(InventoryData)
+class InventoryDataAdmin(GameScopedAdminMixin, BulkImportMixin, ImportExportModelAdmin):
+    resource_class = InventoryDataResource
+    bulk_import_spec = INVENT_SPEC
+    list_display = ['storage_location', 'material', 'material_description', 'stock', 'reserved', 'unit']
+    list_filter = ['storage_location']
+    actions = ['delete_all_records']
+    change_list_template = "admin/inventory_change_list.html"
+
+    @admin.action(description='一键删除当前比赛的所有库存数据')
+    def delete_all_records(self, request, queryset):
+        count = purge(self.model)
+        self.message_user(request, f"当前比赛的所有库存数据（{count} 条）已被删除！", level='WARNING')
+
+    def changelist_view(self, request, extra_context=None):
         extra_context = extra_context or {}
-        extra_context['chart_1kg'] = json.dumps(chart_1kg or {}, ensure_ascii=False)
-        extra_context['chart_500g'] = json.dumps(chart_500g or {}, ensure_ascii=False)
-        extra_context['mats_1kg'] = json.dumps(mats_1kg or [], ensure_ascii=False)
-        extra_context['mats_500g'] = json.dumps(mats_500g or [], ensure_ascii=False)
+        extra_context['cover_rows'] = cached_section('inventory_cover', days_of_cover)
         return super().changelist_view(request, extra_context=extra_context)
+
+# 生产订单数据资源
+class ProductionOrderResource(GameScopedResource):
+    order = fields.Field(attribute='order', column_name='Order')
+    material_description = fields.Field(attribute='material_description', column_name='Material Description')
+    start = fields.Field(attribute='start', column_name='Start')
+    finish = fields.Field(attribute='finish', column_name='Finish')
+    setup = fields.Field(attribute='setup', column_name='Setup')
+    released = fields.Field(attribute='released', column_name='Released')
+    target = fields.Field(attribute='target', column_name='Target')
+    confirmed = fields.Field(attribute='confirmed', column_name='Confirmed')
+    unit_cost = fields.Field(attribute='unit_cost', column_name='Unit Cost')
+
+    def before_import(self, dataset, **kwargs):
+        # 日历只在导入开始时读取一次
+        self.year = get_calendar().import_year()
+
+    def before_import_row(self, row, **kwargs):
+        # 日期格式同市场数据为 MM/DD，按比赛日历补全年份
+        year = self.year
+        for column in ('Start', 'Finish', 'Released'):
+            if row.get(column):
+                row[column] = f"{year}-" + str(row[column]).replace('/', '-')
+
+    class Meta:
+        model = ProductionOrder
+        import_id_fields = ('order',)
+        fields = ('order', 'material_description', 'start', 'finish', 'setup', 'released', 'target', 'confirmed', 'unit_cost')
+
+@admin.register(ProductionOrder)
+class ProductionOrderAdmin(GameScopedAdminMixin, BulkImportMixin, ImportExportModelAdmin):
+    resource_class = ProductionOrderResource
+    bulk_import_spec = PRODUCTION_SPEC
+    list_display = ['order', 'material_description', 'start', 'finish', 'setup', 'released', 'target', 'confirmed', 'unit_cost']
+    actions = ['delete_all_records']
+    change_list_template = "admin/production_change_list.html"
+
+    @admin.action(description='一键删除当前比赛的所有生产订单数据')
+    def delete_all_records(self, request, queryset):
+        count = purge(self.model)
+        self.message_user(request, f"当前比赛的所有生产订单数据（{count} 条）已被删除！", level='WARNING')
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        extra_context['production_rows'] = cached_section('production_summary', production_summary)
+        return super().changelist_view(request, extra_context=extra_context)
+
+@admin.register(MaterialCost)
+class MaterialCostAdmin(GameScopedAdminMixin, admin.ModelAdmin):
+    # 市场看板的成本价表单登记整轮有效的成本价；这里可批量修改或按生效日期登记轮次内的调整
+    list_display = ['product', 'round', 'effective_date', 'cost', 'updated_at']
+    list_editable = ['cost']
+    list_filter = ['round']
+    search_fields = ['product__description']
+    list_select_related = ['product']
+
+@admin.register(RoundCalendar)
+class RoundCalendarAdmin(admin.ModelAdmin):
+    list_display = ['name', 'year', 'rounds', 'first_day', 'last_day', 'report_interval', 'is_active']
+    list_editable = ['is_active']
+
+@admin.register(Game)
+class GameAdmin(admin.ModelAdmin):
+    list_display = ['name', 'team', 'created_at', 'is_active']
+    list_editable = ['is_active']
+
+    def get_urls(self):
+        return [
+            path('select/', self.admin_site.admin_view(require_POST(self.select_view)), name='ErpSim_game_select'),
+        ] + super().get_urls()
+
+    def select_view(self, request):
+        # 各看板页顶部的比赛选择框提交到这里，只切换本会话查看的比赛（不影响其他用户与导入目标），之后回到原页面
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        game = get_object_or_404(Game, pk=request.POST.get('game'))
+        request.session[SESSION_GAME_KEY] = game.pk
+        next_url = request.POST.get('next')
+        if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+            next_url = 'admin:index'
+        return redirect(next_url)
+
+@admin.register(Material)
+class MaterialAdmin(admin.ModelAdmin):
+    list_display = ['description', 'code', 'package_size', 'family']
+    list_filter = ['package_size']
+    search_fields = ['description', 'code']
+
+    def get_readonly_fields(self, request, obj=None):
+        # 物料描述是导入时关联维表的依据，登记后不可修改
+        return ['description'] if obj else []
+
 # 设置后台标题
 admin.site.site_header = "ERP比赛数据分析"
 admin.site.index_title = "ERP比赛数据分析"
 admin.site.site_title = "ERP比赛数据分析"
-
-def get_market_price_dict():
-    # 获取所有市场价格，按material_description和date分组
-    market_data = MarketSalesData.objects.filter(material_description__contains='1kg').values('material_description', 'date', 'price')
-    price_dict = defaultdict(dict)
-    for row in market_data:
-        price_dict[row['material_description']][str(row['date'])] = row['price']
-    return price_dict
-
-def get_group_price_points():
-    # 获取所有小组销售数据（1kg产品）
-    group_data = GroupSalesData.objects.filter(material_description__contains='1kg').values('material_description', 'round', 'day', 'price')
-    points = defaultdict(list)
-    for row in group_data:
-        # 构造x轴：2025-<round>-<day>
-        x = f"2025-{int(row['round']):02d}-{int(row['day']):02d}"
-        points[row['material_description']].append({'x': x, 'price': row['price']})
-    return points
-
-def get_market_price_for_group_dates(price_dict, group_points):
-    # 按你的规则补全市场价格
-    # 1月1-5日用1月5日，1月6-10日用1月10日，依此类推
-    # 先生成所有需要的日期
-    date_ranges = [
-        ('01-01', '01-05'),
-        ('01-06', '01-10'),
-        ('01-11', '01-15'),
-        ('01-16', '01-20'),
-        ('02-05', '02-20'),
-        ('03-05', '03-20'),
-        ('04-05', '04-20'),
-    ]
-    year = 2025
-    date_map = {}
-    for start, end in date_ranges:
-        start_date = date.fromisoformat(f"{year}-{start}")
-        end_date = date.fromisoformat(f"{year}-{end}")
-        # 用end_date的市场价补全区间
-        for i in range((end_date - start_date).days + 1):
-            d = start_date + timedelta(days=i)
-            date_map[str(d)] = str(end_date)
-    # 返回：{material_description: {group_x: market_price}}
-    market_for_group = defaultdict(dict)
-    for mat, points in group_points.items():
-        for p in points:
-            # p['x']格式为2025-01-03
-            market_date = date_map.get(p['x'])
-            if market_date:
-                market_for_group[mat][p['x']] = price_dict.get(mat, {}).get(market_date)
-            else:
-                market_for_group[mat][p['x']] = None
-    return market_for_group
-
-print(MarketSalesData.objects.filter(material_description='1kg Blueberry Muesli').values('date', 'price'))
\ No newline at end of file
@@ -0,0 +1 @@
+# 数据分析计算模块（与 admin 展示逻辑解耦）
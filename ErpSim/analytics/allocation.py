@@ -0,0 +1,142 @@
+import numpy as np
+
+# 分地区库存分配：产品 × 区域 的销量矩阵上一次性完成排序、比例与分配计算
+
+# 按总销量排名分档的应分配库存：前 4 名 12000，5-7 名 10000，8-10 名 8000，其余不分配
+STOCK_TIERS = ((4, 12000), (3, 10000), (3, 8000))
+# 已知区域的展示顺序，数据中出现的其他区域按名称排在后面
+AREA_ORDER = ('north', 'south', 'west')
+# 比例展示时乘的系数（三地区时 1.x 左右）
+RATIO_SCALE = 4
+
+
+def build_matrix(rows):
+    """
+    把 (物料, 区域, 销量) 聚合行转换为 产品 × 区域 矩阵。
+
+    区域名去空格并转小写后作为列；产品按首次出现的顺序排列。返回 (产品列表, 区域列表, 矩阵)。
+    """
+    rows = list(rows)
+    if not rows:
+        return [], list(AREA_ORDER), np.zeros((0, len(AREA_ORDER)))
+    # 区域名只对不同取值做一次规范化，再用整数编码定位矩阵单元
+    raw_areas = {r['area'] for r in rows}
+    normalized = {a: a.strip().lower() for a in raw_areas}
+    found = set(normalized.values())
+    areas = [a for a in AREA_ORDER if a in found] + sorted(found - set(AREA_ORDER))
+    area_code = {raw: areas.index(name) for raw, name in normalized.items()}
+    product_code = {}
+    cells = np.fromiter(
+        (product_code.setdefault(r['material_description'], len(product_code)) * len(areas) + area_code[r['area']]
+         for r in rows),
+        dtype=np.int64, count=len(rows),
+    )
+    weights = np.fromiter((r['qty_sum'] for r in rows), dtype=float, count=len(rows))
+    qty = np.bincount(cells, weights=weights, minlength=len(product_code) * len(areas))
+    return list(product_code), areas, qty.reshape(len(product_code), len(areas))
+
+
+def tier_limits(count, tiers=STOCK_TIERS):
+    """按名次给出每个产品的应分配库存上限，长度为 count"""
+    limits = np.zeros(count)
+    start = 0
+    for size, max_stock in tiers:
+        limits[start:start + size] = max_stock
+        start += size
+    return limits
+
+
+def allocate_stock(qty, tiers=STOCK_TIERS, weights=None):
+    """
+    在 产品 × 区域 销量矩阵上计算分配。
+
+    返回 (order, ratios, stock)：order 为按总销量降序的产品下标（同销量保持原顺序），
+    ratios 为各产品的区域比例（无销量时均分），stock 为按 order 排列的整数分配矩阵——
+    销量占比最高的区域分到本档上限，其余区域按与最高区域的比例折算。
+    weights 为可选的同形状矩阵（如需求预测），提供时排名仍按 qty，区域比例改按 weights 计算。
+    """
+    n_products, n_areas = qty.shape
+    order = np.argsort(-qty.sum(axis=1), kind='stable')
+    qty = (qty if weights is None else weights)[order]
+    total = qty.sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = np.where(total[:, None] > 0, qty / total[:, None], 1 / n_areas if n_areas else 0.0)
+    limits = tier_limits(n_products, tiers)
+    top = ratios.argmax(axis=1) if n_areas else np.zeros(n_products, dtype=int)
+    top_ratio = np.take_along_axis(ratios, top[:, None], axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stock = np.where(top_ratio > 0, np.rint(limits[:, None] * ratios / top_ratio), 0.0)
+    np.put_along_axis(stock, top[:, None], limits[:, None], axis=1)
+    return order, ratios, stock.astype(int)
+
+
+def region_numbers(rows, on_hand=None, forecast=None, tiers=STOCK_TIERS):
+    """
+    分地区偏好排行与应分配库存的数值结果，返回 (区域列表, 按排名排列的行)。
+
+    rows: (物料, 区域, 销量) 聚合行；on_hand: 可选的 {(物料, 小写区域名): 现有库存}，
+    提供时每行附带现有库存与需补货数量（应分配 - 现有，不小于 0）；
+    forecast: 可选的 {(物料, 小写区域名): 预测销量}，有预测的产品按预测的区域比例分配。
+    每行的 qty/ratio/stock/forecast/on_hand/replenish 为按区域排列的列表；ratio 为区域份额（合计为 1），
+    没有销量（或预测）时为 None，没有预测的产品 forecast 为 None，未提供 on_hand 时后两项为 None。
+    """
+    products, areas, qty = build_matrix(rows)
+    weights = None
+    if forecast:
+        predicted = np.array([[forecast.get((mat, area), np.nan) for area in areas] for mat in products])
+        has_forecast = ~np.isnan(predicted).all(axis=1, keepdims=True)
+        weights = np.where(has_forecast, np.nan_to_num(predicted), qty)
+    order, ratios, stock = allocate_stock(qty, tiers, weights)
+    qty = qty[order]
+    has_sales = ((qty if weights is None else weights[order]).sum(axis=1) > 0).tolist()
+    have = replenish = None
+    if on_hand is not None:
+        have = np.array(
+            [[int(on_hand.get((products[i], area), 0)) for area in areas] for i in order], dtype=int,
+        ).reshape(len(order), len(areas))
+        replenish = np.maximum(stock - have, 0).tolist()
+        have = have.tolist()
+
+    # 整块转换为 Python 列表后逐行组装
+    qty_rows, ratio_rows, stock_rows = qty.tolist(), ratios.tolist(), stock.tolist()
+    result = []
+    for rank, i in enumerate(order.tolist()):
+        result.append({
+            'rank': rank + 1,
+            'material_description': products[i],
+            'qty': qty_rows[rank],
+            'ratio': ratio_rows[rank] if has_sales[rank] else None,
+            'stock': stock_rows[rank],
+            'forecast': weights[i].tolist() if weights is not None and has_forecast[i, 0] else None,
+            'on_hand': have[rank] if have is not None else None,
+            'replenish': replenish[rank] if replenish is not None else None,
+        })
+    return areas, result
+
+
+def region_preference(rows, on_hand=None, forecast=None, tiers=STOCK_TIERS):
+    """分地区偏好排行与应分配库存的看板展示行，各区域取值以“ : ”连接；参数同 region_numbers"""
+    areas, numbers = region_numbers(rows, on_hand, forecast, tiers)
+
+    def join(values):
+        return ' : '.join(map(str, values))
+
+    no_sales = join([0] * len(areas))
+    region_list = []
+    for item in numbers:
+        row = {
+            'rank': item['rank'],
+            'material_description': item['material_description'],
+            'areas': item['qty'],
+            # 比例化为1.x格式
+            'ratio': join([round(r * RATIO_SCALE, 1) for r in item['ratio']]) if item['ratio'] else no_sales,
+            'stock': join(item['stock']),
+        }
+        if forecast:
+            row['forecast'] = join([round(v) for v in item['forecast']]) if item['forecast'] else '-'
+        if on_hand is not None:
+            row['on_hand'] = join(item['on_hand'])
+            row['replenish'] = join(item['replenish'])
+        region_list.append(row)
+    return areas, region_list
@@ -0,0 +1,62 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from ..timing import timed
+
+# 数据版本号：两张事实表任一变化即更新，看板缓存键中带上版本号，旧缓存自然失效
+DATA_VERSION_KEY = 'erpsim:data_version'
+
+
+def get_data_version():
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        # 版本号被清除/淘汰时用新的时间戳，避免与旧缓存的版本号撞车
+        version = time.time_ns()
+        cache.add(DATA_VERSION_KEY, version, None)
+        version = cache.get(DATA_VERSION_KEY, version)
+    return version
+
+
+def bump_data_version():
+    cache.set(DATA_VERSION_KEY, time.time_ns(), None)
+
+
+def schedule_data_version_bump(using=None):
+    """事务提交后更新版本号，避免其他请求在提交前用新版本号缓存旧数据；同一事务内只登记一次"""
+    connection = transaction.get_connection(using)
+    if any(func is bump_data_version for _, func, _ in connection.run_on_commit):
+        return
+    transaction.on_commit(bump_data_version, using=using)
+
+
+def _key_part(value):
+    return hashlib.md5(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def cached_section(section, builder, *key_parts):
+    """
+    返回看板区块 section 的缓存结果，未命中时调用 builder() 计算并写入缓存。
+
+    缓存键带上所查看的比赛，查看同一场比赛的用户共享缓存；key_parts 只用于与调用参数相关的区块（如定价建议传入的成本价）。
+    """
+    from .games import active_game_id
+
+    key = f"erpsim:{section}:{get_data_version()}:{active_game_id()}"
+    if key_parts:
+        key += ':' + _key_part(key_parts)
+    # 每个区块单独计时（含读缓存），请求计时面板中可看出哪个区块慢、是否命中缓存
+    with timed(section) as timing:
+        result = cache.get(key)
+        if result is None:
+            result = builder()
+            cache.set(key, result, getattr(settings, 'ERPSIM_CACHE_TIMEOUT', 3600))
+            if timing is not None:
+                timing['desc'] = 'miss'
+        elif timing is not None and not timing['desc']:
+            timing['desc'] = 'hit'
+    return result
@@ -0,0 +1,172 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+import numpy as np
+from django.db import connections, transaction
+
+from ..models import DemandForecast, MarketSalesSummary
+from .cache import schedule_data_version_bump
+from .games import active_game_id, game_rows
+
+# 需求预测：对每个 物料 × 区域 的市场日销量序列拟合 Holt 线性趋势指数平滑模型。
+# 参数 (alpha, beta) 在网格上搜索误差平方和最小的一组；拟合结果与最新的水平/趋势状态保存在 DemandForecast，
+# 新的日期到来时只用新观测沿用已保存的参数向前递推，不必从头拟合。
+
+PARAM_GRID = np.linspace(0.1, 0.9, 9)
+# 每个进程一次处理的序列数；未指定进程数时，序列少于 POOL_MIN_SERIES 条直接在当前进程拟合（进程启动开销更大）
+FIT_BATCH_SIZE = 20
+POOL_MIN_SERIES = 500
+
+
+def _holt_run(values, alpha, beta, level, trend, sse):
+    """从给定状态出发依次吸收 values，返回 (level, trend, sse)；参数可为标量或同形状数组（网格搜索时向量化）"""
+    for y in values:
+        err = y - (level + trend)
+        sse = sse + err * err
+        new_level = alpha * y + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        level = new_level
+    return level, trend, sse
+
+
+def holt_fit(values):
+    """在参数网格上拟合一条序列，返回 (alpha, beta, level, trend, sse)"""
+    values = np.asarray(values, dtype=float)
+    if len(values) < 3:
+        # 观测太少无法估计趋势，直接取最后一个值
+        return 0.5, 0.1, float(values[-1]), 0.0, 0.0
+    alpha, beta = (g.ravel() for g in np.meshgrid(PARAM_GRID, PARAM_GRID, indexing='ij'))
+    level = np.full(alpha.shape, values[0])
+    trend = np.full(alpha.shape, values[1] - values[0])
+    level, trend, sse = _holt_run(values[1:], alpha, beta, level, trend, np.zeros(alpha.shape))
+    best = int(np.argmin(sse))
+    return float(alpha[best]), float(beta[best]), float(level[best]), float(trend[best]), float(sse[best])
+
+
+def fit_batch(batch):
+    return [holt_fit(values) for values in batch]
+
+
+def load_series(game=None):
+    """读取一场比赛（默认为当前比赛）的汇总表，返回 {(物料, 区域): (日期列表, 数量数组)}，日期升序"""
+    rows = game_rows(MarketSalesSummary, game).order_by('material_description', 'area', 'date').values_list(
+        'material_description', 'area', 'date', 'qty_sum',
+    )
+    series = {}
+    for mat, area, day, qty in rows.iterator(chunk_size=5000):
+        dates, values = series.setdefault((mat, area), ([], []))
+        dates.append(day)
+        values.append(qty)
+    return {key: (dates, np.asarray(values, dtype=float)) for key, (dates, values) in series.items()}
+
+
+def process_pool(workers):
+    """
+    子进程中初始化 Django 的进程池。
+
+    fork 出的子进程会继承父进程已打开的数据库连接（MySQL 套接字、SQLite 文件句柄），两边共用会损坏连接，
+    因此先关闭父进程的连接，之后用到时自动重连；事务中的连接不能关闭，子进程任务本身不访问数据库。
+    """
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+    return ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+
+
+def fit_all(batches, workers=None):
+    """拟合多批序列；序列较多或指定了进程数时分发到进程池并行计算"""
+    if workers is None:
+        workers = (os.cpu_count() or 1) if sum(len(b) for b in batches) >= POOL_MIN_SERIES else 1
+    if workers == 1 or len(batches) <= 1:
+        return [fit_batch(batch) for batch in batches]
+    with process_pool(min(workers, len(batches))) as pool:
+        return list(pool.map(fit_batch, batches))
+
+
+def _forecast(level, trend):
+    # 销量不会为负
+    return max(level + trend, 0.0)
+
+
+def refit_forecasts(full=False, workers=None, game=None):
+    """
+    更新一场比赛（默认为当前比赛）所有序列的预测模型，返回统计信息。
+
+    已有模型且历史数据未变时只用新日期的观测增量递推；新序列、历史数据被修改或 full=True 时重新拟合。
+    """
+    started = time.perf_counter()
+    game = game or active_game_id()
+    series = load_series(game)
+    existing = {(f.material_description, f.area): f for f in game_rows(DemandForecast, game)}
+    stats = {'series': len(series), 'fitted': 0, 'incremental': 0, 'unchanged': 0}
+    to_fit, to_save = [], []
+    for key, (dates, values) in series.items():
+        model = existing.get(key)
+        if model is not None and not full:
+            # 已拟合部分的观测数与合计都未变，说明只追加了新日期
+            seen = sum(1 for d in dates if d <= model.last_date)
+            if seen == model.n_obs and np.isclose(values[:seen].sum(), model.history_sum):
+                new_values = values[seen:]
+                if not len(new_values):
+                    stats['unchanged'] += 1
+                    continue
+                model.level, model.trend, model.sse = (float(v) for v in _holt_run(
+                    new_values, model.alpha, model.beta, model.level, model.trend, model.sse))
+                model.last_date, model.n_obs, model.history_sum = dates[-1], len(values), float(values.sum())
+                model.forecast = _forecast(model.level, model.trend)
+                to_save.append(model)
+                stats['incremental'] += 1
+                continue
+        to_fit.append(key)
+
+    batches = [
+        [series[key][1] for key in to_fit[i:i + FIT_BATCH_SIZE]] for i in range(0, len(to_fit), FIT_BATCH_SIZE)
+    ]
+    results = [result for batch in fit_all(batches, workers) for result in batch]
+    for key, (alpha, beta, level, trend, sse) in zip(to_fit, results):
+        dates, values = series[key]
+        model = existing.get(key) or DemandForecast(
+            game_id=game, material_description=key[0], area=key[1])
+        model.alpha, model.beta, model.level, model.trend, model.sse = alpha, beta, level, trend, sse
+        model.last_date, model.n_obs, model.history_sum = dates[-1], len(values), float(values.sum())
+        model.forecast = _forecast(level, trend)
+        to_save.append(model)
+    stats['fitted'] = len(to_fit)
+
+    with transaction.atomic():
+        # 与批量导入一样先删后插，比逐行 CASE WHEN 的 bulk_update 快；数据已被删除的序列同时删除其模型
+        replaced = [model.pk for model in to_save if model.pk is not None]
+        stale = [model.pk for key, model in existing.items() if key not in series]
+        ids = replaced + stale
+        for start in range(0, len(ids), 500):
+            DemandForecast.objects.filter(pk__in=ids[start:start + 500]).delete()
+        for model in to_save:
+            model.pk = None
+        DemandForecast.objects.bulk_create(to_save, batch_size=500)
+        # 批量写入不触发信号，手动让看板缓存失效
+        schedule_data_version_bump()
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def forecast_map():
+    """{(物料, 小写区域名): 下一期预测数量}，供库存分配使用"""
+    return {
+        (mat, area.strip().lower()): qty
+        for mat, area, qty in game_rows(DemandForecast).values_list('material_description', 'area', 'forecast')
+    }
+
+
+def forecast_rows():
+    """按物料汇总的预测表：每个物料一行，各区域的预测数量与趋势"""
+    rows = {}
+    for f in game_rows(DemandForecast).order_by('material_description', 'area'):
+        row = rows.setdefault(f.material_description, {
+            'material_description': f.material_description, 'areas': [], 'total': 0.0, 'last_date': f.last_date,
+        })
+        row['areas'].append({'area': f.area, 'forecast': round(f.forecast), 'trend': round(f.trend, 1)})
+        row['total'] += f.forecast
+        row['last_date'] = max(row['last_date'], f.last_date)
+    return sorted(rows.values(), key=lambda r: r['total'], reverse=True)
@@ -0,0 +1,69 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from ..models import Game
+from .cache import get_data_version
+
+# 比赛维表：导入的每一行都归属一场比赛，看板与后台列表只统计所查看比赛的行，其他比赛的数据保留但不参与查询。
+# 查看哪场比赛是每个用户会话各自的选择（GameScopeMiddleware 把它放进请求上下文）；
+# 导入与新增记录写入哪场比赛是单独的全局设置（Game.is_active，即“导入目标”），切换查看不会改变它。
+
+DEFAULT_GAME_NAME = '默认比赛'
+# 会话中保存所查看比赛 id 的键
+SESSION_GAME_KEY = 'erpsim_game'
+
+# (数据版本号, 导入目标比赛 id, 全部比赛 id)
+_cached = (None, None, frozenset())
+# 本次请求所查看的比赛 id，未选择或不在请求中时为 None
+_viewing = ContextVar('erpsim_viewing_game', default=None)
+
+
+def load_import_game():
+    """导入目标比赛的 id（不走缓存）；没有设为导入目标的比赛时取最近创建的一场，一场都没有时登记默认比赛"""
+    game = Game.objects.filter(is_active=True).order_by('-id').first() or Game.objects.order_by('-id').first()
+    if game is None:
+        game, _ = Game.objects.get_or_create(name=DEFAULT_GAME_NAME, team='')
+    return game.pk
+
+
+def _games():
+    """按数据版本在进程内缓存的导入目标与比赛列表；比赛增删改时会更新数据版本号，各进程据此重新读取"""
+    global _cached
+    version = get_data_version()
+    if _cached[0] != version:
+        target = load_import_game()
+        _cached = (version, target, frozenset(Game.objects.values_list('pk', flat=True)))
+    return _cached
+
+
+def import_game_id():
+    """导入与新增记录归属的比赛 id"""
+    return _games()[1]
+
+
+def active_game_id():
+    """所查看比赛的 id：本次请求会话中选择的比赛（已删除的不算），未选择时为导入目标"""
+    game = _viewing.get()
+    if game is not None and game in _games()[2]:
+        return game
+    return import_game_id()
+
+
+@contextmanager
+def viewing_game(game):
+    """在此范围内查看 game（None 表示跟随导入目标），结束后恢复"""
+    token = _viewing.set(game)
+    try:
+        yield
+    finally:
+        _viewing.reset(token)
+
+
+def game_rows(model, game=None):
+    """model 中属于 game（默认为所查看的比赛）的行"""
+    return model.objects.filter(game_id=game or active_game_id())
+
+
+def has_game(model):
+    # 迁移中的历史模型可能还没有 game 外键
+    return any(f.name == 'game' for f in model._meta.fields)
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+from django.db.models import Max
+
+from ..models import GroupSalesData, Material, MarketSalesData
+from .games import game_rows
+from .materials import split_description
+from .rounds import DEFAULT_CALENDAR, get_calendar
+
+MARKET_COLUMNS = ['material_description', 'round', 'game_day', 'price']
+GROUP_COLUMNS = ['material_description', 'round', 'day', 'price']
+
+
+def load_group_chart_frames(calendar=DEFAULT_CALENDAR):
+    """
+    各读取一次市场数据与小组数据，只取画图需要的列。
+
+    只读当前比赛的行。市场数据导入时已按日历写入轮次与游戏日，只读取日历年份（未设置时为数据中最新的年份）且在轮次内的行。
+    两表都只读整数外键 product，最后再按物料维表换成物料描述。返回 (market, group, {物料描述: 包装规格})。
+    """
+    year = calendar.year
+    if year is None:
+        latest = game_rows(MarketSalesData).aggregate(latest=Max('date'))['latest']
+        year = latest.year if latest else None
+    market_columns = ['product'] + MARKET_COLUMNS[1:]
+    market = pd.DataFrame.from_records(
+        game_rows(MarketSalesData).filter(date__year=year, round__isnull=False).values_list(*market_columns)
+        if year else [],
+        columns=market_columns,
+    )
+    # 同一天多条小组记录时沿用原逻辑取最后一条（按 id），排序前缀与索引一致，可走覆盖索引
+    group_columns = ['product'] + GROUP_COLUMNS[1:]
+    group = pd.DataFrame.from_records(
+        game_rows(GroupSalesData).order_by('product', 'round', 'day', 'id').values_list(*group_columns),
+        columns=group_columns,
+    )
+    materials = pd.DataFrame.from_records(
+        Material.objects.values_list('id', 'description', 'package_size'), columns=['id', 'description', 'size'],
+    )
+    names = pd.Series(materials['description'].to_numpy(), index=materials['id'].to_numpy(), dtype=object)
+    market.insert(0, 'material_description', market.pop('product').map(names))
+    group.insert(0, 'material_description', group.pop('product').map(names))
+    return market, group, dict(zip(materials['description'], materials['size']))
+
+
+def market_by_round(market, calendar=DEFAULT_CALENDAR):
+    """把按日期的市场数据（列 material_description/date/price）查表转换为 MARKET_COLUMNS 的形式，年份规则同上"""
+    dates = pd.to_datetime(market['date'])
+    rounds, days, _ = calendar.lookup(dates)
+    keep = (dates.dt.year == (calendar.year or dates.dt.year.max())).to_numpy() & (rounds > 0)
+    return pd.DataFrame({
+        'material_description': market['material_description'].to_numpy()[keep],
+        'round': rounds[keep], 'game_day': days[keep], 'price': market['price'].to_numpy(dtype=float)[keep],
+    }, columns=MARKET_COLUMNS)
+
+
+def _to_list(values):
+    # NaN 转为 None，json 序列化为 null
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def build_group_charts(market, group, packages=None, calendar=DEFAULT_CALENDAR):
+    """
+    构造小组价格与市场最高/最低价的对比图数据。
+
+    market: 列 material_description/round/game_day/price；group: 列 material_description/round/day/price；
+    packages: {物料描述: 包装规格}，缺省时从物料描述中拆出；calendar: 轮次日历查找表，决定日期网格与各天的参考日。
+    返回 (chart_1kg, chart_500g, mats_1kg, mats_500g)，chart 结构为 {轮次: {物料: {x, market_max, market_min, group_price}}}。
+    """
+    # 外键未关联到物料的行描述为空，不参与画图
+    mats = sorted(m for m in set(market['material_description']) | set(group['material_description']) if isinstance(m, str))
+    packages = packages or {}
+    sizes = {m: packages[m] if m in packages else split_description(m)[0] for m in mats}
+    mats_1kg = [m for m in mats if sizes[m] == '1kg']
+    mats_500g = [m for m in mats if sizes[m] == '500g']
+    chart_mats = mats_1kg + mats_500g
+
+    grid = pd.DataFrame(calendar.grid(), columns=['round', 'day', 'ref_day'])
+    n_mats, n_cells = len(chart_mats), len(grid)
+    mat_index = pd.Index(chart_mats)
+
+    # 物料 × 日期网格，用 物料序号*10000 + 月(轮次)*100 + 日 作为整数键，避免构造多级索引
+    cell_base = np.repeat(np.arange(n_mats, dtype=np.int64) * 10000, n_cells)
+    cell_round = np.tile(grid['round'].to_numpy(dtype=np.int64) * 100, n_mats)
+    market_keys = cell_base + cell_round + np.tile(grid['ref_day'].to_numpy(dtype=np.int64), n_mats)
+    group_keys = cell_base + cell_round + np.tile(grid['day'].to_numpy(dtype=np.int64), n_mats)
+
+    # 市场价：按 (物料, 轮次, 游戏日) 聚合最高/最低价，再按参考日映射到区间内的每一天，与小组数据用同一种键
+    market_agg = pd.DataFrame(columns=['max', 'min'], dtype=float)
+    if len(market):
+        codes = mat_index.get_indexer(market['material_description'])
+        keep = codes >= 0
+        keys = (codes * 10000 + market['round'].to_numpy(dtype=np.int64) * 100
+                + market['game_day'].to_numpy(dtype=np.int64))
+        market_agg = (
+            pd.Series(market['price'].to_numpy(dtype=float)[keep])
+            .groupby(keys[keep])
+            .agg(['max', 'min'])
+        )
+    market_cells = market_agg.reindex(market_keys)
+    market_max = market_cells['max'].to_numpy(dtype=float).reshape(n_mats, n_cells)
+    market_min = market_cells['min'].to_numpy(dtype=float).reshape(n_mats, n_cells)
+
+    # 小组价格：同一 (物料, 轮次, 天) 取最后一条，再铺到日期网格上
+    group_last = pd.Series(dtype=float)
+    if len(group):
+        codes = mat_index.get_indexer(group['material_description'])
+        keep = codes >= 0
+        keys = codes * 10000 + group['round'].to_numpy(dtype=np.int64) * 100 + group['day'].to_numpy(dtype=np.int64)
+        group_last = pd.Series(group['price'].to_numpy(dtype=float)[keep], index=keys[keep])
+        group_last = group_last[~group_last.index.duplicated(keep='last')]
+    group_price = group_last.reindex(group_keys).to_numpy(dtype=float).reshape(n_mats, n_cells)
+
+    # 整块转换为 Python 列表后按轮次切片组装前端结构（网格按轮次、天排序，每轮是连续区间）
+    market_max, market_min, group_price = _to_list(market_max), _to_list(market_min), _to_list(group_price)
+    charts = {}
+    for round_num, cells in grid.groupby('round', sort=True).indices.items():
+        round_num = int(round_num)
+        lo, hi = int(cells[0]), int(cells[-1]) + 1
+        x_list = [f"{round_num}-{day:02d}" for day in grid['day'].to_numpy()[lo:hi]]
+        for i, mat in enumerate(chart_mats):
+            charts.setdefault(mat, {})[round_num] = {
+                'x': x_list,
+                'market_max': market_max[i][lo:hi],
+                'market_min': market_min[i][lo:hi],
+                'group_price': group_price[i][lo:hi],
+            }
+    rounds = sorted(grid['round'].unique().tolist())
+    chart_1kg = {r: {mat: charts[mat][r] for mat in mats_1kg} for r in rounds}
+    chart_500g = {r: {mat: charts[mat][r] for mat in mats_500g} for r in rounds}
+    return chart_1kg, chart_500g, mats_1kg, mats_500g
+
+
+def group_charts():
+    """读取数据并构造全部对比图，后台页面与 JSON 接口共用同一份缓存"""
+    calendar = get_calendar()
+    market, group, packages = load_group_chart_frames(calendar)
+    return build_group_charts(market, group, packages, calendar=calendar)
@@ -0,0 +1,124 @@
+from django.db.models import Case, CharField, Count, F, Min, Q, Sum, Value, When
+
+from ..models import GroupSalesData, InventoryData, ProductionOrder
+from .games import game_rows
+from .query import aggregate
+
+# 成品库存地点与销售区域的对应关系：02N/02S/02W 为各区域仓库，02 为工厂中心仓
+STORAGE_LOCATION_AREAS = {'02N': 'NO', '02S': 'SO', '02W': 'WE'}
+CENTRAL_LOCATION = '02'
+# 小组数据的区域代码 -> 市场数据的区域名（小写）
+AREA_NAMES = {'NO': 'north', 'SO': 'south', 'WE': 'west'}
+
+
+def stock_by_area():
+    """各区域仓库的可用库存（库存 - 预留），一次 GROUP BY 取出，返回 {(物料, 区域代码): 数量}"""
+    area = Case(
+        *[When(storage_location=loc, then=Value(code)) for loc, code in STORAGE_LOCATION_AREAS.items()],
+        output_field=CharField(),
+    )
+    rows = (
+        game_rows(InventoryData).filter(storage_location__in=list(STORAGE_LOCATION_AREAS))
+        .annotate(area_code=area)
+        .values('material_description', 'area_code')
+        .annotate(available=Sum(F('stock') - F('reserved')))
+    )
+    return {(r['material_description'], r['area_code']): r['available'] for r in rows}
+
+
+def central_stock():
+    rows = (
+        game_rows(InventoryData).filter(storage_location=CENTRAL_LOCATION)
+        .values('material_description')
+        .annotate(available=Sum(F('stock') - F('reserved')))
+    )
+    return {r['material_description']: r['available'] for r in rows}
+
+
+def open_production():
+    """未完成生产订单的剩余数量（计划 - 已确认），按物料汇总"""
+    rows = (
+        game_rows(ProductionOrder).filter(confirmed__lt=F('target'))
+        .values('material_description')
+        .annotate(remaining=Sum(F('target') - F('confirmed')))
+    )
+    return {r['material_description']: r['remaining'] for r in rows}
+
+
+def daily_sales_by_area():
+    """本小组各物料各区域的日均销量：销量合计 / 已有销售记录的游戏天数"""
+    group = game_rows(GroupSalesData)
+    days = group.values('round', 'day').distinct().count()
+    if not days:
+        return {}
+    rows = aggregate(GroupSalesData, ['material_description', 'area'], {'qty_sum': ('sum', 'qty')})
+    return {(r['material_description'], r['area']): r['qty_sum'] / days for r in rows}
+
+
+def _cover(stock, daily):
+    # 没有销量时无法估计可售天数，返回 None
+    return round(stock / daily, 1) if daily else None
+
+
+def days_of_cover():
+    """
+    各物料在各区域的可售天数（区域可用库存 / 区域日均销量），另附中心仓库存、在产数量与合计可售天数。
+
+    按最短的区域可售天数升序排列，最需要补货的物料排在前面。
+    """
+    stock = stock_by_area()
+    daily = daily_sales_by_area()
+    central = central_stock()
+    producing = open_production()
+    mats = sorted({m for m, _ in stock} | {m for m, _ in daily})
+    rows = []
+    for mat in mats:
+        areas = []
+        for code in AREA_NAMES:
+            area_stock = stock.get((mat, code), 0.0)
+            area_daily = daily.get((mat, code), 0.0)
+            areas.append({
+                'area': code, 'stock': area_stock, 'daily': round(area_daily, 1),
+                'cover': _cover(area_stock, area_daily),
+            })
+        total_stock = sum(a['stock'] for a in areas) + central.get(mat, 0.0)
+        total_daily = sum(daily.get((mat, code), 0.0) for code in AREA_NAMES)
+        covers = [a['cover'] for a in areas if a['cover'] is not None]
+        rows.append({
+            'material_description': mat,
+            'areas': areas,
+            'central': central.get(mat, 0.0),
+            'producing': producing.get(mat, 0.0),
+            'total_cover': _cover(total_stock, total_daily),
+            'min_cover': min(covers) if covers else None,
+        })
+    rows.sort(key=lambda r: (r['min_cover'] is None, r['min_cover'] or 0))
+    return rows
+
+
+def production_summary():
+    """按物料汇总生产订单：订单数、计划/已确认/剩余数量、按确认数量加权的单位成本、最近一个未完成订单的完成日期"""
+    rows = (
+        game_rows(ProductionOrder).values('material_description')
+        .annotate(
+            orders=Count('id'),
+            target_sum=Sum('target'),
+            confirmed_sum=Sum('confirmed'),
+            cost_sum=Sum(F('confirmed') * F('unit_cost')),
+            next_finish=Min('finish', filter=Q(confirmed__lt=F('target'))),
+        )
+        .order_by('material_description')
+    )
+    summary = []
+    for r in rows:
+        confirmed = r['confirmed_sum'] or 0.0
+        summary.append({
+            'material_description': r['material_description'],
+            'orders': r['orders'],
+            'target': r['target_sum'],
+            'confirmed': confirmed,
+            'remaining': r['target_sum'] - confirmed,
+            'unit_cost': round(r['cost_sum'] / confirmed, 2) if confirmed else None,
+            'next_finish': r['next_finish'],
+        })
+    return summary
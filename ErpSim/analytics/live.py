@@ -0,0 +1,48 @@
+from django.db.models import Max
+from django.utils.dateparse import parse_date
+
+from ..models import MarketSalesSummary
+from .cache import cached_section
+from .games import active_game_id, game_rows
+from .market import round_chart_data
+from .prices import latest_max_price_map
+from .profit import profit_table
+
+# 看板实时刷新：页面记下已有数据的比赛与最新日期（游标），导入新数据后只推送游标当天及之后涉及的轮次汇总与最新价格，
+# 前端原地替换这些轮次的数据。游标之前的日期不会变化（导入只改写导出文件中出现的日期）；清空数据或切换比赛时整体替换。
+
+
+def live_state():
+    """当前的 (比赛 id, 游标)，随页面下发，作为实时刷新的起点"""
+    latest = game_rows(MarketSalesSummary).aggregate(latest=Max('date'))['latest']
+    return active_game_id(), latest.isoformat() if latest else None
+
+
+def market_delta(cursor):
+    """游标之后的变化：{reset, cursor, rounds: {轮次: [{name, qty}, ...]}, prices: {物料: 最新最高价}, profits: 利润排行}"""
+    summary = game_rows(MarketSalesSummary)
+    latest = summary.aggregate(latest=Max('date'))['latest']
+    since = parse_date(cursor) if cursor else None
+    reset = since is None or latest is None or latest < since
+    if reset:
+        rounds = round_chart_data()
+    else:
+        changed = summary.filter(date__gte=since, round__isnull=False).values_list('round', flat=True)
+        rounds = round_chart_data(sorted(set(changed.order_by().distinct())))
+    return {
+        'reset': reset,
+        'cursor': latest.isoformat() if latest else None,
+        'rounds': rounds,
+        'prices': latest_max_price_map(summary, price_field='max_price'),
+        # 利润排行很小，整表下发；队友修改成本价后其他人的页面也随之更新
+        'profits': profit_table(),
+    }
+
+
+def live_update(game=None, cursor=None):
+    """推送给页面的变化；比赛已切换时忽略游标整体替换。同一版本、同一游标的结果在各连接间共享"""
+    current = active_game_id()
+    if game != current:
+        cursor = None
+    delta = cached_section('live_market', lambda: market_delta(cursor), current, cursor)
+    return {'game': current, **delta}
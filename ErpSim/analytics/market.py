@@ -0,0 +1,66 @@
+from ..models import Material, MarketSalesSummary
+from .allocation import region_numbers, region_preference
+from .forecast import forecast_map
+from .games import game_rows
+from .inventory import AREA_NAMES, stock_by_area
+from .materials import material_names
+from .query import aggregate
+from .rounds import get_calendar
+
+# 市场看板各区块的计算逻辑，统一读取预聚合的汇总表（只读当前比赛的行），而不是重复扫描原始市场数据；
+# 分组聚合经查询层执行，可配置为 DuckDB
+
+
+def round_chart_data(rounds=None):
+    """
+    各轮次按物料汇总 qty（一次 GROUP BY 取出全部轮次），返回 {轮次: [{name, qty}, ...]}。
+
+    rounds 给定时只计算这些轮次（实时刷新只推送有变化的轮次）。
+    """
+    filters = {'round__isnull': False}
+    if rounds is None:
+        round_data = {str(round_num): [] for round_num in get_calendar().rounds}
+    else:
+        filters['round__in'] = rounds
+        round_data = {str(round_num): [] for round_num in rounds}
+    # 按整数外键分组，物料描述最后从维表查回
+    round_agg = aggregate(
+        MarketSalesSummary, ['round', 'product'], {'qty_sum': ('sum', 'qty_sum')}, filters,
+        order_by=['round', '-qty_sum', 'product'],
+    )
+    names = material_names()
+    for d in round_agg:
+        round_data.setdefault(str(d['round']), []).append({'name': names.get(d['product']), 'qty': d['qty_sum']})
+    return round_data
+
+
+def product_list():
+    """汇总表中出现的物料，[(物料描述, 包装规格), ...]"""
+    return list(
+        Material.objects.filter(id__in=game_rows(MarketSalesSummary).values('product'))
+        .order_by('description').values_list('description', 'package_size')
+    )
+
+
+def region_inputs():
+    """分地区分配的输入：(物料 × 区域 销量聚合行, 各区域现有库存, 需求预测)"""
+    # 统计每个产品各地区qty总和，在 产品 × 区域 矩阵上计算排名与分配
+    # 产品按首次出现的顺序进入矩阵，显式排序使各后端结果一致
+    region_agg = aggregate(
+        MarketSalesSummary, ['material_description', 'area'], {'qty_sum': ('sum', 'qty_sum')},
+        order_by=['material_description', 'area'],
+    )
+    # 各区域仓库现有可用库存，应分配库存扣除现有库存后即为需补货数量
+    on_hand = {(mat, AREA_NAMES[code]): qty for (mat, code), qty in stock_by_area().items()}
+    # 有需求预测时按预测的区域比例分配
+    return region_agg, on_hand, forecast_map()
+
+
+def region_allocation():
+    """分地区偏好排行与应分配库存，返回 (区域列表, 排行行)"""
+    return region_preference(*region_inputs())
+
+
+def region_allocation_numbers():
+    """同 region_allocation 的数值结果（区域份额、各项数量均为数字），供导出使用"""
+    return region_numbers(*region_inputs())
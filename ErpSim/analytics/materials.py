@@ -0,0 +1,59 @@
+import re
+
+from ..models import Material
+
+# 物料维表的登记与查询：导入时按物料描述批量登记，包装规格与产品系列从描述中拆出（如 "1kg Nut Muesli"）
+
+PACKAGE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?\s*(?:kg|g))\s+(.+?)\s*$', re.IGNORECASE)
+
+
+def split_description(description):
+    """'1kg Nut Muesli' -> ('1kg', 'Nut Muesli')；没有包装规格前缀时返回 ('', 原描述)"""
+    match = PACKAGE_PATTERN.match(description or '')
+    if not match:
+        return '', (description or '').strip()
+    return match.group(1).replace(' ', '').lower(), match.group(2)
+
+
+def ensure_materials(descriptions, codes=None, model=Material):
+    """
+    返回 {物料描述: Material id}，维表中没有的物料批量登记。
+
+    codes: 可选的 {物料描述: 物料编码}，为尚未记录编码的物料补上编码；model 允许迁移中传入历史模型。
+    """
+    descriptions = {d for d in descriptions if d}
+    codes = codes or {}
+    known = {d: (pk, code) for d, pk, code in model.objects.filter(description__in=descriptions).values_list(
+        'description', 'id', 'code')}
+    missing = descriptions - known.keys()
+    if missing:
+        # 并发导入时可能已被其他进程登记，忽略冲突后重新读取
+        model.objects.bulk_create(
+            [model(**_material_fields(d, codes.get(d))) for d in sorted(missing)], ignore_conflicts=True,
+        )
+        known.update({d: (pk, code) for d, pk, code in model.objects.filter(description__in=missing).values_list(
+            'description', 'id', 'code')})
+    for d, (pk, code) in known.items():
+        if code is None and codes.get(d):
+            model.objects.filter(pk=pk).update(code=codes[d])
+    return {d: pk for d, (pk, _) in known.items()}
+
+
+def _material_fields(description, code):
+    package_size, family = split_description(description)
+    return {'description': description, 'code': code, 'package_size': package_size, 'family': family}
+
+
+def material_id(description, code=None):
+    """单条登记，供逐行保存（后台编辑、逐行导入）使用"""
+    return ensure_materials([description], {description: code} if code else None).get(description)
+
+
+def material_names():
+    """{id: 物料描述}"""
+    return dict(Material.objects.values_list('id', 'description'))
+
+
+def package_sizes():
+    """{物料描述: 包装规格}"""
+    return dict(Material.objects.values_list('description', 'package_size'))
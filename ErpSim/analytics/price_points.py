@@ -0,0 +1,47 @@
+from collections import defaultdict
+from datetime import date
+
+from ..models import GroupSalesData, MarketSalesData
+from .games import game_rows
+from .rounds import get_calendar
+
+# 小组价格与市场价逐日对照的早期实现（1kg 产品），原先位于 admin.py。
+# 看板已改用 group_chart 模块；这里保留供分析脚本按需导入，admin 与其他启动路径不再加载本模块。
+
+
+def get_market_price_dict():
+    # 获取所有市场价格，按material_description和date分组
+    market_data = game_rows(MarketSalesData).filter(product__package_size='1kg').values('material_description', 'date', 'price')
+    price_dict = defaultdict(dict)
+    for row in market_data:
+        price_dict[row['material_description']][str(row['date'])] = row['price']
+    return price_dict
+
+
+def get_group_price_points():
+    # 获取所有小组销售数据（1kg产品）
+    group_data = game_rows(GroupSalesData).filter(product__package_size='1kg').values('material_description', 'round', 'day', 'price')
+    year = get_calendar().import_year()
+    points = defaultdict(list)
+    for row in group_data:
+        # 构造x轴：<年份>-<round>-<day>，年份取比赛日历
+        x = f"{year}-{int(row['round']):02d}-{int(row['day']):02d}"
+        points[row['material_description']].append({'x': x, 'price': row['price']})
+    return points
+
+
+def get_market_price_for_group_dates(price_dict, group_points):
+    # 各天取所在报告区间参考日的市场价，区间划分与价格对比图相同，由比赛日历查表得到
+    calendar = get_calendar()
+    # 返回：{material_description: {group_x: market_price}}
+    market_for_group = defaultdict(dict)
+    for mat, points in group_points.items():
+        for p in points:
+            # p['x']格式为2025-01-03
+            year, month, day = (int(part) for part in p['x'].split('-'))
+            ref_day = int(calendar.ref_day[month * 32 + day]) if month <= 12 and day <= 31 else 0
+            if ref_day:
+                market_for_group[mat][p['x']] = price_dict.get(mat, {}).get(str(date(year, month, ref_day)))
+            else:
+                market_for_group[mat][p['x']] = None
+    return market_for_group
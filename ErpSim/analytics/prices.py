@@ -0,0 +1,28 @@
+from django.db.models import Max, OuterRef, Subquery
+
+from ..models import MarketSalesData
+from .games import game_rows
+
+
+def latest_max_price_map(queryset=None, price_field='price', key='material_description'):
+    """
+    计算每个产品最新一天的最高市场价，返回 {material_description: max_price}。
+
+    通过关联子查询一次性取出所有产品，查询次数与产品数量无关。
+    queryset 可以是原始市场数据，也可以是汇总表（此时 price_field='max_price'）；key='product' 时按物料外键返回。
+    """
+    if queryset is None:
+        queryset = game_rows(MarketSalesData)
+    # 每个产品的最新日期
+    latest_date = (
+        queryset.filter(**{key: OuterRef(key)})
+        .order_by('-date')
+        .values('date')[:1]
+    )
+    rows = (
+        queryset.filter(date=Subquery(latest_date))
+        .values(key)
+        .annotate(max_price=Max(price_field))
+        .order_by()
+    )
+    return {row[key]: row['max_price'] for row in rows}
@@ -0,0 +1,137 @@
+import numpy as np
+
+from ..models import GroupSalesData, MarketSalesSummary
+from .cache import cached_section
+from .games import game_rows
+from .materials import material_names
+from .profit import current_costs
+from .query import aggregate
+
+# 定价建议：按物料拟合需求曲线 qty = a + b·x，x 是小组价格在同一轮市场最低价–最高价区间中的相对位置（0 为最低价，1 为最高价）。
+# 全部物料一次求解：按物料累加正规方程，再批量解 2×2 方程组；之后按成本价求下一天利润 (价格 - 成本) × 预计销量最大的价格，
+# 价格限制在最新一轮的市场价区间内。
+
+MIN_OBSERVATIONS = 3
+# (物料 id, 轮次) 合成一个整数键
+ROUND_KEY = 1000
+
+
+def fit_curves(codes, x, qty, count):
+    """
+    按物料批量最小二乘拟合 qty = a + b·x，返回 (a, b, 观测数) 三个长度为 count 的数组。
+
+    codes 为 0..count-1 的物料序号；观测少于 MIN_OBSERVATIONS 或价格没有变化的物料 a、b 为 NaN。
+    """
+    n = np.bincount(codes, minlength=count).astype(float)
+    sx = np.bincount(codes, x, minlength=count)
+    sy = np.bincount(codes, qty, minlength=count)
+    sxx = np.bincount(codes, x * x, minlength=count)
+    sxy = np.bincount(codes, x * qty, minlength=count)
+    det = n * sxx - sx * sx
+    ok = (n >= MIN_OBSERVATIONS) & (det > 1e-9 * np.maximum(n * sxx, 1.0))
+    coef = np.full((count, 2), np.nan)
+    if ok.any():
+        normal = np.stack([np.stack([n, sx], axis=-1), np.stack([sx, sxx], axis=-1)], axis=-2)[ok]
+        rhs = np.stack([sy, sxy], axis=-1)[ok]
+        coef[ok] = np.linalg.solve(normal, rhs[..., None])[..., 0]
+    return coef[:, 0], coef[:, 1], n.astype(int)
+
+
+def load_observations():
+    """
+    读取当前比赛的小组销售与各轮市场价区间，返回 (物料 id 数组, 相对价格 x, qty, {物料 id: 最新一轮 (最低价, 最高价)})。
+
+    没有对应轮次市场数据或该轮最低价等于最高价的小组记录不参与拟合。
+    """
+    bands = aggregate(
+        MarketSalesSummary, ['product', 'round'], {'low': ('min', 'min_price'), 'high': ('max', 'max_price')},
+        {'round__isnull': False, 'product__isnull': False}, order_by=['round', 'product'],
+    )
+    band_keys, lows, highs, latest = [], [], [], {}
+    for band in bands:
+        band_keys.append(band['product'] * ROUND_KEY + band['round'])
+        lows.append(band['low'])
+        highs.append(band['high'])
+        latest[band['product']] = (band['low'], band['high'])
+    group = np.array(
+        list(game_rows(GroupSalesData).filter(product__isnull=False).values_list('product', 'round', 'price', 'qty')),
+        dtype=float,
+    ).reshape(-1, 4)
+    if not band_keys or not len(group):
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0), latest
+    band_keys = np.array(band_keys, dtype=np.int64)
+    order = np.argsort(band_keys)
+    band_keys, lows, highs = band_keys[order], np.array(lows)[order], np.array(highs)[order]
+    products = group[:, 0].astype(np.int64)
+    keys = products * ROUND_KEY + group[:, 1].astype(np.int64)
+    idx = np.minimum(np.searchsorted(band_keys, keys), len(band_keys) - 1)
+    width = highs[idx] - lows[idx]
+    keep = (band_keys[idx] == keys) & (width > 0)
+    x = (group[keep, 2] - lows[idx][keep]) / width[keep]
+    return products[keep], x, group[keep, 3], latest
+
+
+def demand_curves():
+    """拟合全部物料的需求曲线，结果只与销售数据有关，按数据版本缓存"""
+    products, x, qty, latest = load_observations()
+    ids = sorted(set(products.tolist()) & set(latest))
+    codes = np.searchsorted(np.array(ids, dtype=np.int64), products)
+    keep = np.isin(products, ids)
+    a, b, n = fit_curves(codes[keep], x[keep], qty[keep], len(ids))
+    names = material_names()
+    return {
+        'materials': [names.get(pk) for pk in ids],
+        'a': a, 'b': b, 'observations': n,
+        'low': np.array([latest[pk][0] for pk in ids], dtype=float),
+        'high': np.array([latest[pk][1] for pk in ids], dtype=float),
+    }
+
+
+def recommend_prices(curves, cost_dict):
+    """
+    按成本价计算各物料下一天的建议价格、预计销量与利润，按物料名排序。
+
+    利润 (low + x·w - 成本)·(a + b·x) 对 x 求导为零得到最优位置，限制在 [0, 1]；
+    销量不随价格下降（b ≥ 0）时取市场最高价；曲线无法拟合的物料不给建议（price 为 None）。
+    """
+    a, b, low, high = curves['a'], curves['b'], curves['low'], curves['high']
+    cost = np.array([float(cost_dict.get(mat, 0.0)) for mat in curves['materials']], dtype=float)
+    width = high - low
+    fitted = ~np.isnan(b)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        best = -(width * a + b * (low - cost)) / (2 * b * width)
+    best = np.where((b < 0) & (width > 0), np.clip(np.nan_to_num(best, nan=1.0), 0.0, 1.0), 1.0)
+    price = low + best * width
+    qty = np.maximum(a + b * best, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 建议价格处的价格弹性 (dq/dp)·p/q
+        elasticity = np.where((qty > 0) & (width > 0), b / width * price / qty, np.nan)
+
+    def value(array, i, digits=2):
+        return round(float(array[i]), digits) if fitted[i] and np.isfinite(array[i]) else None
+
+    rows = []
+    for i, mat in enumerate(curves['materials']):
+        rows.append({
+            'material_description': mat,
+            'observations': int(curves['observations'][i]),
+            'market_low': round(float(low[i]), 2),
+            'market_high': round(float(high[i]), 2),
+            'cost': float(cost[i]),
+            'slope': value(b, i),
+            'elasticity': value(elasticity, i),
+            'price': value(price, i),
+            'qty': value(qty, i, 0),
+            'profit': value((price - cost) * qty, i),
+        })
+    return sorted(rows, key=lambda row: row['material_description'] or '')
+
+
+def price_recommendations(cost_dict=None):
+    """
+    看板与导出共用：需求曲线按数据版本缓存；成本价默认为全队共用的当前成本价，另行指定时按成本价分别缓存。
+    """
+    curves = cached_section('pricing_curves', demand_curves)
+    if cost_dict is None:
+        return cached_section('pricing', lambda: recommend_prices(curves, current_costs()))
+    return cached_section('pricing', lambda: recommend_prices(curves, cost_dict), cost_dict)
@@ -0,0 +1,155 @@
+from functools import partial
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F, Q, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from ..models import MarketSalesSummary, MaterialCost, MaterialProfit
+from .cache import bump_data_version, schedule_data_version_bump
+from .games import active_game_id, game_rows
+from .materials import ensure_materials, material_names
+from .prices import latest_max_price_map
+
+# 成本价与利润排行：成本价按比赛、轮次存入 MaterialCost，全队共用；利润、利润率在成本价或市场价变化时
+# 对整场比赛一次向量化重算并存入 MaterialProfit，页面只读取存储结果，排名由数据库窗口函数在读取时给出。
+
+
+def current_position(game=None, summary_model=MarketSalesSummary):
+    """当前比赛数据中最新的 (轮次, 日期)，没有轮次内的数据时为 (None, None)"""
+    latest = (
+        summary_model.objects.filter(game_id=game or active_game_id(), round__isnull=False)
+        .order_by('-date').values_list('round', 'date').first()
+    )
+    return latest or (None, None)
+
+
+def effective_costs(game=None, summary_model=MarketSalesSummary, cost_model=MaterialCost):
+    """
+    各物料当前有效的成本价 {物料 id: 成本价}。
+
+    取轮次不晚于数据最新轮次、生效日期不晚于最新日期的登记中最新的一条（同一轮内整轮有效的排在指定生效日期的之前）；
+    还没有数据时取最新登记的成本价。
+    """
+    game = game or active_game_id()
+    costs = cost_model.objects.filter(game_id=game)
+    round_num, latest = current_position(game, summary_model)
+    if round_num is not None:
+        costs = costs.filter(
+            Q(round__lt=round_num)
+            | Q(round=round_num) & (Q(effective_date__isnull=True) | Q(effective_date__lte=latest))
+        )
+    rows = costs.order_by('round', F('effective_date').asc(nulls_first=True), 'id').values_list('product_id', 'cost')
+    # 按时间顺序覆盖，留下每个物料最新的一条
+    return dict(rows)
+
+
+def current_costs(game=None):
+    """各物料当前有效的成本价 {物料描述: 成本价}，供成本价表单与定价建议使用"""
+    names = material_names()
+    return {names[pk]: cost for pk, cost in effective_costs(game).items()}
+
+
+def compute_profits(qty, price, cost):
+    """向量化计算 (利润, 利润率)；价格为 0 时利润率为 NaN"""
+    profit = price - cost
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margin = np.where(price > 0, profit / price, np.nan)
+    return profit, margin
+
+
+def refresh_profits(game=None, summary_model=MarketSalesSummary, cost_model=MaterialCost, profit_model=MaterialProfit):
+    """
+    重算一场比赛（默认为当前比赛）的利润排行并整体替换，返回写入行数；成本价或市场价变化时调用。
+
+    模型参数允许在数据迁移中传入历史模型。
+    """
+    game = game or active_game_id()
+    summary = summary_model.objects.filter(game_id=game, product__isnull=False)
+    qty_map = dict(summary.values('product').annotate(qty=Sum('qty_sum')).order_by().values_list('product', 'qty'))
+    price_map = latest_max_price_map(summary, price_field='max_price', key='product')
+    cost_map = effective_costs(game, summary_model, cost_model)
+
+    products = list(qty_map)
+    qty = np.array([qty_map[pk] for pk in products], dtype=float)
+    price = np.array([price_map.get(pk) or 0.0 for pk in products], dtype=float)
+    cost = np.array([cost_map.get(pk, 0.0) for pk in products], dtype=float)
+    profit, margin = compute_profits(qty, price, cost)
+    rows = [
+        profit_model(game_id=game, product_id=pk, qty=q, price=p, cost=c, profit=pf, margin=None if np.isnan(m) else m)
+        for pk, q, p, c, pf, m in zip(
+            products, qty.tolist(), price.tolist(), cost.tolist(), profit.tolist(), margin.tolist(),
+        )
+    ]
+    with transaction.atomic():
+        profit_model.objects.filter(game_id=game).delete()
+        profit_model.objects.bulk_create(rows)
+    return len(rows)
+
+
+def _refresh_and_bump(game):
+    refresh_profits(game)
+    bump_data_version()
+
+
+def schedule_profit_refresh(game, using=None):
+    """
+    事务提交后重算 game 的利润排行并更新数据版本号；同一事务内同一场比赛只登记一次（后台列表页批量修改成本价）。
+
+    版本号在重算之后更新，其他请求不会用新版本号缓存重算前的结果。
+    """
+    connection = transaction.get_connection(using)
+    for _, func, _ in connection.run_on_commit:
+        if getattr(func, 'func', None) is _refresh_and_bump and func.args == (game,):
+            return
+    transaction.on_commit(partial(_refresh_and_bump, game), using=using)
+
+
+def profit_table(game=None):
+    """
+    利润排行 [{material_description, qty, price, cost, profit, margin, rank, qty_rank}, ...]，按单个利润从高到低。
+
+    rank 与 qty_rank（按 qty 排名，用于配色）由窗口函数在同一条查询中计算。
+    """
+    def row_number(field):
+        return Window(RowNumber(), order_by=[F(field).desc(), F('product__description').asc()])
+
+    return list(
+        game_rows(MaterialProfit, game)
+        .annotate(material_description=F('product__description'), rank=row_number('profit'), qty_rank=row_number('qty'))
+        .order_by('rank')
+        .values('material_description', 'qty', 'price', 'cost', 'profit', 'margin', 'rank', 'qty_rank')
+    )
+
+
+def save_costs(costs, game=None, round_num=None):
+    """
+    批量登记成本价 {物料描述: 成本价}（整轮有效，默认为数据最新的轮次），已有的覆盖，然后重算利润排行。
+
+    返回登记条数；提交后更新数据版本号，所有用户的看板一起刷新。
+    """
+    game = game or active_game_id()
+    round_num = round_num or current_position(game)[0] or 1
+    ids = ensure_materials(costs)
+    existing = {
+        obj.product_id: obj for obj in
+        MaterialCost.objects.filter(game_id=game, round=round_num, effective_date__isnull=True, product_id__in=ids.values())
+    }
+    now = timezone.now()
+    created, updated = [], []
+    for mat, cost in costs.items():
+        obj = existing.get(ids[mat])
+        if obj is None:
+            created.append(MaterialCost(game_id=game, product_id=ids[mat], round=round_num, cost=cost))
+        elif obj.cost != cost:
+            obj.cost, obj.updated_at = cost, now
+            updated.append(obj)
+    if not (created or updated):
+        return 0
+    with transaction.atomic():
+        MaterialCost.objects.bulk_create(created)
+        MaterialCost.objects.bulk_update(updated, ['cost', 'updated_at'])
+        refresh_profits(game)
+        schedule_data_version_bump()
+    return len(created) + len(updated)
@@ -0,0 +1,219 @@
+import glob
+import os
+import threading
+
+import pandas as pd
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Count, Max, Min, Sum
+
+try:
+    import duckdb
+except ImportError:  # DuckDB 是可选的，未安装时分析查询只走 ORM
+    duckdb = None
+
+from .cache import get_data_version
+from .games import active_game_id, game_rows
+
+# 分析查询层：看板中较重的分组聚合用 aggregate() 描述（模型、分组列、度量、过滤条件），
+# 按 ERPSIM_ANALYTICS_BACKEND 经 Django ORM 在主数据库中执行，或交给 DuckDB 列式执行，两种后端返回相同的行。
+# DuckDB 的数据来源由 ERPSIM_DUCKDB_SOURCE 决定：'sqlite' 直接挂载主数据库文件（只读）；
+# 'parquet' 读取按比赛与数据版本导出的 Parquet 快照，数据变化后第一次查询某场比赛的某张表时只重新导出这场比赛的行，
+# 快照可在多个进程间共用。
+
+AGGREGATES = {'sum': Sum, 'min': Min, 'max': Max, 'count': Count}
+# 过滤条件的查找类型 -> SQL 运算符（另支持 in 与 isnull）
+LOOKUPS = {'exact': '=', 'lt': '<', 'lte': '<=', 'gt': '>', 'gte': '>='}
+# Django 字段类型 -> 快照中的 DuckDB 类型，其余按字符串处理
+SNAPSHOT_TYPES = {
+    'AutoField': 'BIGINT', 'BigAutoField': 'BIGINT', 'ForeignKey': 'BIGINT', 'IntegerField': 'BIGINT',
+    'PositiveSmallIntegerField': 'BIGINT', 'FloatField': 'DOUBLE', 'DateField': 'DATE', 'BooleanField': 'BOOLEAN',
+}
+
+_lock = threading.Lock()
+# (DuckDB 连接, 数据来源)
+_duckdb = None
+# Parquet 来源下各视图对应的数据版本 {(表名, 比赛 id): 数据版本号}
+_views = {}
+
+
+def analytics_backend():
+    """
+    实际使用的后端名。
+
+    配置为 duckdb 但未安装时退回 django；默认连接处于事务中（ATOMIC_REQUESTS、导入过程、测试）时同样退回，
+    因为 DuckDB 看不到未提交的数据，快照也不能包含可能回滚的行。
+    """
+    backend = getattr(settings, 'ERPSIM_ANALYTICS_BACKEND', 'django')
+    if backend == 'duckdb' and (duckdb is None or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+        return 'django'
+    return backend
+
+
+def duckdb_source():
+    """DuckDB 的数据来源；主数据库不是 SQLite 文件（MySQL、内存库）时只能读取 Parquet 快照"""
+    connection = connections[DEFAULT_DB_ALIAS]
+    if (getattr(settings, 'ERPSIM_DUCKDB_SOURCE', 'parquet') == 'sqlite' and connection.vendor == 'sqlite'
+            and not connection.is_in_memory_db()):
+        return 'sqlite'
+    return 'parquet'
+
+
+def aggregate(model, group_by, measures, filters=None, order_by=(), game=None, backend=None):
+    """
+    当前比赛（或 game）中 model 的分组聚合，返回 [{分组列..., 度量名: 值}, ...]。
+
+    measures: {度量名: (sum/min/max/count, 字段名)}；filters: {字段名[__lookup]: 值}，lookup 为 exact/lt/lte/gt/gte/in/isnull；
+    order_by: 分组列或度量名，前缀 '-' 表示降序，NULL 的位置与 SQLite/MySQL 相同。backend 缺省时按配置选择。
+    """
+    if (backend or analytics_backend()) == 'duckdb':
+        return _duckdb_aggregate(model, group_by, measures, filters or {}, order_by, game or active_game_id())
+    rows = (
+        game_rows(model, game).filter(**(filters or {}))
+        .values(*group_by)
+        .annotate(**{name: AGGREGATES[func](field) for name, (func, field) in measures.items()})
+        .order_by(*order_by)
+    )
+    return list(rows)
+
+
+def _column(model, name):
+    return '"%s"' % model._meta.get_field(name).column
+
+
+def _quote(value):
+    return "'%s'" % str(value).replace("'", "''")
+
+
+def _where(model, filters, game):
+    clauses, params = [f"{_column(model, 'game')} = ?"], [game]
+    for key, value in filters.items():
+        name, _, lookup = key.partition('__')
+        column = _column(model, name)
+        if lookup == 'isnull':
+            clauses.append(f"{column} IS {'' if value else 'NOT '}NULL")
+        elif lookup == 'in':
+            values = list(value)
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})" if values else 'FALSE')
+            params.extend(values)
+        else:
+            operator = LOOKUPS.get(lookup or 'exact')
+            if operator is None:
+                raise ValueError(f"不支持的过滤条件：{key}")
+            clauses.append(f"{column} {operator} ?")
+            params.append(value)
+    return ' AND '.join(clauses), params
+
+
+def aggregate_sql(model, group_by, measures, filters, order_by, game, table=None):
+    """
+    aggregate() 在 DuckDB 上执行的 SQL 与参数，列名取数据库列名，结果列名与 ORM 的 values() 相同。
+
+    table 为查询的表或视图名，缺省为 model 的表名。
+    """
+    select = [f'{_column(model, name)} AS "{name}"' for name in group_by]
+    select += [f'{func.upper()}({_column(model, field)}) AS "{name}"' for name, (func, field) in measures.items()]
+    where, params = _where(model, filters, game)
+    sql = f'SELECT {", ".join(select)} FROM "{table or model._meta.db_table}" WHERE {where}'
+    if group_by:
+        sql += ' GROUP BY ' + ', '.join(_column(model, name) for name in group_by)
+    if order_by:
+        # SQLite/MySQL 中 NULL 最小：升序排在最前，降序排在最后
+        sql += ' ORDER BY ' + ', '.join(
+            f'"{name[1:]}" DESC NULLS LAST' if name.startswith('-') else f'"{name}" ASC NULLS FIRST'
+            for name in order_by
+        )
+    return sql, params
+
+
+def _duckdb_aggregate(model, group_by, measures, filters, order_by, game):
+    connection, table = duckdb_connection(model, game)
+    # 每次查询用独立游标，看板区块在多个线程中并发查询
+    cursor = connection.cursor()
+    try:
+        cursor.execute(*aggregate_sql(model, group_by, measures, filters, order_by, game, table))
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def duckdb_connection(model, game):
+    """
+    进程内共用的 DuckDB 连接与 model 在 game 中可查询的表名，返回 (连接, 表名)。
+
+    SQLite 来源下即主数据库中的表；Parquet 来源下按需导出这场比赛的快照，并建立 "表名__比赛 id" 视图。
+    """
+    global _duckdb
+    with _lock:
+        if _duckdb is None:
+            connection, source = duckdb.connect(), duckdb_source()
+            if source == 'sqlite':
+                name = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+                connection.execute(f"ATTACH {_quote(name)} AS erp (TYPE sqlite, READ_ONLY)")
+                connection.execute('USE erp')
+            _duckdb = (connection, source)
+        connection, source = _duckdb
+        table = model._meta.db_table
+        if source == 'sqlite':
+            return connection, table
+        version, view = get_data_version(), f'{table}__{game}'
+        if _views.get((table, game)) != version:
+            path = snapshot_path(model, game, version)
+            if not os.path.exists(path):
+                write_snapshot(model, path, game, connection)
+            connection.execute(f'CREATE OR REPLACE VIEW "{view}" AS SELECT * FROM read_parquet({_quote(path)})')
+            _views[(table, game)] = version
+        return connection, view
+
+
+def reset_duckdb():
+    """关闭 DuckDB 连接（配置或主数据库变化后调用，测试与基准在切换数据库时使用）"""
+    global _duckdb
+    with _lock:
+        if _duckdb is not None:
+            _duckdb[0].close()
+        _duckdb = None
+        _views.clear()
+
+
+def snapshot_path(model, game, version):
+    return os.path.join(settings.ERPSIM_PARQUET_DIR, f'{model._meta.db_table}.{game}.{version}.parquet')
+
+
+def write_snapshot(model, path, game, connection=None):
+    """
+    把 model 中属于 game 的行导出为 Parquet 快照，列类型按模型字段确定；先写临时文件再改名，其他进程不会读到半个文件。
+
+    历史比赛的行不再随每次数据变化重新导出。随后只删除同一张表同一场比赛的旧快照：其他比赛的视图可能仍在被其他线程或进程查询，
+    留到那场比赛下次导出时再删除。返回导出行数。
+    """
+    fields = model._meta.concrete_fields
+    columns = [f.attname for f in fields]
+    frame = pd.DataFrame.from_records(
+        game_rows(model, game).order_by('pk').values_list(*columns).iterator(chunk_size=20000), columns=columns,
+    )
+    # 整数列可能含 NULL，以可空整数交给 DuckDB，避免变成浮点数
+    for f in fields:
+        if SNAPSHOT_TYPES.get(f.get_internal_type()) == 'BIGINT':
+            frame[f.attname] = frame[f.attname].astype('Int64')
+    select = ', '.join(
+        f'CAST("{f.attname}" AS {SNAPSHOT_TYPES.get(f.get_internal_type(), "VARCHAR")}) AS "{f.column}"'
+        for f in fields
+    )
+    connection = connection or duckdb.connect()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    connection.register('snapshot_rows', frame)
+    try:
+        connection.execute(f"COPY (SELECT {select} FROM snapshot_rows) TO {_quote(tmp_path)} (FORMAT parquet)")
+    finally:
+        connection.unregister('snapshot_rows')
+    os.replace(tmp_path, path)
+    for old in glob.glob(os.path.join(os.path.dirname(path), f'{model._meta.db_table}.{game}.*.parquet')):
+        if old != path:
+            try:
+                os.remove(old)
+            except OSError:  # 其他进程仍在读取（Windows）时留到下次再删
+                pass
+    return len(frame)
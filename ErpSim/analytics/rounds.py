@@ -0,0 +1,103 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from ..models import RoundCalendar
+from .cache import get_data_version
+
+# 轮次日历：由 RoundCalendar 生成 日期 -> (轮次, 游戏日, 参考日) 的稠密查找表。
+# 第 n 轮对应第 n 月，表的下标为 月 * 32 + 日，与年份无关；值为 0 表示该日期不在任何轮次内。
+
+ROUND_NUMERALS = '一二三四五六七八九十'
+LOOKUP_SIZE = 13 * 32
+
+
+def _ref_day(round_num, day, calendar):
+    # 区间内各天取区间末尾报告日的市场价；第 2 轮起第一天的报告并入下一个区间（与原 1-5/6-10/... 与 5-10/11-15/... 的分段一致）
+    interval = calendar.report_interval
+    ref = -(-day // interval) * interval
+    if round_num > 1 and ref <= calendar.first_day:
+        ref = calendar.first_day + interval
+    return min(ref, calendar.last_day)
+
+
+class CalendarLookup:
+    """某个日历的查找表与派生信息，构造一次后在进程内按数据版本缓存"""
+
+    def __init__(self, calendar):
+        self.year = calendar.year
+        self.rounds = list(range(1, calendar.rounds + 1))
+        self.first_day, self.last_day = calendar.first_day, calendar.last_day
+        self.round = np.zeros(LOOKUP_SIZE, dtype=np.int16)
+        self.day = np.zeros(LOOKUP_SIZE, dtype=np.int16)
+        self.ref_day = np.zeros(LOOKUP_SIZE, dtype=np.int16)
+        for round_num in self.rounds:
+            for day in range(calendar.first_day, calendar.last_day + 1):
+                i = round_num * 32 + day
+                self.round[i], self.day[i] = round_num, day
+                self.ref_day[i] = _ref_day(round_num, day, calendar)
+
+    def import_year(self):
+        """导入时 MM/DD 日期补全的年份"""
+        return self.year or datetime.now().year
+
+    @staticmethod
+    def _index(value):
+        # value 可为 date 或 'YYYY-MM-DD' 字符串
+        if hasattr(value, 'month'):
+            return value.month * 32 + value.day
+        return int(str(value)[5:7]) * 32 + int(str(value)[8:10])
+
+    def round_of(self, value):
+        """返回日期所属轮次，不在任何轮次区间内时返回 None"""
+        return int(self.round[self._index(value)]) or None
+
+    def round_day(self, value):
+        """返回 (轮次, 游戏日)，不在任何轮次区间内时为 (None, None)"""
+        i = self._index(value)
+        return (int(self.round[i]), int(self.day[i])) if self.round[i] else (None, None)
+
+    def lookup(self, dates):
+        """批量映射日期，返回 (轮次, 游戏日, 参考日) 三个整数数组，不在轮次内（或日期为空）的为 0"""
+        dates = pd.to_datetime(pd.Series(dates))
+        index = (dates.dt.month * 32 + dates.dt.day).fillna(0).to_numpy(dtype=np.int64)
+        return self.round[index], self.day[index], self.ref_day[index]
+
+    def grid(self):
+        """返回 [(轮次, 天, 参考日), ...]，按轮次、天排序，只包含轮次区间内的天"""
+        cells = np.flatnonzero(self.round)
+        return list(zip(self.round[cells].tolist(), self.day[cells].tolist(), self.ref_day[cells].tolist()))
+
+    def ranges(self):
+        """[(轮次, 'MM-DD', 'MM-DD'), ...]"""
+        return [(r, f"{r:02d}-{self.first_day:02d}", f"{r:02d}-{self.last_day:02d}") for r in self.rounds]
+
+    def labels(self):
+        """{轮次: '第一轮（1月5日-1月20日）'}，供页面下拉框与列表标题使用"""
+        labels = {}
+        for r in self.rounds:
+            numeral = ROUND_NUMERALS[r - 1] if r <= len(ROUND_NUMERALS) else str(r)
+            labels[r] = f"第{numeral}轮（{r}月{self.first_day}日-{r}月{self.last_day}日）"
+        return labels
+
+
+# 未配置日历时使用的默认日历（4 轮，每轮 5-20 日，每 5 天一次市场报告）
+DEFAULT_CALENDAR = CalendarLookup(RoundCalendar(name='默认'))
+
+_cached = (None, None)
+
+
+def load_calendar():
+    """从数据库读取当前启用的日历（不走缓存）"""
+    calendar = RoundCalendar.objects.filter(is_active=True).order_by('-id').first()
+    return CalendarLookup(calendar) if calendar else DEFAULT_CALENDAR
+
+
+def get_calendar():
+    """当前启用的日历查找表，按数据版本在进程内缓存；日历修改时会更新数据版本号，各进程据此重新加载"""
+    global _cached
+    version = get_data_version()
+    if _cached[0] != version:
+        _cached = (version, load_calendar())
+    return _cached[1]
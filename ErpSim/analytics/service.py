@@ -0,0 +1,83 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+
+from .cache import cached_section
+from .forecast import forecast_rows
+from .market import product_list, region_allocation, round_chart_data
+from .profit import profit_table
+
+# 并发计算看板区块：各区块相互独立，分别放到线程池中（每个线程各用一个数据库连接）同时计算，
+# 缓存未命中时页面耗时接近最慢的区块而不是各区块之和。缓存命中时各区块只读一次缓存，与依次计算差别不大。
+# 默认连接处于事务中时（ATOMIC_REQUESTS、测试），其他连接看不到未提交的数据，改为在当前线程依次计算。
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'ERPSIM_ANALYTICS_WORKERS', 4), thread_name_prefix='erpsim-analytics',
+        )
+    return _executor
+
+
+def market_sections(rounds=False):
+    """市场看板的区块 {缓存区块名: (builder, 缓存键附加部分)}；rounds 为 True 时包含轮次图表数据"""
+    sections = {
+        'market_products': (product_list, ()),
+        # 利润排行已按全队共用的成本价存储，所有用户共用同一份缓存
+        'market_profit': (profit_table, ()),
+        'market_region_allocation': (region_allocation, ()),
+        'market_forecast': (forecast_rows, ()),
+    }
+    if rounds:
+        sections['market_round_chart'] = (round_chart_data, ())
+    return sections
+
+
+def _run_inline(sections):
+    return {name: cached_section(name, builder, *key_parts) for name, (builder, key_parts) in sections.items()}
+
+
+def _run_section(name, builder, key_parts):
+    """
+    在工作线程中计算一个区块，结束后像请求结束时一样按 CONN_MAX_AGE 关闭连接。
+
+    sync_to_async 把请求的上下文带到工作线程，该线程的查询同样计入请求计时（见 timing.record_current_query）。
+    """
+    try:
+        return cached_section(name, builder, *key_parts)
+    finally:
+        close_old_connections()
+
+
+def run_inline():
+    return getattr(settings, 'ERPSIM_ANALYTICS_WORKERS', 4) <= 1 or connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+async def _gather(sections):
+    executor = get_executor()
+    results = await asyncio.gather(*(
+        sync_to_async(_run_section, thread_sensitive=False, executor=executor)(name, builder, key_parts)
+        for name, (builder, key_parts) in sections.items()
+    ))
+    return dict(zip(sections, results))
+
+
+async def acompute_sections(sections):
+    """异步视图使用：并发计算 sections，返回 {区块名: 结果}"""
+    if await sync_to_async(run_inline)():
+        return await sync_to_async(_run_inline)(sections)
+    return await _gather(sections)
+
+
+def compute_sections(sections):
+    """同步视图（后台页面）使用，行为同 acompute_sections"""
+    if run_inline():
+        return _run_inline(sections)
+    return async_to_sync(_gather)(sections)
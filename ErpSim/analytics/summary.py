@@ -0,0 +1,139 @@
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+
+from ..models import MarketSalesData, MarketSalesSummary, MaterialProfit
+from .games import has_game
+from .materials import ensure_materials
+from .profit import refresh_profits
+from .rounds import get_calendar, load_calendar
+
+SUMMARY_KEY = ('game_id', 'date', 'material_description', 'area')
+SUMMARY_VALUES = ('qty_sum', 'value_sum', 'min_price', 'max_price', 'row_count')
+
+
+def summary_key(model):
+    # 迁移中的历史模型还没有 game 外键时不按比赛分组
+    return SUMMARY_KEY if has_game(model) else SUMMARY_KEY[1:]
+
+
+def aggregate_market_rows(queryset):
+    # 按 比赛 × 日期 × 物料 × 区域 聚合原始市场数据
+    return (
+        queryset.values(*summary_key(queryset.model))
+        .annotate(
+            qty_sum=Sum('qty'),
+            value_sum=Sum('value'),
+            min_price=Min('price'),
+            max_price=Max('price'),
+            row_count=Count('id'),
+        )
+        .order_by()
+    )
+
+
+def refresh_market_summary(dates=None, raw_model=MarketSalesData, summary_model=MarketSalesSummary, calendar=None,
+                           game=None):
+    """
+    重新计算指定日期的汇总行；dates 为 None 时全量重建。game 指定时只刷新该比赛，否则不限比赛。
+
+    市场价随之变化，同一事务内重算涉及比赛的利润排行。
+    raw_model/summary_model 允许在数据迁移中传入历史模型，此时需同时传入 calendar（迁移中不能读取日历表）。
+    返回写入的汇总行数。
+    """
+    calendar = calendar or get_calendar()
+    raw = raw_model.objects.all()
+    summary = summary_model.objects.all()
+    if dates is not None:
+        dates = sorted({str(d) for d in dates if d})
+        if not dates:
+            return 0
+        raw = raw.filter(date__in=dates)
+        summary = summary.filter(date__in=dates)
+    if game is not None:
+        raw = raw.filter(game_id=game)
+        summary = summary.filter(game_id=game)
+    # 迁移 0002 中的历史模型还没有 product 外键
+    links_material = any(f.name == 'product' for f in summary_model._meta.fields)
+    material_ids = {}
+
+    def write(objs):
+        if links_material:
+            missing = {o.material_description for o in objs} - material_ids.keys()
+            if missing:
+                material_ids.update(ensure_materials(missing))
+            for o in objs:
+                o.product_id = material_ids.get(o.material_description)
+        summary_model.objects.bulk_create(objs)
+        return len(objs)
+
+    count = 0
+    with transaction.atomic():
+        summary.delete()
+        # 分批写入，避免大批量导入时一次性构造全部汇总对象
+        objs = []
+        for row in aggregate_market_rows(raw).iterator(chunk_size=2000):
+            objs.append(summary_model(round=calendar.round_of(row['date']), **row))
+            if len(objs) >= 1000:
+                count += write(objs)
+                objs = []
+        count += write(objs)
+        if summary_model is MarketSalesSummary:
+            refresh_game_profits(game)
+    return count
+
+
+def refresh_game_profits(game=None):
+    """重算 game 的利润排行；game 为 None 时重算汇总表或利润排行中出现的每场比赛"""
+    if game is not None:
+        games = [game]
+    else:
+        games = set(MarketSalesSummary.objects.values_list('game_id', flat=True).distinct().order_by())
+        games |= set(MaterialProfit.objects.values_list('game_id', flat=True).distinct().order_by())
+    for game in games:
+        refresh_profits(game)
+
+
+def reassign_rounds(calendar=None, raw_model=MarketSalesData, summary_model=MarketSalesSummary):
+    """
+    按日历重写市场数据的轮次/游戏日与汇总表的轮次，日历修改后调用。
+
+    不同日期只有几十个，按 (轮次, 游戏日) 分组各一条 UPDATE；迁移中回填时传入历史模型与日历。
+    """
+    calendar = calendar or load_calendar()
+    dates = set(raw_model.objects.values_list('date', flat=True).distinct().order_by())
+    dates |= set(summary_model.objects.values_list('date', flat=True).distinct().order_by())
+    by_round_day = defaultdict(list)
+    for day in dates:
+        by_round_day[calendar.round_day(day)].append(day)
+    with transaction.atomic():
+        for (round_num, game_day), days in by_round_day.items():
+            raw_model.objects.filter(date__in=days).update(round=round_num, game_day=game_day)
+            summary_model.objects.filter(date__in=days).update(round=round_num)
+        # 当前轮次可能变化，有效的成本价随之变化
+        if summary_model is MarketSalesSummary:
+            refresh_game_profits()
+
+
+def check_market_summary():
+    """对比汇总表与原始表的聚合结果，返回不一致项描述列表（空列表表示一致）"""
+    calendar = get_calendar()
+    raw = {tuple(str(row[k]) for k in SUMMARY_KEY): row for row in aggregate_market_rows(MarketSalesData.objects.all())}
+    stored = {
+        tuple(str(row[k]) for k in SUMMARY_KEY): row
+        for row in MarketSalesSummary.objects.values('round', *SUMMARY_KEY, *SUMMARY_VALUES)
+    }
+    problems = []
+    for key in sorted(raw.keys() - stored.keys()):
+        problems.append(f"缺少汇总行: {key}")
+    for key in sorted(stored.keys() - raw.keys()):
+        problems.append(f"多余汇总行: {key}")
+    for key in sorted(raw.keys() & stored.keys()):
+        for field in SUMMARY_VALUES:
+            if not math.isclose(raw[key][field], stored[key][field], rel_tol=1e-9, abs_tol=1e-6):
+                problems.append(f"{key} {field} 不一致: 原始 {raw[key][field]} / 汇总 {stored[key][field]}")
+        if stored[key]['round'] != calendar.round_of(raw[key]['date']):
+            problems.append(f"{key} round 不一致: 汇总 {stored[key]['round']}")
+    return problems
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class ErpsimConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "ErpSim"
+
+    def ready(self):
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .timing import install_query_recorder
+
+        # 请求计时统计所有连接上的查询，包括异步视图与看板线程池中新建的连接
+        connection_created.connect(install_query_recorder)
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection=connection)
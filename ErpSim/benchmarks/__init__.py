@@ -0,0 +1,20 @@
+# 性能基准：每个模块提供 run(**options)，返回结果字典，由 manage.py benchmark 调用
+from . import (
+    allocation, backends, dashboard, export, forecast, group_chart, importer, live, load, pricing, purge, startup, suite,
+)
+
+BENCHMARKS = {
+    'allocation': allocation.run,
+    'backends': backends.run,
+    'dashboard': dashboard.run,
+    'export': export.run,
+    'forecast': forecast.run,
+    'group_chart': group_chart.run,
+    'import': importer.run,
+    'live': live.run,
+    'load': load.run,
+    'pricing': pricing.run,
+    'purge': purge.run,
+    'startup': startup.run,
+    'suite': suite.run,
+}
@@ -0,0 +1,92 @@
+import random
+import time
+
+from ..analytics.allocation import AREA_ORDER, allocate_stock, build_matrix, region_preference
+
+
+def synthetic_region_rows(products=500, areas=10, seed=0):
+    """生成 (物料, 区域, 销量) 聚合行，区域数超过 3 时追加 Area 04、Area 05 …"""
+    rng = random.Random(seed)
+    names = list(AREA_ORDER[:areas]) + [f'Area {i:02d}' for i in range(len(AREA_ORDER) + 1, areas + 1)]
+    rows = []
+    for i in range(products):
+        mat = f"{'1kg' if i % 2 else '500g'} Product {i:03d} Muesli"
+        for area in names:
+            if rng.random() < 0.9:
+                rows.append({'material_description': mat, 'area': area.title(), 'qty_sum': float(rng.randint(0, 200000))})
+    return rows
+
+
+def legacy_region_allocation(rows, areas=AREA_ORDER):
+    """重构前 region_allocation 的逐产品 Python 实现（areas 默认即原来写死的 north/south/west），用于对比"""
+    region_map = {}
+    for row in rows:
+        mat = row['material_description']
+        area = row['area'].strip().lower()
+        if mat not in region_map:
+            region_map[mat] = {a: 0 for a in areas}
+        if area in region_map[mat]:
+            region_map[mat][area] += row['qty_sum']
+    total_qty_map = {mat: sum(vals.values()) for mat, vals in region_map.items()}
+    sorted_mats = sorted(total_qty_map.items(), key=lambda x: x[1], reverse=True)
+    region_list = []
+    for idx, (mat, total_qty) in enumerate(sorted_mats):
+        qtys = [region_map[mat][a] for a in areas]
+        total = sum(qtys)
+        if total > 0:
+            ratios = [q / total for q in qtys]
+            ratio_str = ' : '.join(str(round(r * 4, 1)) for r in ratios)
+        else:
+            ratios = [1 / len(areas)] * len(areas)
+            ratio_str = ' : '.join('0' for _ in areas)
+        if idx < 4:
+            max_stock = 12000
+        elif idx < 7:
+            max_stock = 10000
+        elif idx < 10:
+            max_stock = 8000
+        else:
+            max_stock = 0
+        max_idx = ratios.index(max(ratios))
+        stock = [0] * len(areas)
+        if max_stock > 0:
+            stock[max_idx] = max_stock
+            other_idxs = [i for i in range(len(areas)) if i != max_idx]
+            remain = 1 - ratios[max_idx]
+            if remain > 0:
+                for i in other_idxs:
+                    stock[i] = int(round(max_stock * ratios[i] / ratios[max_idx]))
+        region_list.append({
+            'rank': idx + 1,
+            'material_description': mat,
+            'areas': qtys,
+            'ratio': ratio_str,
+            'stock': ' : '.join(str(s) for s in stock),
+        })
+    return region_list
+
+
+def _best_of(func, repeat, *args):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(products=500, areas=10, repeat=3, **options):
+    rows = synthetic_region_rows(products, areas)
+    area_names = region_preference(rows)[0]
+    legacy = _best_of(legacy_region_allocation, repeat, rows, area_names)
+    vectorized = _best_of(region_preference, repeat, rows)
+    # 单独统计矩阵分配本身（不含聚合行转换与字符串格式化）
+    matrix = _best_of(allocate_stock, repeat, build_matrix(rows)[2])
+    return {
+        'products': products,
+        'areas': len(area_names),
+        'legacy_seconds': round(legacy, 4),
+        'vectorized_seconds': round(vectorized, 4),
+        'allocate_stock_seconds': round(matrix, 5),
+        'speedup': round(legacy / vectorized, 2) if vectorized else None,
+    }
@@ -0,0 +1,52 @@
+import tempfile
+
+from django.test import override_settings
+
+from ..analytics.cache import bump_data_version
+from ..analytics.inventory import daily_sales_by_area
+from ..analytics.market import region_allocation, round_chart_data
+from ..analytics.pricing import load_observations
+from ..analytics.query import duckdb, duckdb_source, reset_duckdb
+from .synthetic import synthetic_game
+from .utils import profile
+
+# 分析查询后端对比：同一套合成比赛数据上，经查询层的各分组聚合分别在 ORM（主数据库）与 DuckDB 上执行。
+# warm 为数据未变化时的重复查询；cold 在每次查询前更新数据版本号，Parquet 来源下包含重新导出快照的时间。
+
+FUNCTIONS = {
+    'round_chart_data': round_chart_data,
+    'region_allocation': region_allocation,
+    'daily_sales_by_area': daily_sales_by_area,
+    'load_observations': load_observations,
+}
+
+
+def backends():
+    """参与对比的 {名称: 配置}；DuckDB 挂载 SQLite 只在主数据库为 SQLite 文件时可用"""
+    result = {'django': {'ERPSIM_ANALYTICS_BACKEND': 'django'}}
+    if duckdb is not None:
+        result['duckdb_parquet'] = {'ERPSIM_ANALYTICS_BACKEND': 'duckdb', 'ERPSIM_DUCKDB_SOURCE': 'parquet'}
+        with override_settings(ERPSIM_DUCKDB_SOURCE='sqlite'):
+            if duckdb_source() == 'sqlite':
+                result['duckdb_sqlite'] = {'ERPSIM_ANALYTICS_BACKEND': 'duckdb', 'ERPSIM_DUCKDB_SOURCE': 'sqlite'}
+    return result
+
+
+def run(days=20, materials=24, areas=5, teams=8, repeat=3, **options):
+    result = {'days': days, 'materials': materials, 'areas': areas, 'teams': teams}
+    with synthetic_game(days, materials, areas, teams) as (_, rows), tempfile.TemporaryDirectory() as tmp:
+        result['market_rows'] = rows['MAR']
+        for backend, config in backends().items():
+            reset_duckdb()
+            with override_settings(ERPSIM_PARQUET_DIR=tmp, **config):
+                for name, func in FUNCTIONS.items():
+                    def cold():
+                        bump_data_version()
+                        return func()
+
+                    func()
+                    for state, call in (('cold', cold), ('warm', func)):
+                        stats = profile(call, repeat=repeat)
+                        result.update({f'{backend}_{name}_{state}_{key}': value for key, value in stats.items()})
+        reset_duckdb()
+    return result
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.contrib.auth import get_user_model
+from django.test import Client, override_settings
+
+from ..analytics.cache import bump_data_version, cached_section
+from ..analytics.service import market_sections
+from ..analytics.summary import refresh_market_summary
+from .purge import write_market_rows
+from .utils import benchmark_database
+
+
+async def asgi_get(application, path, cookie):
+    """直接调用 ASGI 应用（与 ERP/asgi.py 中 uvicorn 等服务器的调用方式相同），返回状态码"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    messages, requests = [], [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # 请求体之后 Django 等待断开连接，响应完成后会取消这个等待
+        await asyncio.Future()
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    return messages[0]['status']
+
+
+def sequential_sections():
+    """各区块依次计算的耗时 {区块名: 秒}"""
+    seconds = {}
+    for name, (builder, key_parts) in market_sections(rounds=True).items():
+        start = time.perf_counter()
+        cached_section(name, builder, *key_parts)
+        seconds[name] = time.perf_counter() - start
+    return seconds
+
+
+def timed_request(application, cookie):
+    # 每次请求前更新数据版本号，模拟导入后缓存全部失效的首次访问
+    bump_data_version()
+    start = time.perf_counter()
+    status = async_to_sync(asgi_get)(application, '/api/market-dashboard/', cookie)
+    assert status == 200, status
+    return time.perf_counter() - start
+
+
+@contextmanager
+def query_delay(seconds):
+    """
+    每条查询额外等待 seconds 秒，模拟在独立数据库服务器（MySQL）上执行查询时应用进程的等待。
+
+    进程内的 SQLite 查询占用应用自己的 CPU，单核机器上并发计算看不出差别；查询在数据库服务器上执行时应用线程只是等待，
+    各区块的等待可以重叠。工作线程的连接是新建的，通过 connection_created 信号挂上同样的等待。
+    """
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        connection.execute_wrappers.append(wrapper)
+
+    if not seconds:
+        yield
+        return
+    connection_created.connect(install)
+    connection.execute_wrappers.append(wrapper)
+    try:
+        yield
+    finally:
+        connection.execute_wrappers.remove(wrapper)
+        connection_created.disconnect(install)
+
+
+def measure(application, cookie, repeat):
+    sections = []
+    for _ in range(repeat):
+        bump_data_version()
+        sections.append(sequential_sections())
+    concurrent = [timed_request(application, cookie) for _ in range(repeat)]
+    with override_settings(ERPSIM_ANALYTICS_WORKERS=1):
+        sequential = [timed_request(application, cookie) for _ in range(repeat)]
+    result = {f'{name}_seconds': round(statistics.median(s[name] for s in sections), 3) for name in sections[0]}
+    result['sum_of_sections_seconds'] = round(statistics.median(sum(s.values()) for s in sections), 3)
+    result['slowest_section_seconds'] = round(statistics.median(max(s.values()) for s in sections), 3)
+    result['asgi_sequential_seconds'] = round(statistics.median(sequential), 3)
+    result['asgi_concurrent_seconds'] = round(statistics.median(concurrent), 3)
+    return result
+
+
+def run(rows=300000, repeat=3, query_delay_ms=50, **options):
+    """先在进程内 SQLite 上测量，再给每条查询加 query_delay_ms 毫秒模拟独立的数据库服务器"""
+    from ERP.asgi import application
+
+    result = {'rows': rows, 'cpus': os.cpu_count()}
+    with benchmark_database(), override_settings(ALLOWED_HOSTS=['testserver']):
+        write_market_rows(rows)
+        refresh_market_summary()
+        user = get_user_model().objects.create_superuser('benchmark', 'benchmark@example.com', 'benchmark')
+        client = Client()
+        client.force_login(user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        for delay in (0, query_delay_ms):
+            with query_delay(delay / 1000):
+                timings = measure(application, cookie, repeat)
+            result.update({f'delay_{delay}ms_{name}': value for name, value in timings.items()})
+    return result
@@ -0,0 +1,34 @@
+from ..admin import MarketData
+from ..exports import pa, stream_export
+from .purge import write_market_rows
+from .utils import benchmark_database, peak_memory, timed
+
+
+def _drain(fmt):
+    # 与 StreamingHttpResponse 一样逐块取走输出，只统计字节数
+    _, chunks = stream_export('market', fmt)
+    return sum(len(chunk) for chunk in chunks)
+
+
+def _legacy_export():
+    # 原先后台的导出：import-export 先把整个 queryset 读入 tablib 数据集，再整体转换为 CSV
+    return len(MarketData().export().csv)
+
+
+def run(rows=1000000, legacy_rows=100000, **options):
+    formats = ['csv', 'parquet'] if pa is not None else ['csv']
+    with benchmark_database():
+        write_market_rows(legacy_rows)
+        result = {'legacy_rows': legacy_rows}
+        _, result['legacy_peak_memory_mb'] = peak_memory(_legacy_export)
+        _, result['stream_peak_memory_mb_at_legacy_rows'] = peak_memory(_drain, 'csv')
+
+        write_market_rows(rows - legacy_rows, seed=1)
+        result['rows'] = rows
+        for fmt in formats:
+            size, seconds = timed(_drain, fmt)
+            result[f'{fmt}_mb'] = round(size / 1024 / 1024, 1)
+            result[f'{fmt}_seconds'] = round(seconds, 2)
+            result[f'{fmt}_rows_per_second'] = round(rows / seconds)
+            _, result[f'{fmt}_peak_memory_mb'] = peak_memory(_drain, fmt)
+    return result
@@ -0,0 +1,54 @@
+import os
+import random
+from datetime import date, timedelta
+
+from ..analytics.forecast import refit_forecasts
+from ..analytics.games import active_game_id
+from ..models import DemandForecast, MarketSalesSummary
+from .utils import benchmark_database, timed
+
+# 至少两个进程，单核机器上也走进程池路径
+POOL_WORKERS = max(os.cpu_count() or 1, 2)
+
+
+def write_summary_days(materials, areas, days, first_day=0, seed=0):
+    """在汇总表中写入 materials × areas 条序列的 days 天数据（带趋势与噪声）"""
+    rng = random.Random(seed + first_day)
+    start = date(2025, 1, 1)
+    rows = []
+    game = active_game_id()
+    for m in range(materials):
+        for a in range(areas):
+            base, slope = 50000 + 1000 * m, 100 * (a - 1)
+            for d in range(first_day, first_day + days):
+                qty = max(base + slope * d + rng.gauss(0, 3000), 0)
+                rows.append(MarketSalesSummary(
+                    game_id=game, date=start + timedelta(days=d),
+                    material_description=f'Product {m:03d}', area=f'Area {a}',
+                    qty_sum=qty, value_sum=qty * 5, min_price=5, max_price=5, row_count=1,
+                ))
+    MarketSalesSummary.objects.bulk_create(rows, batch_size=2000)
+
+
+def run(materials=50, areas=3, days=80, repeat=3, **options):
+    with benchmark_database():
+        write_summary_days(materials, areas, days - 1)
+        serial = min(timed(_full_refit, 1)[1] for _ in range(repeat))
+        parallel = min(timed(_full_refit, POOL_WORKERS)[1] for _ in range(repeat))
+        # 追加最后一天，只做增量更新
+        write_summary_days(materials, areas, 1, first_day=days - 1)
+        stats, incremental = timed(refit_forecasts)
+    return {
+        'series': materials * areas,
+        'days': days,
+        'full_refit_serial_seconds': round(serial, 3),
+        'full_refit_pool_seconds': round(parallel, 3),
+        'pool_workers': POOL_WORKERS,
+        'incremental_seconds': round(incremental, 3),
+        'incremental_series': stats['incremental'],
+    }
+
+
+def _full_refit(workers):
+    DemandForecast.objects.all().delete()
+    return refit_forecasts(full=True, workers=workers)
@@ -0,0 +1,117 @@
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from ..analytics.group_chart import GROUP_COLUMNS, build_group_charts, market_by_round
+
+
+def synthetic_rows(materials=50, rounds=4, market_rows=10000, seed=0):
+    """生成与 EXPORT_*MAR / DETAIL 结构一致的市场数据与小组数据（dict 列表）"""
+    rng = random.Random(seed)
+    mats = [f"{'1kg' if i % 2 else '500g'} Product {i:03d} Muesli" for i in range(materials)]
+    market = []
+    while len(market) < market_rows:
+        r = rng.randint(1, rounds)
+        market.append({
+            'material_description': rng.choice(mats),
+            'date': date(2025, r, rng.randint(5, 20)),
+            'price': round(rng.uniform(3, 8), 2),
+        })
+    group = [
+        {'material_description': mat, 'round': r, 'day': d, 'price': round(rng.uniform(3, 8), 2)}
+        for mat in mats for r in range(1, rounds + 1) for d in range(5, 21) if rng.random() < 0.5
+    ]
+    return market, group
+
+
+def legacy_build(market_data, group_data):
+    """重构前 GroupSalesDataAdmin.changelist_view 中的逐格 Python 实现，用于对比"""
+    round_ranges = {1: ('01-05', '01-20'), 2: ('02-05', '02-20'), 3: ('03-05', '03-20'), 4: ('04-05', '04-20')}
+    round_days = {}
+    for r, (start, end) in round_ranges.items():
+        start_date = date(2025, int(start.split('-')[0]), int(start.split('-')[1]))
+        end_date = date(2025, int(end.split('-')[0]), int(end.split('-')[1]))
+        days = []
+        d = start_date
+        while d <= end_date:
+            days.append(d)
+            d += timedelta(days=1)
+        round_days[r] = days
+
+    all_mats = set([x['material_description'] for x in market_data] + [x['material_description'] for x in group_data])
+    mats_1kg = [m for m in all_mats if '1kg' in m]
+    mats_500g = [m for m in all_mats if '500g' in m]
+
+    market_dict = defaultdict(lambda: defaultdict(list))
+    for row in market_data:
+        market_dict[row['material_description']][str(row['date'])].append(row['price'])
+    group_dict = defaultdict(lambda: defaultdict(dict))
+    for row in group_data:
+        group_dict[row['material_description']][int(row['round'])][int(row['day'])] = row['price']
+
+    def build_chart_data(mats):
+        all_years = set(str(row['date'])[:4] for row in market_data)
+        use_year = sorted(all_years)[-1] if all_years else str(datetime.now().year)
+        round_group = {
+            1: [(1, 5, 5), (6, 10, 10), (11, 15, 15), (16, 20, 20)],
+            2: [(5, 10, 10), (11, 15, 15), (16, 20, 20)],
+            3: [(5, 10, 10), (11, 15, 15), (16, 20, 20)],
+            4: [(5, 10, 10), (11, 15, 15), (16, 20, 20)],
+        }
+        result = {}
+        for r, days in round_days.items():
+            result[r] = {}
+            for mat in mats:
+                mat_market = market_dict[mat]
+                day_to_market = {}
+                for start, end, ref_day in round_group[r]:
+                    prices = mat_market.get(f"{use_year}-{r:02d}-{ref_day:02d}", [])
+                    max_price = max(prices) if prices else None
+                    min_price = min(prices) if prices else None
+                    for d in days:
+                        if start <= d.day <= end:
+                            day_to_market[d] = {'max': max_price, 'min': min_price}
+                group_prices = group_dict[mat][r] if mat in group_dict and r in group_dict[mat] else {}
+                x_list, market_max, market_min, group_price = [], [], [], []
+                for d in days:
+                    x_list.append(f"{r}-{d.day:02d}")
+                    market_price_data = day_to_market.get(d, {'max': None, 'min': None})
+                    market_max.append(market_price_data['max'])
+                    market_min.append(market_price_data['min'])
+                    group_price.append(group_prices.get(d.day))
+                result[r][mat] = {'x': x_list, 'market_max': market_max, 'market_min': market_min, 'group_price': group_price}
+        return result
+
+    return build_chart_data(mats_1kg), build_chart_data(mats_500g), mats_1kg, mats_500g
+
+
+def vectorized_build(market_data, group_data):
+    market = market_by_round(pd.DataFrame.from_records(market_data, columns=['material_description', 'date', 'price']))
+    group = pd.DataFrame.from_records(group_data, columns=GROUP_COLUMNS)
+    return build_group_charts(market, group)
+
+
+def _best_of(func, repeat, *args):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(materials=50, rounds=4, market_rows=10000, repeat=3, **options):
+    market, group = synthetic_rows(materials, rounds, market_rows)
+    legacy = _best_of(legacy_build, repeat, market, group)
+    vectorized = _best_of(vectorized_build, repeat, market, group)
+    return {
+        'materials': materials,
+        'market_rows': len(market),
+        'group_rows': len(group),
+        'legacy_seconds': round(legacy, 4),
+        'vectorized_seconds': round(vectorized, 4),
+        'speedup': round(legacy / vectorized, 2) if vectorized else None,
+    }
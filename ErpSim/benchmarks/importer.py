@@ -0,0 +1,63 @@
+import os
+import random
+import tempfile
+
+import tablib
+from openpyxl import Workbook
+
+from ..admin import MarketData
+from ..importers import MARKET_SPEC, bulk_import
+from ..models import MarketSalesData
+from .utils import benchmark_database, peak_memory, timed
+
+MARKET_HEADERS = ['Date', 'Material Description', 'Area', 'Qty', 'Value', 'Price']
+
+
+def write_market_export(path, rows, seed=0):
+    """生成与 EXPORT_*MAR.xlsx 结构一致的合成市场数据文件（MM/DD 日期，North/South/West 三个区域）"""
+    rng = random.Random(seed)
+    days = [f"{m:02d}/{d:02d}" for m in range(1, 5) for d in range(5, 21)]
+    areas = ['North', 'South', 'West']
+    per_material = len(days) * len(areas)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    sheet.append(MARKET_HEADERS)
+    for i in range(rows):
+        material, rest = divmod(i, per_material)
+        day, area = divmod(rest, len(areas))
+        qty = rng.randint(1000, 150000)
+        price = round(rng.uniform(3, 8), 2)
+        sheet.append([days[day], f"{'1kg' if material % 2 else '500g'} Product {material:04d} Muesli",
+                      areas[area], qty, round(qty * price), price])
+    workbook.save(path)
+
+
+def _legacy_import(path):
+    with open(path, 'rb') as f:
+        dataset = tablib.Dataset().load(f.read(), format='xlsx')
+    return MarketData().import_data(dataset, dry_run=False)
+
+
+def run(rows=100000, legacy_rows=2000, **options):
+    with tempfile.TemporaryDirectory() as tmp, benchmark_database():
+        path = os.path.join(tmp, 'EXPORT_MAR.xlsx')
+        write_market_export(path, rows)
+        stats, seconds = timed(bulk_import, path, MARKET_SPEC)
+        MarketSalesData.objects.all().delete()
+        _, peak_mb = peak_memory(bulk_import, path, MARKET_SPEC)
+        # 再导入一次同一文件：全部命中已有记录，走批量更新
+        reimport, reimport_seconds = timed(bulk_import, path, MARKET_SPEC)
+
+        MarketSalesData.objects.all().delete()
+        legacy_path = os.path.join(tmp, 'EXPORT_MAR_small.xlsx')
+        write_market_export(legacy_path, legacy_rows)
+        _, legacy_seconds = timed(_legacy_import, legacy_path)
+    return {
+        'rows': stats['rows'],
+        'bulk_seconds': round(seconds, 2),
+        'bulk_rows_per_second': round(stats['rows'] / seconds),
+        'bulk_peak_memory_mb': peak_mb,
+        'bulk_reimport_rows_per_second': round(reimport['rows'] / reimport_seconds),
+        'legacy_rows': legacy_rows,
+        'legacy_rows_per_second': round(legacy_rows / legacy_seconds),
+    }
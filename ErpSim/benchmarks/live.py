@@ -0,0 +1,75 @@
+import statistics
+import time
+from datetime import date
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from ..analytics.cache import bump_data_version, get_data_version
+from ..analytics.live import live_state, live_update
+from ..analytics.summary import refresh_market_summary
+from ..models import MarketSalesData
+from ..views import live_events
+from .purge import write_market_rows
+from .utils import benchmark_database, timed
+
+# write_market_rows 写入的最后一天
+LATEST_DAY = date(2025, 4, 20)
+
+
+def import_day():
+    """模拟比赛中每天导入一次：改写最新一天的数据、刷新汇总并更新数据版本号"""
+    MarketSalesData.objects.filter(date=LATEST_DAY).update(qty=F('qty') + 1)
+    refresh_market_summary([LATEST_DAY])
+    bump_data_version()
+
+
+def full_reload(client):
+    # 原来的做法：导入后整页刷新，看板各区块重新计算并渲染列表，再加载轮次图表数据
+    import_day()
+    start = time.perf_counter()
+    client.get(reverse('admin:ErpSim_marketsalesdata_changelist'))
+    client.get(reverse('erpsim:market_rounds'))
+    return time.perf_counter() - start
+
+
+async def live_latencies(repeat):
+    """导入完成（版本号更新）到页面收到 update 事件的时间，含轮询等待"""
+    game, cursor = await sync_to_async(live_state)()
+    events = live_events(await sync_to_async(get_data_version)(), game, cursor)
+    await events.__anext__()
+    latencies = []
+    try:
+        for _ in range(repeat):
+            await sync_to_async(import_day)()
+            start = time.perf_counter()
+            await events.__anext__()
+            latencies.append(time.perf_counter() - start)
+    finally:
+        await events.aclose()
+    return latencies
+
+
+def run(rows=100000, repeat=5, **options):
+    with benchmark_database(), override_settings(ALLOWED_HOSTS=['testserver']):
+        write_market_rows(rows)
+        refresh_market_summary()
+        user = get_user_model().objects.create_superuser('benchmark', 'benchmark@example.com', 'benchmark')
+        client = Client()
+        client.force_login(user)
+        reloads = [full_reload(client) for _ in range(repeat)]
+        latencies = async_to_sync(live_latencies)(repeat)
+        # 推送内容本身的计算时间（不含轮询等待）
+        import_day()
+        game, cursor = live_state()
+        _, delta_seconds = timed(live_update, game, cursor)
+    return {
+        'rows': rows,
+        'full_reload_median_seconds': round(statistics.median(reloads), 3),
+        'live_delta_seconds': round(delta_seconds, 3),
+        'live_median_seconds': round(statistics.median(latencies), 3),
+        'live_max_seconds': round(max(latencies), 3),
+    }
@@ -0,0 +1,102 @@
+import statistics
+import threading
+import time
+from collections import defaultdict
+
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+
+from ..analytics.cache import bump_data_version
+from .synthetic import material_names, synthetic_game
+from .utils import admin_client
+
+# 压测：多个线程各用一个已登录的测试客户端（进程内 WSGI 调用，不经过网络），轮流请求看板页面与接口，
+# 统计各地址与整体的 p50/p95 延迟。warm 场景缓存一直有效；churn 场景另有线程每隔 invalidate_interval 秒
+# 更新一次数据版本号，模拟比赛中队友导入新数据时其他人仍在刷新看板。
+
+
+def dashboard_urls(materials):
+    """{名称: 地址}"""
+    return {
+        'market_changelist': reverse('admin:ErpSim_marketsalesdata_changelist'),
+        'group_changelist': reverse('admin:ErpSim_groupsalesdata_changelist'),
+        'market_dashboard': reverse('erpsim:market_dashboard'),
+        'market_rounds': reverse('erpsim:market_rounds'),
+        'group_chart': reverse('erpsim:group_chart', args=[1, material_names(materials)[0]]),
+    }
+
+
+def percentile(values, p):
+    """p 取 1-99；只有一个样本时返回该样本"""
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[p - 1]
+
+
+def _worker(client, urls, count, offset, latencies, errors):
+    names = list(urls)
+    try:
+        for i in range(count):
+            name = names[(offset + i) % len(names)]
+            start = time.perf_counter()
+            response = client.get(urls[name])
+            latencies[name].append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors.append((name, response.status_code))
+    finally:
+        connections.close_all()
+
+
+def drive(clients, urls, requests, invalidate_interval=None):
+    """clients 中每个客户端一个线程，各发 requests 个请求；返回 ({名称: [秒, ...]}, 错误列表, 总耗时秒)"""
+    latencies, errors = defaultdict(list), []
+    stop = threading.Event()
+
+    def invalidate():
+        while not stop.wait(invalidate_interval):
+            bump_data_version()
+
+    threads = [
+        threading.Thread(target=_worker, args=(client, urls, requests, i, latencies, errors))
+        for i, client in enumerate(clients)
+    ]
+    if invalidate_interval:
+        threads.append(threading.Thread(target=invalidate))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads[:len(clients)]:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in threads[len(clients):]:
+        thread.join()
+    return latencies, errors, elapsed
+
+
+def summarize(prefix, latencies, errors, elapsed):
+    everything = [value for values in latencies.values() for value in values]
+    result = {
+        f'{prefix}_requests': len(everything),
+        f'{prefix}_errors': len(errors),
+        f'{prefix}_requests_per_second': round(len(everything) / elapsed, 1),
+        f'{prefix}_p50_ms': round(percentile(everything, 50) * 1000, 1),
+        f'{prefix}_p95_ms': round(percentile(everything, 95) * 1000, 1),
+    }
+    for name in sorted(latencies):
+        result[f'{prefix}_{name}_p95_ms'] = round(percentile(latencies[name], 95) * 1000, 1)
+    return result
+
+
+def run(days=20, materials=24, areas=5, teams=8, concurrency=4, requests=25, invalidate_interval=1.0, **options):
+    result = {'concurrency': concurrency, 'requests_per_client': requests}
+    with synthetic_game(days, materials, areas, teams), override_settings(ALLOWED_HOSTS=['testserver']):
+        urls = dashboard_urls(materials)
+        clients = [admin_client() for _ in range(concurrency)]
+        # 先把各页面请求一遍，warm 场景只测缓存命中
+        for url in urls.values():
+            assert clients[0].get(url).status_code == 200, url
+        result.update(summarize('warm', *drive(clients, urls, requests)))
+        result.update(summarize('churn', *drive(clients, urls, requests, invalidate_interval)))
+    return result
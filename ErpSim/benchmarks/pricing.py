@@ -0,0 +1,89 @@
+import numpy as np
+
+from ..analytics.games import active_game_id
+from ..analytics.materials import ensure_materials
+from ..analytics.pricing import demand_curves, fit_curves, recommend_prices
+from ..analytics.summary import refresh_market_summary
+from ..models import GroupSalesData, MarketSalesData
+from .allocation import _best_of
+from .utils import benchmark_database, timed
+
+AREAS = ['North', 'South', 'West']
+
+
+def synthetic_observations(materials=100, per_material=240, seed=0):
+    """生成 (物料序号, 相对价格 x, qty)，每个物料的真实曲线 qty = a - b·x 加噪声"""
+    rng = np.random.default_rng(seed)
+    codes = np.repeat(np.arange(materials), per_material)
+    x = rng.uniform(0, 1, codes.size)
+    a = rng.uniform(500, 1500, materials)
+    b = rng.uniform(200, 800, materials)
+    qty = a[codes] - b[codes] * x + rng.normal(0, 20, codes.size)
+    return codes, x, qty
+
+
+def legacy_fit(codes, x, qty, count):
+    """逐物料调用 np.polyfit 的写法，用于对比"""
+    a, b = np.full(count, np.nan), np.full(count, np.nan)
+    for i in range(count):
+        mask = codes == i
+        if mask.sum() >= 2:
+            b[i], a[i] = np.polyfit(x[mask], qty[mask], 1)
+    return a, b
+
+
+def write_pricing_rows(materials=100, rounds=4, days=20, seed=0):
+    """写入 materials 个物料的市场数据（每轮 4 个报告日）与小组销售（每天每个区域一条）"""
+    rng = np.random.default_rng(seed)
+    game = active_game_id()
+    names = [f"{'1kg' if i % 2 else '500g'} Product {i:03d} Muesli" for i in range(materials)]
+    ids = ensure_materials(names)
+    market, group = [], []
+    for i, mat in enumerate(names):
+        low, high = rng.uniform(3, 5), rng.uniform(6, 9)
+        for round_num in range(1, rounds + 1):
+            for day in range(5, days + 1, 5):
+                for area in AREAS:
+                    for price in (low, high):
+                        market.append(MarketSalesData(
+                            game_id=game, product_id=ids[mat], date=f'2025-{round_num:02d}-{day:02d}',
+                            material_description=mat, area=area, qty=1000, value=1000 * price, price=price,
+                            round=round_num, game_day=day,
+                        ))
+            for day in range(1, days + 1):
+                for area in AREAS:
+                    price = rng.uniform(low, high)
+                    qty = max(0.0, 1200 - 900 * (price - low) / (high - low) + rng.normal(0, 30))
+                    group.append(GroupSalesData(
+                        game_id=game, product_id=ids[mat], round=round_num, day=day, area=area[:2].upper(),
+                        sloc='02N', distribution_channel='12', material=f'M-{i:03d}', material_description=mat,
+                        price=price, qty=qty, value=price * qty, cost=0,
+                    ))
+    MarketSalesData.objects.bulk_create(market, batch_size=5000)
+    GroupSalesData.objects.bulk_create(group, batch_size=5000)
+    refresh_market_summary()
+    return names
+
+
+def run(materials=100, repeat=5, **options):
+    codes, x, qty = synthetic_observations(materials)
+    legacy = _best_of(legacy_fit, repeat, codes, x, qty, materials)
+    vectorized = _best_of(fit_curves, repeat, codes, x, qty, materials)
+    with benchmark_database():
+        names = write_pricing_rows(materials)
+        curves, curve_seconds = timed(demand_curves)
+        cost_dict = {mat: 2.5 for mat in names}
+        recommended = _best_of(recommend_prices, repeat, curves, cost_dict)
+        fitted = sum(row['price'] is not None for row in recommend_prices(curves, cost_dict))
+        group_rows = GroupSalesData.objects.count()
+    return {
+        'materials': materials,
+        'observations': int(codes.size),
+        'legacy_fit_seconds': round(legacy, 5),
+        'vectorized_fit_seconds': round(vectorized, 5),
+        'speedup': round(legacy / vectorized, 1) if vectorized else None,
+        'group_rows': group_rows,
+        'demand_curves_seconds': round(curve_seconds, 4),
+        'recommend_seconds': round(recommended, 5),
+        'fitted_materials': fitted,
+    }
@@ -0,0 +1,64 @@
+import random
+from datetime import date
+
+from django.db import transaction
+
+from ..analytics.games import active_game_id
+from ..analytics.summary import refresh_market_summary
+from ..models import MarketSalesData, MarketSalesSummary
+from ..purge import purge
+from .utils import benchmark_database, timed
+
+
+def write_market_rows(rows, seed=0, batch_size=10000):
+    """直接批量写入 rows 条市场数据到当前比赛（4 轮 × 16 天 × 3 区域，物料依次递增）"""
+    rng = random.Random(seed)
+    game = active_game_id()
+    days = [(date(2025, m, d), m, d) for m in range(1, 5) for d in range(5, 21)]
+    areas = ['North', 'South', 'West']
+    per_material = len(days) * len(areas)
+    for start in range(0, rows, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, rows)):
+            material, rest = divmod(i, per_material)
+            (day, round_num, game_day), area = days[rest // len(areas)], areas[rest % len(areas)]
+            price = round(rng.uniform(3, 8), 2)
+            batch.append(MarketSalesData(
+                game_id=game, date=day, material_description=f'Product {material:05d}', area=area,
+                qty=1000, value=1000 * price, price=price, round=round_num, game_day=game_day,
+            ))
+        MarketSalesData.objects.bulk_create(batch)
+
+
+def _orm_delete():
+    # 原先“一键删除”的做法：Collector 取出全部对象并逐行发送删除信号，再清空汇总表
+    with transaction.atomic():
+        count = MarketSalesData.objects.all().delete()[0]
+        MarketSalesSummary.objects.all().delete()
+    return count
+
+
+def run(rows=1000000, legacy_rows=100000, **options):
+    with benchmark_database():
+        write_market_rows(rows)
+        refresh_market_summary()
+        summary_rows = MarketSalesSummary.objects.count()
+        round_rows, round_seconds = timed(purge, MarketSalesData, rounds=[1])
+        rest_rows, rest_seconds = timed(purge, MarketSalesData)
+
+        write_market_rows(legacy_rows)
+        refresh_market_summary()
+        _, legacy_seconds = timed(_orm_delete)
+    return {
+        'rows': rows,
+        'summary_rows': summary_rows,
+        'round_purge_rows': round_rows,
+        'round_purge_seconds': round(round_seconds, 2),
+        'full_purge_rows': rest_rows,
+        'full_purge_seconds': round(rest_seconds, 2),
+        # 每删除一条市场数据同时删除对应的汇总行
+        'purge_rows_per_second': round((round_rows + rest_rows) / (round_seconds + rest_seconds)),
+        'legacy_rows': legacy_rows,
+        'legacy_seconds': round(legacy_seconds, 2),
+        'legacy_rows_per_second': round(legacy_rows / legacy_seconds),
+    }
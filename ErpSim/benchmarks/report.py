@@ -0,0 +1,75 @@
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+
+# 基准结果的 JSON 报告：记录提交号与运行环境，便于在提交之间对比、在比赛前发现性能回退。
+# 只比较越小越好的指标（耗时、查询数、内存峰值），吞吐量等指标只记录不比较。
+
+LOWER_IS_BETTER = ('_seconds', '_ms', '_queries', '_mb')
+# 耗时差异低于该值（秒）时视为噪声
+MIN_SECONDS_DELTA = 0.005
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(results, options):
+    return {
+        'commit': git_commit(),
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': settings.DATABASES['default']['ENGINE'],
+        'cpus': os.cpu_count(),
+        'options': options,
+        'results': results,
+    }
+
+
+def write_report(path, report):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _delta_floor(key):
+    if key.endswith('_ms'):
+        return MIN_SECONDS_DELTA * 1000
+    if key.endswith('_seconds'):
+        return MIN_SECONDS_DELTA
+    return 0
+
+
+def compare_reports(baseline, report, tolerance=0.2):
+    """
+    两次报告中都有的指标逐项对比，返回回退列表 [(基准名, 指标, 原值, 新值), ...]。
+
+    查询数增加即为回退；耗时与内存超过原值的 (1 + tolerance) 倍且差值超过噪声下限时为回退。
+    """
+    regressions = []
+    for name, current in report['results'].items():
+        previous = baseline['results'].get(name, {})
+        for key, value in current.items():
+            old = previous.get(key)
+            if not key.endswith(LOWER_IS_BETTER) or not isinstance(value, (int, float)) \
+                    or not isinstance(old, (int, float)):
+                continue
+            limit = old if key.endswith('_queries') else max(old * (1 + tolerance), old + _delta_floor(key))
+            if value > limit:
+                regressions.append((name, key, old, value))
+    return regressions
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+# 冷启动基准：在新进程中执行 django.setup()（含 admin 自动发现）与加载 URL 配置，
+# 与 manage.py 命令、gunicorn worker 启动时做的事情相同，并统计期间执行的查询数（应为 0）。
+PROBE_SCRIPT = '''
+import json, time
+started = time.perf_counter()
+import django
+from django.db import connections
+queries = []
+
+def record(execute, sql, params, many, context):
+    queries.append(sql)
+    return execute(sql, params, many, context)
+
+for alias in connections:
+    connections[alias].execute_wrappers.append(record)
+imported = time.perf_counter()
+django.setup()
+ready = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+loaded = time.perf_counter()
+print(json.dumps({
+    'import_seconds': imported - started,
+    'setup_seconds': ready - imported,
+    'urlconf_seconds': loaded - ready,
+    'queries': queries,
+}))
+'''
+
+
+def probe():
+    """在子进程中启动一次 Django，返回探针输出（各阶段耗时与执行的 SQL 列表）及进程总耗时"""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'ERP.settings'))
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE_SCRIPT], cwd=settings.BASE_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process_seconds'] = time.perf_counter() - start
+    return result
+
+
+def run(repeat=3, **options):
+    results = [probe() for _ in range(repeat)]
+
+    def best(key):
+        return round(min(r[key] for r in results), 3)
+
+    return {
+        'process_seconds': best('process_seconds'),
+        'import_seconds': best('import_seconds'),
+        'setup_seconds': best('setup_seconds'),
+        'urlconf_seconds': best('urlconf_seconds'),
+        'queries': max(len(r['queries']) for r in results),
+    }
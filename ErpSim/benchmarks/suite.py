@@ -0,0 +1,102 @@
+import tablib
+from django.test import override_settings
+from django.urls import reverse
+
+from ..admin import GroupSalesDataResource, InventoryDataResource, MarketData, ProductionOrderResource
+from ..analytics.cache import bump_data_version
+from ..analytics.forecast import forecast_rows, refit_forecasts
+from ..analytics.group_chart import group_charts
+from ..analytics.inventory import days_of_cover, production_summary
+from ..analytics.live import market_delta
+from ..analytics.market import product_list, region_allocation, round_chart_data
+from ..analytics.pricing import demand_curves, recommend_prices
+from ..analytics.profit import current_costs, profit_table, refresh_profits, save_costs
+from ..analytics.summary import refresh_market_summary
+from ..importers import EXPORT_SPECS, bulk_import
+from .synthetic import material_names, synthetic_game
+from .utils import admin_client, profile
+
+# 基准套件：在合成比赛数据上逐项测量批量导入、逐行导入资源、各分析函数与两个看板页面，
+# 每项给出耗时、查询数与 Python 内存峰值，结果为扁平字典，便于写成 JSON 在提交之间对比。
+
+RESOURCES = {
+    'MAR': MarketData,
+    'DETAIL': GroupSalesDataResource,
+    'INVENT': InventoryDataResource,
+    'PRODUCTION': ProductionOrderResource,
+}
+
+
+def analytics_functions(cost_dict):
+    """覆盖的分析函数 {名称: 无参调用}；直接调用计算逻辑，不经过看板缓存"""
+    curves = demand_curves()
+    return {
+        'refresh_market_summary': refresh_market_summary,
+        'product_list': product_list,
+        'current_costs': current_costs,
+        'refresh_profits': refresh_profits,
+        'profit_table': profit_table,
+        'region_allocation': region_allocation,
+        'round_chart_data': round_chart_data,
+        'refit_forecasts': lambda: refit_forecasts(full=True),
+        'forecast_rows': forecast_rows,
+        'group_charts': group_charts,
+        'days_of_cover': days_of_cover,
+        'production_summary': production_summary,
+        'demand_curves': demand_curves,
+        'recommend_prices': lambda: recommend_prices(curves, cost_dict),
+        'market_delta': lambda: market_delta(None),
+    }
+
+
+def resource_dataset(path, rows):
+    """导出文件的前 rows 行，逐行导入很慢，只取一部分"""
+    with open(path, 'rb') as f:
+        dataset = tablib.Dataset().load(f.read(), format='xlsx')
+    return tablib.Dataset(*dataset[:rows], headers=dataset.headers)
+
+
+def view_profile(client, url, repeat):
+    """页面的冷启动（数据版本刚更新、缓存全部失效）与缓存命中两种情况"""
+    def cold():
+        bump_data_version()
+        assert client.get(url).status_code == 200
+
+    def warm():
+        assert client.get(url).status_code == 200
+
+    warm()
+    return {'cold': profile(cold, repeat=repeat), 'warm': profile(warm, repeat=repeat)}
+
+
+def _flatten(prefix, stats):
+    return {f'{prefix}_{key}': value for key, value in stats.items()}
+
+
+def run(days=20, materials=24, areas=5, teams=8, repeat=3, resource_rows=500, **options):
+    result = {'days': days, 'materials': materials, 'areas': areas, 'teams': teams}
+    with synthetic_game(days, materials, areas, teams) as (paths, rows), \
+            override_settings(ALLOWED_HOSTS=['testserver']):
+        result.update({f'{export_type.lower()}_rows': count for export_type, count in rows.items()})
+        # 再次导入同一文件：全部命中已有记录，与比赛中每轮重新下载导出文件的情况相同
+        for export_type, spec in EXPORT_SPECS.items():
+            stats = profile(bulk_import, paths[export_type], spec, repeat=1)
+            result.update(_flatten(f'bulk_import_{export_type.lower()}', stats))
+        for export_type, resource in RESOURCES.items():
+            dataset = resource_dataset(paths[export_type], resource_rows)
+            stats = profile(lambda: resource().import_data(dataset, dry_run=True), repeat=1)
+            result.update(_flatten(f'resource_{export_type.lower()}', stats))
+
+        cost_dict = {mat: 2.5 for mat in material_names(materials)}
+        save_costs(cost_dict)
+        for name, func in analytics_functions(cost_dict).items():
+            result.update(_flatten(f'analytics_{name}', profile(func, repeat=repeat)))
+
+        # 看板区块依次计算，查询都在当前线程执行，查询数完整；并发计算的效果见 dashboard 基准
+        client = admin_client()
+        with override_settings(ERPSIM_ANALYTICS_WORKERS=1):
+            for name in ('marketsalesdata', 'groupsalesdata'):
+                url = reverse(f'admin:ErpSim_{name}_changelist')
+                for state, stats in view_profile(client, url, repeat).items():
+                    result.update(_flatten(f'changelist_{name}_{state}', stats))
+    return result
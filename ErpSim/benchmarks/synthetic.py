@@ -0,0 +1,146 @@
+import os
+import random
+import tempfile
+from contextlib import contextmanager
+
+from openpyxl import Workbook
+
+from ..importers import EXPORT_HEADERS, EXPORT_SPECS, bulk_import
+from ..models import RoundCalendar
+from .utils import benchmark_database
+
+# 合成比赛数据：按规模参数生成与 datasets/EXPORT_*.xlsx 表头、取值格式一致的五种导出文件，供基准与压测使用。
+# days 为每轮的游戏天数（市场数据每 5 天一次报告），materials 为物料数（口味 × 500g/1kg 交替），
+# areas 为销售区域数，teams 为队伍数（每队一套物料编码，小组销售、库存、生产与汇总数据按队伍成倍增加）。
+
+FLAVORS = ['Nut', 'Blueberry', 'Strawberry', 'Raisin', 'Original', 'Mixed Fruit']
+AREAS = ['North', 'South', 'West', 'East', 'Central']
+REPORT_INTERVAL = 5
+YEAR = 2025
+
+
+def material_names(materials):
+    """materials=12 时与真实数据的 12 种产品相同"""
+    names = []
+    for i in range(materials):
+        flavor = FLAVORS[i // 2] if i // 2 < len(FLAVORS) else f'Flavor {i // 2:03d}'
+        names.append(f"{'1kg' if i % 2 else '500g'} {flavor} Muesli")
+    return names
+
+
+def area_codes(areas):
+    """[(市场数据中的区域名, 小组数据中的区域代码), ...]"""
+    names = AREAS[:areas] + [f'Area {n}' for n in range(len(AREAS) + 1, areas + 1)]
+    return [(name, name[:2].upper() if name in AREAS else f'A{i}') for i, name in enumerate(names)]
+
+
+def team_codes(teams):
+    return [chr(ord('A') + i // 26) + chr(ord('A') + i % 26) for i in range(teams)]
+
+
+def _write(path, export_type, rows):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    sheet.append(list(EXPORT_HEADERS[export_type]))
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def _market_rows(rng, names, areas, rounds, days):
+    for round_num in range(1, rounds + 1):
+        for day in range(REPORT_INTERVAL, days + 1, REPORT_INTERVAL):
+            for mat in names:
+                for area, _ in areas:
+                    qty = rng.randint(1000, 150000)
+                    price = round(rng.uniform(3, 8), 2)
+                    yield [f'{round_num:02d}/{day:02d}', mat, area, qty, round(qty * price), price]
+
+
+def _group_rows(rng, names, areas, rounds, days, teams):
+    for team in teams:
+        for round_num in range(1, rounds + 1):
+            for day in range(1, days + 1):
+                for i, mat in enumerate(names):
+                    for area, code in areas:
+                        # 真实数据中并非每天每个区域都有成交
+                        if rng.random() < 0.5:
+                            continue
+                        price = round(rng.uniform(3.5, 6), 1)
+                        qty = rng.randint(500, 9000)
+                        yield [str(round_num), str(day), code, f'02{code[0]}', '12', f'{team}-F{i + 1:03d}', mat,
+                               price, qty, round(price * qty, 2), round(qty * rng.uniform(1, 2.5), 2)]
+
+
+def _inventory_rows(rng, names, areas, teams):
+    for team in teams:
+        for location in ['02'] + [f'02{code[0]}' for _, code in areas]:
+            for i, mat in enumerate(names):
+                yield [location, f'{team}-F{i + 1:03d}', mat, float(rng.randint(0, 40000)), 0.0, 'ST']
+
+
+def _production_rows(rng, names, rounds, days, teams):
+    order = 1000000
+    for team in teams:
+        for round_num in range(1, rounds + 1):
+            for mat in names:
+                order += 1
+                start = rng.randint(1, max(days - 2, 1))
+                yield [str(order), mat, f'{round_num:02d}/{start:02d}', f'{round_num:02d}/{min(start + 2, days):02d}',
+                       4.0, f'{round_num:02d}/{max(start - 1, 1):02d}', 48000, rng.choice([0, 48000]),
+                       round(rng.uniform(1, 3), 2)]
+
+
+def _summary_rows(rng, names, rounds, days, teams):
+    for team in teams:
+        for round_num in range(1, rounds + 1):
+            for day in range(1, days + 1):
+                for i, mat in enumerate(names):
+                    qty = rng.randint(0, 20000)
+                    yield [str(round_num), str(day), f'{team}-F{i + 1:03d}', mat, rng.randint(0, 10), qty,
+                           round(qty * 4.0, 2), round(qty * 1.5, 2)]
+
+
+def write_exports(directory, days=20, materials=12, areas=3, teams=1, rounds=4, seed=0):
+    """在 directory 中写入一套 EXPORT_<日期><类型>.xlsx，返回 {类型: 路径}"""
+    # 第 n 轮对应第 n 月，日期须在每个月都有效
+    if not 1 <= days <= 28 or not 1 <= rounds <= 12:
+        raise ValueError("days 须在 1-28 之间，rounds 须在 1-12 之间")
+    rng = random.Random(seed)
+    names, area_list, team_list = material_names(materials), area_codes(areas), team_codes(teams)
+    rows = {
+        'MAR': _market_rows(rng, names, area_list, rounds, days),
+        'DETAIL': _group_rows(rng, names, area_list, rounds, days, team_list),
+        'INVENT': _inventory_rows(rng, names, area_list, team_list),
+        'PRODUCTION': _production_rows(rng, names, rounds, days, team_list),
+        'SUM': _summary_rows(rng, names, rounds, days, team_list),
+    }
+    paths = {}
+    for export_type, export_rows in rows.items():
+        paths[export_type] = os.path.join(directory, f'EXPORT_{YEAR}0605{export_type}.xlsx')
+        _write(paths[export_type], export_type, export_rows)
+    return paths
+
+
+def use_calendar(days=20, rounds=4):
+    """启用与合成数据一致的日历（每轮 1..days 日），使全部市场数据落在轮次内"""
+    RoundCalendar.objects.update(is_active=False)
+    return RoundCalendar.objects.create(name='合成数据', year=YEAR, rounds=rounds, first_day=1, last_day=days,
+                                        report_interval=REPORT_INTERVAL)
+
+
+def load_exports(paths):
+    """批量导入已建模的导出文件（SUM 未建模，跳过），返回 {类型: 读取行数}"""
+    return {
+        export_type: bulk_import(path, EXPORT_SPECS[export_type])['rows']
+        for export_type, path in paths.items() if export_type in EXPORT_SPECS
+    }
+
+
+@contextmanager
+def synthetic_game(days=20, materials=12, areas=3, teams=1, rounds=4, seed=0):
+    """在临时测试库中启用合成日历并导入一套合成导出文件，产出 (路径字典, 各类型读取行数)"""
+    with tempfile.TemporaryDirectory() as tmp, benchmark_database():
+        paths = write_exports(tmp, days, materials, areas, teams, rounds, seed)
+        use_calendar(days, rounds)
+        yield paths, load_exports(paths)
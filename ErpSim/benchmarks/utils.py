@@ -0,0 +1,64 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+
+
+@contextmanager
+def benchmark_database():
+    """在临时测试库中运行基准，避免污染正式数据"""
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def admin_client():
+    """已登录后台超级用户的测试客户端"""
+    user = get_user_model().objects.get_or_create(username='benchmark', defaults={'is_staff': True, 'is_superuser': True})[0]
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def timed(func, *args, **kwargs):
+    """返回 (结果, 耗时秒)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def peak_memory(func, *args, **kwargs):
+    """返回 (结果, Python 分配的内存峰值 MB)，tracemalloc 有额外开销，不要与计时混用"""
+    tracemalloc.start()
+    try:
+        result = func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, round(peak / 1024 / 1024, 1)
+
+
+def profile(func, *args, repeat=3, **kwargs):
+    """
+    返回 {seconds, queries, peak_mb}：耗时取 repeat 次中最快一次，查询数与内存峰值各单独运行一次测量。
+
+    查询数只统计当前线程的默认连接，在工作线程中执行的查询不计入；用 execute_wrapper 计数，
+    不受测试客户端请求开始时清空 connection.queries 的影响。
+    """
+    seconds = min(timed(func, *args, **kwargs)[1] for _ in range(repeat))
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        func(*args, **kwargs)
+    _, peak_mb = peak_memory(func, *args, **kwargs)
+    return {'seconds': round(seconds, 4), 'queries': len(queries), 'peak_mb': peak_mb}
@@ -0,0 +1,204 @@
+import csv
+import io
+from functools import partial
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet 输出是可选的，未安装 pyarrow 时只提供 CSV
+    pa = pq = None
+
+from .analytics.cache import cached_section
+from .analytics.games import game_rows
+from .analytics.group_chart import group_charts
+from .analytics.market import region_allocation_numbers
+from .analytics.profit import profit_table
+from .analytics.pricing import price_recommendations
+from .models import GroupSalesData, InventoryData, MarketSalesData, ProductionOrder
+
+# 流式导出：原始数据用 .iterator(chunk_size) 分块读取、边读边写，内存占用与总行数无关；
+# 派生的分析结果（利润排行、分地区分配、小组价与市场价序列、定价建议）复用看板的缓存结果展开为行。
+# 每个数据集返回 ([(列名, Arrow 类型名), ...], 行迭代器)，类型只在写 Parquet 时使用。
+# ASGI 下由 async_chunks() 在线程中逐块取出，避免 Django 把同步迭代器整个收集成列表再发送。
+
+EXPORT_CHUNK_SIZE = 20000
+EXPORT_FORMATS = ('csv', 'parquet')
+CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'parquet': 'application/vnd.apache.parquet'}
+
+# Django 字段类型 -> Arrow 类型，其余按字符串处理
+FIELD_TYPES = {
+    'AutoField': 'int64', 'BigAutoField': 'int64', 'ForeignKey': 'int64', 'IntegerField': 'int64',
+    'FloatField': 'float64', 'DateField': 'date32', 'BooleanField': 'bool_',
+}
+
+
+def raw_rows(model, **options):
+    """当前比赛中 model 的全部行（不含 id 与比赛外键），按主键顺序分块读取"""
+    fields = [f for f in model._meta.concrete_fields if f.name not in ('id', 'game')]
+    columns = [(f.attname, FIELD_TYPES.get(f.get_internal_type(), 'string')) for f in fields]
+    rows = game_rows(model).order_by('pk').values_list(*[f.attname for f in fields])
+    return columns, rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def profit_rows(**options):
+    """利润排行，成本价为全队共用的当前成本价（未登记为 0）"""
+    ranking = cached_section('market_profit', profit_table)
+    columns = [
+        ('rank', 'int64'), ('material_description', 'string'), ('qty', 'float64'), ('price', 'float64'),
+        ('cost', 'float64'), ('profit', 'float64'), ('margin', 'float64'), ('qty_rank', 'int64'),
+    ]
+    return columns, (tuple(item[name] for name, _ in columns) for item in ranking)
+
+
+def pricing_rows(**options):
+    """定价建议，成本价同利润排行"""
+    columns = [
+        ('material_description', 'string'), ('observations', 'int64'), ('market_low', 'float64'),
+        ('market_high', 'float64'), ('cost', 'float64'), ('slope', 'float64'), ('elasticity', 'float64'),
+        ('price', 'float64'), ('qty', 'float64'), ('profit', 'float64'),
+    ]
+    rows = price_recommendations()
+    return columns, (tuple(row[name] for name, _ in columns) for row in rows)
+
+
+def region_rows(**options):
+    """分地区偏好排行与应分配库存，每个产品每个区域一行；ratio 为区域份额（0-1），不是看板上放大后的比例"""
+    areas, ranking = cached_section('market_region_numbers', region_allocation_numbers)
+    columns = [
+        ('rank', 'int64'), ('material_description', 'string'), ('area', 'string'), ('qty', 'float64'),
+        ('ratio', 'float64'), ('stock', 'int64'), ('forecast', 'float64'), ('on_hand', 'int64'),
+        ('replenish', 'int64'),
+    ]
+
+    def rows():
+        missing = [None] * len(areas)
+        for row in ranking:
+            ratio, forecast = row['ratio'] or missing, row['forecast'] or missing
+            on_hand, replenish = row['on_hand'] or missing, row['replenish'] or missing
+            for i, area in enumerate(areas):
+                yield (row['rank'], row['material_description'], area, row['qty'][i],
+                       ratio[i], row['stock'][i], forecast[i], on_hand[i], replenish[i])
+
+    return columns, rows()
+
+
+def group_price_rows(**options):
+    """小组价格与市场最高/最低价的逐日序列（与价格对比图相同），每个产品每个游戏日一行"""
+    chart_1kg, chart_500g, _, _ = cached_section('group_chart_series', group_charts)
+    columns = [
+        ('material_description', 'string'), ('package_size', 'string'), ('round', 'int64'), ('game_day', 'int64'),
+        ('market_max', 'float64'), ('market_min', 'float64'), ('group_price', 'float64'),
+    ]
+
+    def rows():
+        for package_size, charts in (('1kg', chart_1kg), ('500g', chart_500g)):
+            for round_num, series_map in charts.items():
+                for mat, series in series_map.items():
+                    for i, x in enumerate(series['x']):
+                        yield (mat, package_size, round_num, int(x.split('-')[1]),
+                               series['market_max'][i], series['market_min'][i], series['group_price'][i])
+
+    return columns, rows()
+
+
+DATASETS = {
+    'market': partial(raw_rows, MarketSalesData),
+    'group': partial(raw_rows, GroupSalesData),
+    'inventory': partial(raw_rows, InventoryData),
+    'production': partial(raw_rows, ProductionOrder),
+    'profit_ranking': profit_rows,
+    'region_allocation': region_rows,
+    'group_prices': group_price_rows,
+    'price_recommendations': pricing_rows,
+}
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def csv_chunks(columns, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """按块生成 UTF-8 编码的 CSV 字节串，第一块为表头"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    for batch in _batches(rows, chunk_size):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ParquetSink:
+    """只暂存尚未取走字节的输出文件；写入位置持续累加，Parquet 尾部记录的偏移量仍然正确"""
+
+    def __init__(self):
+        self.pending = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.pending.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.pending)
+        self.pending.clear()
+        return data
+
+
+def parquet_chunks(columns, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """每块写成一个行组后立即取出已写好的字节串，需要 pyarrow"""
+    schema = pa.schema([(name, getattr(pa, type_name)()) for name, type_name in columns])
+    sink = _ParquetSink()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema) as writer:
+        for batch in _batches(rows, chunk_size):
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def stream_export(dataset, fmt='csv', **options):
+    """
+    数据集 dataset 的导出内容，返回 (实际格式, 字节串迭代器)。
+
+    请求 Parquet 但未安装 pyarrow 时退回 CSV；options 原样传给数据集。
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式：{fmt}")
+    if fmt == 'parquet' and pa is None:
+        fmt = 'csv'
+    columns, rows = DATASETS[dataset](**options)
+    chunks = parquet_chunks if fmt == 'parquet' else csv_chunks
+    return fmt, chunks(columns, rows)
+
+
+async def async_chunks(chunks):
+    """在请求的同步线程中逐块取出 chunks 的异步迭代器（ORM 游标与数据库连接留在同一线程），ASGI 下边读边发"""
+    chunks = iter(chunks)
+    while True:
+        chunk = await sync_to_async(next, thread_sensitive=True)(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
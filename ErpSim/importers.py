@@ -0,0 +1,323 @@
+import os
+import time
+import pandas as pd
+from django.db import models, transaction
+from import_export.signals import post_import
+from openpyxl import load_workbook
+
+from .analytics.games import import_game_id
+from .analytics.materials import ensure_materials
+from .analytics.rounds import get_calendar
+from .analytics.summary import refresh_market_summary
+from .models import GroupSalesData, InventoryData, MarketSalesData, ProductionOrder
+
+# 高吞吐导入：流式读取 Excel、向量化清洗、按哈希去重后分批 bulk_create / bulk_update，整个文件一个事务
+
+
+class BulkImportSpec:
+    """
+    一种 ERPsim 导出文件的批量导入规则。
+
+    export_type: 导出文件类型（文件名 EXPORT_<日期><类型>.xlsx 中的类型，如 MAR / DETAIL）；
+    columns: Excel 表头 -> 模型字段；key_fields: 判断同一条记录的字段（与 import_id_fields 一致）；
+    scope_field: 查找库中已有记录时用于缩小范围的带索引字段；
+    prepare: 可选的 DataFrame 清洗函数，参数为 (DataFrame, 比赛日历)；after_import: 写入后回调，参数为本次涉及的 scope_field 取值集合与 game；
+    derived: prepare 额外生成、一并写入的字段（允许为空，不参与有效行判断）。
+    """
+
+    def __init__(self, export_type, model, columns, key_fields, scope_field, prepare=None, after_import=None,
+                 derived=()):
+        self.export_type = export_type
+        self.model = model
+        self.columns = columns
+        self.key_fields = list(key_fields)
+        self.scope_field = scope_field
+        self.prepare = prepare
+        self.after_import = after_import
+        self.required_fields = list(columns.values())
+        self.fields = self.required_fields + list(derived)
+        # 带 product 外键的事实表写入前先把物料描述登记到物料维表
+        self.links_material = any(f.name == 'product' for f in model._meta.fields)
+        self.update_fields = [f for f in self.fields if f not in self.key_fields]
+
+
+def iter_sheet_chunks(source, chunk_size=5000):
+    """以只读流式模式逐块读取第一个工作表，每块返回一个以表头为列名的 DataFrame"""
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else '' for h in next(rows, ())]
+        width = len(header)
+        chunk = []
+        for row in rows:
+            if not row or all(v is None for v in row):
+                continue
+            chunk.append(tuple(row[:width]) + (None,) * (width - len(row)))
+            if len(chunk) >= chunk_size:
+                yield pd.DataFrame.from_records(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame.from_records(chunk, columns=header)
+    finally:
+        workbook.close()
+
+
+def normalize_dates(values, year=None):
+    """把 MM/DD 形式的日期批量补全年份（默认取比赛日历的年份，与 MarketData.before_import_row 一致），其余按日期解析"""
+    year = str(year or get_calendar().import_year())
+    text = pd.Series(values).astype(str).str.strip()
+    month_day = text.str.fullmatch(r'\d{1,2}/\d{1,2}')
+    text = text.where(~month_day, year + '-' + text.str.replace('/', '-', regex=False))
+    return pd.to_datetime(text, errors='coerce', format='mixed').dt.normalize()
+
+
+def _coerce_types(frame, model, fields):
+    # 按模型字段类型统一 dtype，保证文件中的数据与库中数据的哈希一致
+    frame = frame.copy()
+    for name in fields:
+        field = model._meta.get_field(name)
+        if isinstance(field, models.DateField):
+            frame[name] = pd.to_datetime(frame[name], errors='coerce').dt.normalize()
+        elif isinstance(field, models.FloatField):
+            frame[name] = pd.to_numeric(frame[name], errors='coerce').astype(float)
+        elif isinstance(field, models.IntegerField):
+            frame[name] = pd.to_numeric(frame[name], errors='coerce').astype('Int64')
+        else:
+            frame[name] = frame[name].map(lambda v: None if v is None or v != v else str(v))
+    return frame
+
+
+def _key_hash(frame, key_fields):
+    return pd.util.hash_pandas_object(frame[key_fields], index=False).to_numpy()
+
+
+def _records(frame, model, fields):
+    # DataFrame -> 模型实例，日期与整数转回 Python 类型
+    out = frame[fields].astype(object).where(frame[fields].notna(), None)
+    for name in fields:
+        if isinstance(model._meta.get_field(name), models.DateField):
+            out[name] = [v.date() if v is not None else None for v in out[name]]
+    return out.to_dict('records')
+
+
+def _link_materials(spec, frame):
+    # 小组数据带物料编码，顺带补全维表中的编码
+    descriptions = frame['material_description']
+    codes = dict(zip(descriptions, frame['material'])) if 'material' in spec.fields else None
+    ids = ensure_materials(descriptions.unique().tolist(), codes)
+    return frame.assign(product_id=descriptions.map(ids))
+
+
+def _write_chunk(spec, frame, batch_size, game):
+    model = spec.model
+    fields = spec.fields + ['game_id']
+    if spec.links_material:
+        frame = _link_materials(spec, frame)
+        fields.append('product_id')
+    frame = frame.assign(_key=_key_hash(frame, spec.key_fields))
+    # 块内重复记录保留最后一条，与逐行导入时后行覆盖前行一致
+    frame = frame.drop_duplicates('_key', keep='last')
+
+    scope = frame[spec.scope_field].drop_duplicates()
+    if isinstance(model._meta.get_field(spec.scope_field), models.DateField):
+        scope = scope.dt.date
+    scope_values = scope.tolist()
+    existing = pd.DataFrame.from_records(
+        model.objects.filter(game_id=game, **{f'{spec.scope_field}__in': scope_values}).values_list(
+            'id', *spec.key_fields),
+        columns=['id', *spec.key_fields],
+    )
+    existing = _coerce_types(existing, model, spec.key_fields)
+    existing_ids = dict(zip(_key_hash(existing, spec.key_fields), existing['id'])) if len(existing) else {}
+
+    matched = frame['_key'].map(existing_ids)
+    updated = 0
+    if spec.update_fields:
+        # 已存在的记录先删后插，比逐条 CASE WHEN 的 bulk_update 快得多
+        old_ids = matched.dropna().astype(int).tolist()
+        for start in range(0, len(old_ids), batch_size):
+            model.objects.filter(pk__in=old_ids[start:start + batch_size]).delete()
+        updated = len(old_ids)
+        new_rows = frame
+    else:
+        new_rows = frame[matched.isna()]
+    model.objects.bulk_create(
+        [model(**rec) for rec in _records(new_rows.assign(game_id=game), model, fields)], batch_size=batch_size,
+    )
+    return len(new_rows) - updated, updated, scope_values
+
+
+def prepare_chunks(source, spec, chunk_size=5000, calendar=None):
+    """
+    逐块读取并清洗，产出 (清洗后的 DataFrame, 读取行数, 无效行数)。
+
+    calendar 缺省时读取当前比赛日历；传入时不访问数据库，可在子进程中运行。
+    """
+    calendar = calendar or get_calendar()
+    headers = spec.columns
+    for chunk in iter_sheet_chunks(source, chunk_size):
+        missing = [h for h in headers if h not in chunk.columns]
+        if missing:
+            raise ValueError(f"缺少列：{', '.join(missing)}")
+        frame = chunk[list(headers)].rename(columns=headers)
+        if spec.prepare:
+            frame = spec.prepare(frame, calendar)
+        frame = _coerce_types(frame, spec.model, spec.fields)
+        valid = frame[spec.required_fields].notna().all(axis=1)
+        yield frame[valid], len(chunk), int((~valid).sum())
+
+
+def write_chunks(spec, chunks, batch_size=1000, game=None):
+    """把 prepare_chunks 的结果在一个事务中写入 game（默认为导入目标比赛），返回统计信息"""
+    started = time.perf_counter()
+    game = game or import_game_id()
+    stats = {'rows': 0, 'created': 0, 'updated': 0, 'skipped': 0, 'invalid': 0}
+    touched = set()
+    with transaction.atomic():
+        for frame, rows, invalid in chunks:
+            stats['rows'] += rows
+            stats['invalid'] += invalid
+            created, updated, scope_values = _write_chunk(spec, frame, batch_size, game)
+            stats['created'] += created
+            stats['updated'] += updated
+            stats['skipped'] += len(frame) - created - updated
+            touched.update(scope_values)
+        if spec.after_import and touched:
+            spec.after_import(touched, game=game)
+        post_import.send(sender=None, model=spec.model)
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    stats['rows_per_second'] = round(stats['rows'] / stats['seconds']) if stats['seconds'] else None
+    return stats
+
+
+def bulk_import(source, spec, chunk_size=5000, batch_size=1000, game=None):
+    """
+    按 spec 批量导入一个 Excel 文件（路径或文件对象），返回统计信息。
+
+    与 django-import-export 的逐行导入语义一致：同一场比赛中 key_fields 相同的记录视为同一条，已存在则更新其余字段。
+    """
+    return write_chunks(spec, prepare_chunks(source, spec, chunk_size), batch_size, game)
+
+
+def _prepare_market(frame, calendar):
+    dates = normalize_dates(frame['date'], calendar.import_year())
+    # 查表得到轮次与游戏日，0 表示不在轮次区间内（含无法解析的日期），存为空
+    rounds, days, _ = calendar.lookup(dates)
+    in_round = rounds > 0
+    return frame.assign(
+        date=dates.to_numpy(),
+        round=pd.Series(rounds, index=frame.index, dtype='Int64').where(in_round),
+        game_day=pd.Series(days, index=frame.index, dtype='Int64').where(in_round),
+    )
+
+
+MARKET_SPEC = BulkImportSpec(
+    'MAR',
+    MarketSalesData,
+    columns={
+        'Date': 'date', 'Material Description': 'material_description', 'Area': 'area',
+        'Qty': 'qty', 'Value': 'value', 'Price': 'price',
+    },
+    key_fields=('date', 'material_description', 'area'),
+    scope_field='date',
+    prepare=_prepare_market,
+    after_import=refresh_market_summary,
+    derived=('round', 'game_day'),
+)
+
+GROUP_SPEC = BulkImportSpec(
+    'DETAIL',
+    GroupSalesData,
+    columns={
+        'Round': 'round', 'Day': 'day', 'Area': 'area', 'SLoc.': 'sloc',
+        'Distribution Channel': 'distribution_channel', 'Material': 'material',
+        'Material Description': 'material_description', 'Price': 'price', 'Qty': 'qty',
+        'Value': 'value', 'Cost': 'cost',
+    },
+    key_fields=(
+        'round', 'day', 'area', 'sloc', 'distribution_channel',
+        'material', 'material_description', 'price', 'qty', 'value', 'cost',
+    ),
+    # 物料在写入前已关联到维表，按外键缩小范围可走 (比赛, 物料, ...) 索引
+    scope_field='product_id',
+)
+
+# 库存导出是当前时点的快照，同一库存地点 + 物料再次导入时覆盖
+INVENT_SPEC = BulkImportSpec(
+    'INVENT',
+    InventoryData,
+    columns={
+        'Storage Location': 'storage_location', 'Material': 'material',
+        'Material Description': 'material_description', 'Stock': 'stock', 'Reserved': 'reserved',
+        'Base Unit of Measure': 'unit',
+    },
+    key_fields=('storage_location', 'material'),
+    scope_field='material',
+)
+
+
+def _prepare_production(frame, calendar):
+    year = calendar.import_year()
+    return frame.assign(**{
+        name: normalize_dates(frame[name], year).to_numpy() for name in ('start', 'finish', 'released')
+    })
+
+
+PRODUCTION_SPEC = BulkImportSpec(
+    'PRODUCTION',
+    ProductionOrder,
+    columns={
+        'Order': 'order', 'Material Description': 'material_description', 'Start': 'start',
+        'Finish': 'finish', 'Setup': 'setup', 'Released': 'released', 'Target': 'target',
+        'Confirmed': 'confirmed', 'Unit Cost': 'unit_cost',
+    },
+    key_fields=('order',),
+    scope_field='order',
+    prepare=_prepare_production,
+)
+
+# ERPsim 一轮下载的五种导出文件；尚未建模的类型（SUM）会被识别但跳过
+EXPORT_TYPES = ('DETAIL', 'MAR', 'SUM', 'INVENT', 'PRODUCTION')
+EXPORT_SPECS = {spec.export_type: spec for spec in (MARKET_SPEC, GROUP_SPEC, INVENT_SPEC, PRODUCTION_SPEC)}
+EXPORT_HEADERS = {
+    'DETAIL': GROUP_SPEC.columns.keys(),
+    'MAR': MARKET_SPEC.columns.keys(),
+    'SUM': ('Round', 'Day', 'Material', 'Material Description', 'Orders', 'Qty', 'Value', 'Cost'),
+    'INVENT': INVENT_SPEC.columns.keys(),
+    'PRODUCTION': PRODUCTION_SPEC.columns.keys(),
+}
+
+
+def read_header(source):
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        row = next(workbook.worksheets[0].iter_rows(max_row=1, values_only=True), ())
+        return [str(h).strip() for h in row if h is not None]
+    finally:
+        workbook.close()
+
+
+def detect_export_type(path):
+    """按表头识别导出文件类型，表头无法判断时再看文件名后缀；都不匹配返回 None"""
+    header = set(read_header(path))
+    matches = [t for t, columns in EXPORT_HEADERS.items() if set(columns) <= header]
+    if matches:
+        return max(matches, key=lambda t: len(EXPORT_HEADERS[t]))
+    stem = os.path.splitext(os.path.basename(path))[0].upper()
+    for export_type in sorted(EXPORT_TYPES, key=len, reverse=True):
+        if stem.endswith(export_type):
+            return export_type
+    return None
+
+
+def parse_export(path, calendar, chunk_size=5000):
+    """
+    识别并解析一个导出文件，返回 (类型, 清洗后的块列表)；类型未建模时块列表为 None。
+
+    只做读取与清洗，比赛日历由父进程读取后传入，不访问数据库，供进程池并行调用。
+    """
+    export_type = detect_export_type(path)
+    spec = EXPORT_SPECS.get(export_type)
+    if spec is None:
+        return export_type, None
+    return export_type, list(prepare_chunks(path, spec, chunk_size, calendar))
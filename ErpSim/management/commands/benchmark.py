@@ -0,0 +1,51 @@
+import inspect
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ErpSim.benchmarks import BENCHMARKS
+from ErpSim.benchmarks.report import build_report, compare_reports, load_report, write_report
+
+# 合成数据规模参数，只传给带同名参数的基准（suite、load、forecast 等），未指定时使用各基准的默认值
+SCALE_OPTIONS = ('days', 'materials', 'areas', 'teams')
+
+
+class Command(BaseCommand):
+    help = "运行分析模块的性能基准（使用合成数据）"
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f"基准名称，可选：{', '.join(BENCHMARKS)}；不填则全部运行")
+        parser.add_argument('--repeat', type=int, default=3, help="每项重复次数，取最快一次")
+        for name in SCALE_OPTIONS:
+            parser.add_argument(f'--{name}', type=int, help=f"合成数据规模：{name}")
+        parser.add_argument('--json', dest='json_path', help="把结果写入 JSON 文件（含提交号与运行环境）")
+        parser.add_argument('--compare', help="与之前保存的 JSON 结果对比，有性能回退时以错误退出")
+        parser.add_argument('--tolerance', type=float, default=0.2, help="耗时与内存允许的相对增幅，默认 0.2")
+
+    def handle(self, *args, **options):
+        names = options['names'] or list(BENCHMARKS)
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            raise CommandError(f"未知的基准：{', '.join(unknown)}")
+        baseline = load_report(options['compare']) if options['compare'] else None
+        scale = {name: options[name] for name in SCALE_OPTIONS if options[name] is not None}
+
+        results = {}
+        for name in names:
+            run = BENCHMARKS[name]
+            accepted = inspect.signature(run).parameters
+            results[name] = run(repeat=options['repeat'], **{k: v for k, v in scale.items() if k in accepted})
+            self.stdout.write(self.style.SUCCESS(name))
+            for key, value in results[name].items():
+                self.stdout.write(f"  {key}: {value}")
+
+        report = build_report(results, {'repeat': options['repeat'], **scale})
+        if options['json_path']:
+            write_report(options['json_path'], report)
+            self.stdout.write(f"结果已写入 {options['json_path']}")
+        if baseline is not None:
+            regressions = compare_reports(baseline, report, options['tolerance'])
+            for name, key, old, new in regressions:
+                self.stdout.write(self.style.WARNING(f"  {name}.{key}: {old} -> {new}"))
+            if regressions:
+                raise CommandError(f"与 {baseline['commit'] or options['compare']} 相比有 {len(regressions)} 项性能回退")
+            self.stdout.write(self.style.SUCCESS(f"与 {baseline['commit'] or options['compare']} 相比没有性能回退"))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ErpSim.exports import DATASETS, EXPORT_FORMATS, stream_export
+
+
+class Command(BaseCommand):
+    help = "把当前比赛的原始数据或分析结果流式导出为 CSV/Parquet 文件，供离线分析使用"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(DATASETS), help="要导出的数据集")
+        parser.add_argument('--format', dest='fmt', choices=EXPORT_FORMATS, default='csv',
+                            help="输出格式，parquet 需要安装 pyarrow，未安装时退回 csv")
+        parser.add_argument('-o', '--output', help="输出文件，默认为 <数据集>.<格式>")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        fmt, chunks = stream_export(options['dataset'], options['fmt'])
+        if fmt != options['fmt']:
+            self.stderr.write(self.style.WARNING("未安装 pyarrow，改为导出 CSV"))
+        output = options['output'] or f"{options['dataset']}.{fmt}"
+        size = 0
+        with open(output, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f"已导出 {output}（{size / 1024 / 1024:.1f} MB），用时 {time.perf_counter() - started:.2f} 秒"
+        ))
@@ -0,0 +1,108 @@
+import glob
+import hashlib
+import os
+import time
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ErpSim.analytics.forecast import process_pool, refit_forecasts
+from ErpSim.analytics.games import import_game_id
+from ErpSim.analytics.rounds import get_calendar
+from ErpSim.importers import EXPORT_SPECS, parse_export, write_chunks
+from ErpSim.models import Game
+
+
+def file_digest(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+class Command(BaseCommand):
+    help = "导入一个目录下的全部 ERPsim 导出文件（DETAIL/MAR/SUM/INVENT/PRODUCTION），多进程并行解析，每个文件单独一个事务"
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help="导出文件所在目录")
+        parser.add_argument('--watch', action='store_true', help="持续轮询目录，只重新导入修改过的文件")
+        parser.add_argument('--interval', type=float, default=5, help="轮询间隔（秒），默认 5")
+        parser.add_argument('--workers', type=int, default=None, help="解析进程数，默认取文件数与 CPU 核数的较小值")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="每块读取的行数")
+        parser.add_argument('--game', help="导入到指定名称的比赛（不存在时新建），默认为后台设置的导入目标比赛")
+        parser.add_argument('--team', default='', help="与 --game 一起指定队伍")
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not os.path.isdir(directory):
+            raise CommandError(f"目录不存在：{directory}")
+        # path -> (mtime, sha1)，只记录导入成功的文件
+        seen = {}
+        while True:
+            changed = self.changed_files(directory, seen)
+            if changed:
+                self.ingest(changed, seen, options)
+            elif not options['watch']:
+                self.stdout.write("没有需要导入的文件")
+            if not options['watch']:
+                break
+            time.sleep(options['interval'])
+
+    def changed_files(self, directory, seen):
+        changed = {}
+        for path in sorted(glob.glob(os.path.join(directory, '*.xlsx'))):
+            # 跳过 Excel 打开文件时生成的 ~$ 临时文件
+            if os.path.basename(path).startswith('~$'):
+                continue
+            mtime = os.path.getmtime(path)
+            if path in seen and seen[path][0] == mtime:
+                continue
+            digest = file_digest(path)
+            if path in seen and seen[path][1] == digest:
+                seen[path] = (mtime, digest)
+                continue
+            changed[path] = (mtime, digest)
+        return changed
+
+    def target_game(self, options):
+        if options['game']:
+            return Game.objects.get_or_create(name=options['game'], team=options['team'])[0].pk
+        return import_game_id()
+
+    def ingest(self, changed, seen, options):
+        workers = options['workers'] or min(len(changed), os.cpu_count() or 1)
+        game = self.target_game(options)
+        # 日历在主进程中读取后传给子进程，子进程只解析文件，不访问数据库
+        calendar = get_calendar()
+        started = time.perf_counter()
+        market_changed = False
+        with process_pool(workers) as pool:
+            futures = {pool.submit(parse_export, path, calendar, options['chunk_size']): path for path in changed}
+            # 解析完一个就写入一个，写库在主进程中进行，每个文件一个事务
+            for future in as_completed(futures):
+                path = futures[future]
+                name = os.path.basename(path)
+                try:
+                    export_type, chunks = future.result()
+                    if chunks is None:
+                        self.stdout.write(f"{name}: 类型 {export_type or '未知'} 暂不支持导入，已跳过")
+                    else:
+                        stats = write_chunks(EXPORT_SPECS[export_type], chunks, game=game)
+                        self.stdout.write(self.style.SUCCESS(
+                            f"{name}: {export_type} 读取 {stats['rows']} 行，新增 {stats['created']}，"
+                            f"更新 {stats['updated']}，跳过 {stats['skipped']}，无效 {stats['invalid']}，"
+                            f"写入 {stats['seconds']} 秒"
+                        ))
+                except Exception as e:
+                    # 失败的文件不记录，下次轮询会重试
+                    self.stderr.write(f"{name}: 导入失败：{e}")
+                    continue
+                seen[path] = changed[path]
+                if export_type == 'MAR':
+                    market_changed = True
+        if market_changed:
+            # 市场数据有更新时顺带增量更新需求预测
+            stats = refit_forecasts(workers=options['workers'], game=game)
+            self.stdout.write(f"需求预测：重新拟合 {stats['fitted']}，增量更新 {stats['incremental']}")
+        self.stdout.write(f"共处理 {len(changed)} 个文件，用时 {time.perf_counter() - started:.2f} 秒")
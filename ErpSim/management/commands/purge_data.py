@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from ErpSim.models import Game, GroupSalesData, InventoryData, MarketSalesData, ProductionOrder
+from ErpSim.purge import purge
+
+PURGE_MODELS = {
+    'market': MarketSalesData,
+    'group': GroupSalesData,
+    'inventory': InventoryData,
+    'production': ProductionOrder,
+}
+
+
+def date_arg(value):
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(value)
+    return day
+
+
+class Command(BaseCommand):
+    help = "快速清空一场比赛的数据（重新导入前使用），可按日期区间或轮次限定范围；市场数据的汇总与预测一并清除"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tables', nargs='+', choices=list(PURGE_MODELS), help="要清空的数据")
+        parser.add_argument('--game', help="比赛名称，默认为后台设置的导入目标比赛")
+        parser.add_argument('--team', default='', help="与 --game 一起指定队伍")
+        parser.add_argument('--from', dest='start', type=date_arg, help="起始日期（含），YYYY-MM-DD")
+        parser.add_argument('--to', dest='end', type=date_arg, help="结束日期（含），YYYY-MM-DD")
+        parser.add_argument('--round', dest='rounds', type=int, action='append', help="只删除该轮次，可重复指定")
+
+    def handle(self, *args, **options):
+        game = None
+        if options['game']:
+            game = Game.objects.filter(name=options['game'], team=options['team']).values_list('pk', flat=True).first()
+            if game is None:
+                raise CommandError(f"比赛不存在：{options['game']}")
+        for name in options['tables']:
+            started = time.perf_counter()
+            try:
+                count = purge(PURGE_MODELS[name], game, options['start'], options['end'], options['rounds'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: 删除 {count} 条，用时 {time.perf_counter() - started:.2f} 秒"
+            ))
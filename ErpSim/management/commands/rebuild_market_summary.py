@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ErpSim.analytics.summary import check_market_summary, refresh_market_summary
+
+
+class Command(BaseCommand):
+    help = "从原始市场销售数据全量重建汇总表，并与原始聚合结果做一致性校验"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check-only', action='store_true', help="只做一致性校验，不重建")
+
+    def handle(self, *args, **options):
+        if not options['check_only']:
+            count = refresh_market_summary()
+            self.stdout.write(f"已重建 {count} 条汇总记录")
+        problems = check_market_summary()
+        for problem in problems[:50]:
+            self.stderr.write(problem)
+        if problems:
+            raise CommandError(f"汇总表与原始数据不一致，共 {len(problems)} 处")
+        self.stdout.write(self.style.SUCCESS("汇总表与原始数据一致"))
@@ -0,0 +1,30 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ErpSim.benchmarks.synthetic import write_exports
+
+
+class Command(BaseCommand):
+    help = "生成一套合成的 EXPORT_*.xlsx 导出文件（结构与 datasets/ 中的真实文件一致），用于演练导入或压测"
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help="输出目录，不存在时创建")
+        parser.add_argument('--days', type=int, default=20, help="每轮游戏天数（1-28）")
+        parser.add_argument('--rounds', type=int, default=4, help="轮次数")
+        parser.add_argument('--materials', type=int, default=12, help="物料数")
+        parser.add_argument('--areas', type=int, default=3, help="销售区域数")
+        parser.add_argument('--teams', type=int, default=1, help="队伍数")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        os.makedirs(options['directory'], exist_ok=True)
+        try:
+            paths = write_exports(
+                options['directory'], options['days'], options['materials'], options['areas'], options['teams'],
+                options['rounds'], options['seed'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        for path in paths.values():
+            self.stdout.write(self.style.SUCCESS(f"已生成 {path}"))
@@ -0,0 +1,95 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from .analytics.games import SESSION_GAME_KEY, viewing_game
+from .timing import TIMING_PANEL_MARKER, collect_timings, timed
+
+
+class ServerTimingMiddleware:
+    """
+    记录每个请求的查询数、SQL 耗时、各看板区块与模板渲染耗时。
+
+    后台用户的响应附带 Server-Timing 头（浏览器开发者工具的 Timing 页可见）；
+    ERPSIM_TIMING_PANEL 打开时，页面中的 {% timing_panel %} 占位符替换为可折叠的计时面板。
+    应放在 MIDDLEWARE 的最前面，以便把其他中间件的查询（session、用户）也计算在内。
+    """
+
+    # 与 Django 自带中间件一样同时支持同步与异步，ASGI 下异步视图（看板接口、实时推送）不必来回切换线程
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect_timings() as timings:
+            response = self.get_response(request)
+        return self.finish(response, getattr(request, 'user', None), timings)
+
+    async def __acall__(self, request):
+        with collect_timings() as timings:
+            response = await self.get_response(request)
+        # 异步请求中 request.user 不能直接求值（会在事件循环中查询），改用 auser()，鉴权装饰器已取过时直接读缓存
+        auser = getattr(request, 'auser', None)
+        return self.finish(response, await auser() if auser else None, timings)
+
+    def finish(self, response, user, timings):
+        if not getattr(settings, 'ERPSIM_SERVER_TIMING', True) or user is None or not user.is_staff:
+            return response
+        response['Server-Timing'] = timings.server_timing()
+        if getattr(settings, 'ERPSIM_TIMING_PANEL', settings.DEBUG):
+            self.insert_panel(response, timings)
+        return response
+
+    def process_template_response(self, request, response):
+        # TemplateResponse 在视图返回后才渲染，changelist 的结果列表查询也发生在渲染时，单独计时
+        render = response.render
+
+        def timed_render():
+            with timed('render'):
+                return render()
+
+        response.render = timed_render
+        return response
+
+    def insert_panel(self, response, timings):
+        if response.streaming or 'text/html' not in response.get('Content-Type', ''):
+            return
+        marker = TIMING_PANEL_MARKER.encode(response.charset)
+        if marker not in response.content:
+            return
+        panel = render_to_string('admin/timing_panel.html', {'rows': timings.rows()})
+        response.content = response.content.replace(marker, panel.encode(response.charset), 1)
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(response.content))
+
+
+class GameScopeMiddleware:
+    """
+    把会话中选择查看的比赛（见 GameAdmin.select_view）放进请求上下文，看板、列表与导出只统计这场比赛。
+
+    每个用户各自选择，互不影响；应放在 SessionMiddleware 之后。
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with viewing_game(request.session.get(SESSION_GAME_KEY)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with viewing_game(await request.session.aget(SESSION_GAME_KEY)):
+            return await self.get_response(request)
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:15
+
+from django.db import migrations, models
+
+
+def build_summary(apps, schema_editor):
+    # 用已有的市场数据回填汇总表
+    from ErpSim.analytics.rounds import DEFAULT_CALENDAR
+    from ErpSim.analytics.summary import refresh_market_summary
+    refresh_market_summary(
+        raw_model=apps.get_model('ErpSim', 'MarketSalesData'),
+        summary_model=apps.get_model('ErpSim', 'MarketSalesSummary'),
+        calendar=DEFAULT_CALENDAR,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ErpSim', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketSalesSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round', models.IntegerField(blank=True, null=True, verbose_name='轮次')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('material_description', models.CharField(max_length=255, verbose_name='物料描述')),
+                ('area', models.CharField(max_length=100, verbose_name='区域')),
+                ('qty_sum', models.FloatField(verbose_name='数量合计')),
+                ('value_sum', models.FloatField(verbose_name='金额合计')),
+                ('min_price', models.FloatField(verbose_name='最低单价')),
+                ('max_price', models.FloatField(verbose_name='最高单价')),
+                ('row_count', models.IntegerField(verbose_name='原始行数')),
+            ],
+            options={
+                'verbose_name': '市场销售汇总',
+                'verbose_name_plural': '市场销售汇总',
+                'constraints': [models.UniqueConstraint(fields=('date', 'material_description', 'area'), name='market_summary_unique_key')],
+            },
+        ),
+        migrations.RunPython(build_summary, migrations.RunPython.noop),
+    ]
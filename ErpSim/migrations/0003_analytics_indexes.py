@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ErpSim', '0002_market_sales_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='groupsalesdata',
+            index=models.Index(fields=['material_description', 'round', 'day', 'price'], name='group_mat_round_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marketsalesdata',
+            index=models.Index(fields=['date'], name='market_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marketsalesdata',
+            index=models.Index(fields=['material_description', 'date', 'price'], name='market_mat_date_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marketsalessummary',
+            index=models.Index(fields=['round', 'material_description'], name='summary_round_mat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marketsalessummary',
+            index=models.Index(fields=['material_description', 'date'], name='summary_mat_date_idx'),
+        ),
+    ]
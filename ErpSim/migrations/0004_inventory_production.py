@@ -0,0 +1,51 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ErpSim', '0003_analytics_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryData',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('storage_location', models.CharField(max_length=20, verbose_name='库存地点')),
+                ('material', models.CharField(max_length=100, verbose_name='物料编码')),
+                ('material_description', models.CharField(max_length=255, verbose_name='物料描述')),
+                ('stock', models.FloatField(verbose_name='库存')),
+                ('reserved', models.FloatField(verbose_name='预留')),
+                ('unit', models.CharField(max_length=10, verbose_name='基本单位')),
+            ],
+            options={
+                'verbose_name': '库存数据',
+                'verbose_name_plural': '库存数据',
+                'indexes': [models.Index(fields=['material_description', 'storage_location'], name='inventory_mat_sloc_idx')],
+                'constraints': [models.UniqueConstraint(fields=('storage_location', 'material'), name='inventory_unique_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductionOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.CharField(max_length=20, unique=True, verbose_name='生产订单')),
+                ('material_description', models.CharField(max_length=255, verbose_name='物料描述')),
+                ('start', models.DateField(verbose_name='开始日期')),
+                ('finish', models.DateField(verbose_name='完成日期')),
+                ('setup', models.FloatField(verbose_name='准备时间')),
+                ('released', models.DateField(verbose_name='下达日期')),
+                ('target', models.FloatField(verbose_name='计划数量')),
+                ('confirmed', models.FloatField(verbose_name='已确认数量')),
+                ('unit_cost', models.FloatField(verbose_name='单位成本')),
+            ],
+            options={
+                'verbose_name': '生产订单数据',
+                'verbose_name_plural': '生产订单数据',
+                'indexes': [models.Index(fields=['material_description', 'finish'], name='production_mat_finish_idx')],
+            },
+        ),
+    ]
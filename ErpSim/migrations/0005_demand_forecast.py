@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ErpSim', '0004_inventory_production'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('material_description', models.CharField(max_length=255, verbose_name='物料描述')),
+                ('area', models.CharField(max_length=100, verbose_name='区域')),
+                ('alpha', models.FloatField(verbose_name='水平平滑系数')),
+                ('beta', models.FloatField(verbose_name='趋势平滑系数')),
+                ('level', models.FloatField(verbose_name='水平')),
+                ('trend', models.FloatField(verbose_name='趋势')),
+                ('sse', models.FloatField(verbose_name='拟合误差平方和')),
+                ('last_date', models.DateField(verbose_name='最后观测日期')),
+                ('n_obs', models.IntegerField(verbose_name='观测数')),
+                ('history_sum', models.FloatField(verbose_name='已拟合数量合计')),
+                ('forecast', models.FloatField(verbose_name='下一期预测数量')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '需求预测',
+                'verbose_name_plural': '需求预测',
+                'constraints': [models.UniqueConstraint(fields=('material_description', 'area'), name='forecast_unique_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:03
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ErpSim', '0005_demand_forecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoundCalendar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, verbose_name='名称')),
+                ('year', models.PositiveSmallIntegerField(blank=True, help_text='导出文件中 MM/DD 日期补全的年份；留空时导入按当年，分析按数据中最新的年份', null=True, verbose_name='年份')),
+                ('rounds', models.PositiveSmallIntegerField(default=4, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(12)], verbose_name='轮次数')),
+                ('first_day', models.PositiveSmallIntegerField(default=5, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(31)], verbose_name='每轮第一天')),
+                ('last_day', models.PositiveSmallIntegerField(default=20, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(31)], verbose_name='每轮最后一天')),
+                ('report_interval', models.PositiveSmallIntegerField(default=5, validators=[django.core.validators.MinValueValidator(1)], verbose_name='市场报告间隔（天）')),
+                ('is_active', models.BooleanField(default=True, verbose_name='启用')),
+            ],
+            options={
+                'verbose_name': '比赛日历',
+                'verbose_name_plural': '比赛日历',
+            },
+        ),
+    ]
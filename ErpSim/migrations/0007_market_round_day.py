@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:06
+
+from django.db import migrations, models
+
+
+def backfill_round_day(apps, schema_editor):
+    # 按当前启用的日历（没有时用默认日历）回填已有市场数据的轮次与游戏日
+    from ErpSim.analytics.rounds import DEFAULT_CALENDAR, CalendarLookup
+    from ErpSim.analytics.summary import reassign_rounds
+    calendar = apps.get_model('ErpSim', 'RoundCalendar').objects.filter(is_active=True).order_by('-id').first()
+    reassign_rounds(
+        calendar=CalendarLookup(calendar) if calendar else DEFAULT_CALENDAR,
+        raw_model=apps.get_model('ErpSim', 'MarketSalesData'),
+        summary_model=apps.get_model('ErpSim', 'MarketSalesSummary'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ErpSim', '0006_round_calendar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='marketsalesdata',
+            name='game_day',
+            field=models.IntegerField(blank=True, editable=False, null=True, verbose_name='游戏日'),
+        ),
+        migrations.AddField(
+            model_name='marketsalesdata',
+            name='round',
+            field=models.IntegerField(blank=True, editable=False, null=True, verbose_name='轮次'),
+        ),
+        migrations.AddIndex(
+            model_name='marketsalesdata',
+            index=models.Index(fields=['material_description', 'round', 'game_day', 'price'], name='market_mat_round_day_idx'),
+        ),
+        migrations.RunPython(backfill_round_day, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_materials(apps, schema_editor):
+    # 从三张表已有的物料描述登记物料维表（编码取自小组数据），再按物料逐个回填外键
+    from ErpSim.analytics.materials import ensure_materials
+    tables = [apps.get_model('ErpSim', name) for name in ('MarketSalesData', 'GroupSalesData', 'MarketSalesSummary')]
+    descriptions = set()
+    for model in tables:
+        descriptions.update(model.objects.values_list('material_description', flat=True).distinct())
+    codes = dict(tables[1].objects.exclude(material='').values_list('material_description', 'material').distinct())
+    ids = ensure_materials(descriptions, codes, model=apps.get_model('ErpSim', 'Material'))
+    for model in tables:
+        for description, pk in ids.items():
+            model.objects.filter(material_description=description).update(product_id=pk)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ErpSim', '0007_market_round_day'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Material',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(blank=True, max_length=100, null=True, verbose_name='物料编码')),
+                ('description', models.CharField(max_length=255, unique=True, verbose_name='物料描述')),
+                ('package_size', models.CharField(blank=True, db_index=True, max_length=20, verbose_name='包装规格')),
+                ('family', models.CharField(blank=True, max_length=255, verbose_name='产品系列')),
+            ],
+            options={
+                'verbose_name': '物料',
+                'verbose_name_plural': '物料',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='groupsalesdata',
+            name='group_mat_round_day_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='marketsalesdata',
+            name='market_mat_round_day_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='marketsalessummary',
+            name='summary_round_mat_idx',
+        ),
+        migrations.AddField(
+            model_name='groupsalesdata',
+            name='product',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.material', verbose_name='物料'),
+        ),
+        migrations.AddField(
+            model_name='marketsalesdata',
+            name='product',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.material', verbose_name='物料'),
+        ),
+        migrations.AddField(
+            model_name='marketsalessummary',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.material', verbose_name='物料'),
+        ),
+        migrations.AddIndex(
+            model_name='groupsalesdata',
+            index=models.Index(fields=['product', 'round', 'day', 'price'], name='group_product_round_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marketsalesdata',
+            index=models.Index(fields=['product', 'round', 'game_day', 'price'], name='market_product_round_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marketsalessummary',
+            index=models.Index(fields=['round', 'product'], name='summary_round_product_idx'),
+        ),
+        migrations.RunPython(backfill_materials, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,197 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+
+def backfill_game(apps, schema_editor):
+    # 已有数据都归入一场默认比赛，并设为当前比赛
+    from ErpSim.analytics.games import DEFAULT_GAME_NAME
+    game = apps.get_model('ErpSim', 'Game').objects.create(name=DEFAULT_GAME_NAME, is_active=True)
+    for name in ('MarketSalesData', 'GroupSalesData', 'MarketSalesSummary', 'InventoryData', 'ProductionOrder',
+                 'DemandForecast'):
+        apps.get_model('ErpSim', name).objects.update(game=game)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ErpSim', '0008_material'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Game',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='比赛名称')),
+                ('team', models.CharField(blank=True, max_length=20, verbose_name='队伍')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('is_active', models.BooleanField(default=True, verbose_name='当前比赛')),
+            ],
+            options={
+                'verbose_name': '比赛',
+                'verbose_name_plural': '比赛',
+                'constraints': [models.UniqueConstraint(fields=('name', 'team'), name='game_unique_key')],
+            },
+        ),
+        migrations.AddField(
+            model_name='demandforecast',
+            name='game',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.game', verbose_name='比赛'),
+        ),
+        migrations.AddField(
+            model_name='groupsalesdata',
+            name='game',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.game', verbose_name='比赛'),
+        ),
+        migrations.AddField(
+            model_name='inventorydata',
+            name='game',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.game', verbose_name='比赛'),
+        ),
+        migrations.AddField(
+            model_name='marketsalesdata',
+            name='game',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.game', verbose_name='比赛'),
+        ),
+        migrations.AddField(
+            model_name='marketsalessummary',
+            name='game',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.game', verbose_name='比赛'),
+        ),
+        migrations.AddField(
+            model_name='productionorder',
+            name='game',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.game', verbose_name='比赛'),
+        ),
+        migrations.RunPython(backfill_game, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='demandforecast',
+            name='forecast_unique_key',
+        ),
+        migrations.RemoveConstraint(
+            model_name='inventorydata',
+            name='inventory_unique_key',
+        ),
+        migrations.RemoveConstraint(
+            model_name='marketsalessummary',
+            name='market_summary_unique_key',
+        ),
+        migrations.RemoveIndex(
+            model_name='groupsalesdata',
+            name='group_product_round_day_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='inventorydata',
+            name='inventory_mat_sloc_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='marketsalesdata',
+            name='market_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='marketsalesdata',
+            name='market_mat_date_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='marketsalesdata',
+            name='market_product_round_day_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='marketsalessummary',
+            name='summary_mat_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='marketsalessummary',
+            name='summary_round_product_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='productionorder',
+            name='production_mat_finish_idx',
+        ),
+        migrations.AlterField(
+            model_name='demandforecast',
+            name='game',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.game', verbose_name='比赛'),
+        ),
+        migrations.AlterField(
+            model_name='groupsalesdata',
+            name='game',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.game', verbose_name='比赛'),
+        ),
+        migrations.AlterField(
+            model_name='inventorydata',
+            name='game',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.game', verbose_name='比赛'),
+        ),
+        migrations.AlterField(
+            model_name='marketsalesdata',
+            name='game',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.game', verbose_name='比赛'),
+        ),
+        migrations.AlterField(
+            model_name='marketsalessummary',
+            name='game',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.game', verbose_name='比赛'),
+        ),
+        migrations.AlterField(
+            model_name='productionorder',
+            name='game',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.game', verbose_name='比赛'),
+        ),
+        migrations.AlterField(
+            model_name='productionorder',
+            name='order',
+            field=models.CharField(max_length=20, verbose_name='生产订单'),
+        ),
+        migrations.AddIndex(
+            model_name='groupsalesdata',
+            index=models.Index(fields=['game', 'product', 'round', 'day', 'price'], name='group_game_product_round_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorydata',
+            index=models.Index(fields=['game', 'material_description', 'storage_location'], name='inventory_game_mat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marketsalesdata',
+            index=models.Index(fields=['game', 'date'], name='market_game_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marketsalesdata',
+            index=models.Index(fields=['game', 'material_description', 'date', 'price'], name='market_game_mat_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marketsalesdata',
+            index=models.Index(fields=['game', 'product', 'round', 'game_day', 'price'], name='market_game_product_round_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marketsalessummary',
+            index=models.Index(fields=['game', 'round', 'product'], name='summary_game_round_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marketsalessummary',
+            index=models.Index(fields=['game', 'material_description', 'date'], name='summary_game_mat_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productionorder',
+            index=models.Index(fields=['game', 'material_description', 'finish'], name='production_game_mat_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='demandforecast',
+            constraint=models.UniqueConstraint(fields=('game', 'material_description', 'area'), name='forecast_unique_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='inventorydata',
+            constraint=models.UniqueConstraint(fields=('game', 'storage_location', 'material'), name='inventory_unique_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='marketsalessummary',
+            constraint=models.UniqueConstraint(fields=('game', 'date', 'material_description', 'area'), name='market_summary_unique_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='productionorder',
+            constraint=models.UniqueConstraint(fields=('game', 'order'), name='production_unique_key'),
+        ),
+    ]
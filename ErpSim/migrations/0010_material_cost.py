@@ -0,0 +1,59 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_profits(apps, schema_editor):
+    # 之前的成本价只存在各人的会话中，无法迁移；按成本价为 0 为已有的比赛生成利润排行
+    from ErpSim.analytics.profit import refresh_profits
+    summary_model = apps.get_model('ErpSim', 'MarketSalesSummary')
+    for game in summary_model.objects.values_list('game_id', flat=True).distinct().order_by():
+        refresh_profits(
+            game, summary_model, apps.get_model('ErpSim', 'MaterialCost'), apps.get_model('ErpSim', 'MaterialProfit'),
+        )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ErpSim', '0009_game'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterialCost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round', models.PositiveSmallIntegerField(verbose_name='轮次')),
+                ('effective_date', models.DateField(blank=True, help_text='留空表示整轮有效', null=True, verbose_name='生效日期')),
+                ('cost', models.FloatField(verbose_name='成本价')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('game', models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.game', verbose_name='比赛')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='ErpSim.material', verbose_name='物料')),
+            ],
+            options={
+                'verbose_name': '成本价',
+                'verbose_name_plural': '成本价',
+                'constraints': [models.UniqueConstraint(fields=('game', 'product', 'round', 'effective_date'), name='cost_unique_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MaterialProfit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('qty', models.FloatField(verbose_name='数量合计')),
+                ('price', models.FloatField(verbose_name='最新最高价')),
+                ('cost', models.FloatField(verbose_name='成本价')),
+                ('profit', models.FloatField(verbose_name='单个利润')),
+                ('margin', models.FloatField(blank=True, null=True, verbose_name='利润率')),
+                ('game', models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, to='ErpSim.game', verbose_name='比赛')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='ErpSim.material', verbose_name='物料')),
+            ],
+            options={
+                'verbose_name': '利润排行',
+                'verbose_name_plural': '利润排行',
+                'constraints': [models.UniqueConstraint(fields=('game', 'product'), name='profit_unique_key')],
+            },
+        ),
+        migrations.RunPython(backfill_profits, migrations.RunPython.noop),
+    ]
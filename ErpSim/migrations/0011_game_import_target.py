@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ErpSim', '0010_material_cost'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='game',
+            name='is_active',
+            field=models.BooleanField(default=True, verbose_name='导入目标'),
+        ),
+    ]
@@ -1,21 +1,74 @@
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
+class Game(models.Model):
+    """比赛维表：每场练习/正式比赛的每支队伍一行，导入的数据都归属导入目标比赛，看板只统计各用户所查看的比赛"""
+    name = models.CharField(max_length=100, verbose_name="比赛名称")
+    team = models.CharField(max_length=20, blank=True, verbose_name="队伍")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    is_active = models.BooleanField(default=True, verbose_name="导入目标")
+
+    class Meta:
+        verbose_name = "比赛"
+        verbose_name_plural = "比赛"
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'team'], name='game_unique_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.team}" if self.team else self.name
+
+class Material(models.Model):
+    """物料维表：导入时按物料描述自动登记，事实表通过整数外键 product 引用"""
+    code = models.CharField(max_length=100, null=True, blank=True, verbose_name="物料编码")
+    description = models.CharField(max_length=255, unique=True, verbose_name="物料描述")
+    package_size = models.CharField(max_length=20, blank=True, db_index=True, verbose_name="包装规格")
+    family = models.CharField(max_length=255, blank=True, verbose_name="产品系列")
+
+    class Meta:
+        verbose_name = "物料"
+        verbose_name_plural = "物料"
+
+    def __str__(self):
+        return self.description
+
 class MarketSalesData(models.Model):
+    game = models.ForeignKey(
+        Game, on_delete=models.PROTECT, editable=False, db_index=False, verbose_name="比赛",
+    )
     date = models.DateField(verbose_name="日期")
     material_description = models.CharField(max_length=255, verbose_name="物料描述")
     area = models.CharField(max_length=100, verbose_name="区域")
     qty = models.FloatField(verbose_name="数量")
     value = models.FloatField(verbose_name="金额")
     price = models.FloatField(verbose_name="单价")
+    # 导入时按比赛日历从日期推算，不在任何轮次内的日期为空；日历修改时重算
+    round = models.IntegerField(null=True, blank=True, editable=False, verbose_name="轮次")
+    game_day = models.IntegerField(null=True, blank=True, editable=False, verbose_name="游戏日")
+    product = models.ForeignKey(
+        Material, on_delete=models.PROTECT, null=True, blank=True, editable=False, db_index=False, verbose_name="物料",
+    )
 
     class Meta:
         verbose_name = "市场销售数据"
         verbose_name_plural = "市场销售数据"
+        # 各索引都以比赛打头，看板只读当前比赛的行，保留再多历史比赛也不影响查询范围
+        indexes = [
+            models.Index(fields=['game', 'date'], name='market_game_date_idx'),
+            # 附带 price 作为覆盖索引，价格对比图读取时无需回表
+            models.Index(fields=['game', 'material_description', 'date', 'price'], name='market_game_mat_date_idx'),
+            # 价格对比图按 (物料, 轮次, 天) 与小组数据对齐
+            models.Index(fields=['game', 'product', 'round', 'game_day', 'price'], name='market_game_product_round_idx'),
+        ]
 
     def __str__(self):
         return f"{self.date} - {self.material_description} - {self.area}"
 
 class GroupSalesData(models.Model):
+    game = models.ForeignKey(
+        Game, on_delete=models.PROTECT, editable=False, db_index=False, verbose_name="比赛",
+    )
     round = models.IntegerField(verbose_name="轮次")
     day = models.IntegerField(verbose_name="天数")
     area = models.CharField(max_length=20, verbose_name="区域")
@@ -27,10 +80,223 @@ class GroupSalesData(models.Model):
     qty = models.FloatField(verbose_name="数量")
     value = models.FloatField(verbose_name="金额")
     cost = models.FloatField(verbose_name="成本")
+    product = models.ForeignKey(
+        Material, on_delete=models.PROTECT, null=True, blank=True, editable=False, db_index=False, verbose_name="物料",
+    )
 
     class Meta:
         verbose_name = "本小组销售数据"
         verbose_name_plural = "本小组销售数据"
+        indexes = [
+            models.Index(fields=['game', 'product', 'round', 'day', 'price'], name='group_game_product_round_idx'),
+        ]
+
+    def __str__(self):
+        return f"第{self.round}轮-第{self.day}天-{self.material_description}"
+
+class MarketSalesSummary(models.Model):
+    """市场销售数据的预聚合表，按 日期 × 物料 × 区域 汇总，导入/删除时增量维护"""
+    game = models.ForeignKey(
+        Game, on_delete=models.PROTECT, editable=False, db_index=False, verbose_name="比赛",
+    )
+    round = models.IntegerField(null=True, blank=True, verbose_name="轮次")
+    date = models.DateField(verbose_name="日期")
+    material_description = models.CharField(max_length=255, verbose_name="物料描述")
+    area = models.CharField(max_length=100, verbose_name="区域")
+    qty_sum = models.FloatField(verbose_name="数量合计")
+    value_sum = models.FloatField(verbose_name="金额合计")
+    min_price = models.FloatField(verbose_name="最低单价")
+    max_price = models.FloatField(verbose_name="最高单价")
+    row_count = models.IntegerField(verbose_name="原始行数")
+    product = models.ForeignKey(Material, on_delete=models.PROTECT, null=True, blank=True, verbose_name="物料")
+
+    class Meta:
+        verbose_name = "市场销售汇总"
+        verbose_name_plural = "市场销售汇总"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['game', 'date', 'material_description', 'area'],
+                name='market_summary_unique_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['game', 'round', 'product'], name='summary_game_round_idx'),
+            models.Index(fields=['game', 'material_description', 'date'], name='summary_game_mat_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.material_description} - {self.area}"
+
+class InventoryData(models.Model):
+    game = models.ForeignKey(
+        Game, on_delete=models.PROTECT, editable=False, db_index=False, verbose_name="比赛",
+    )
+    storage_location = models.CharField(max_length=20, verbose_name="库存地点")
+    material = models.CharField(max_length=100, verbose_name="物料编码")
+    material_description = models.CharField(max_length=255, verbose_name="物料描述")
+    stock = models.FloatField(verbose_name="库存")
+    reserved = models.FloatField(verbose_name="预留")
+    unit = models.CharField(max_length=10, verbose_name="基本单位")
+
+    class Meta:
+        verbose_name = "库存数据"
+        verbose_name_plural = "库存数据"
+        constraints = [
+            models.UniqueConstraint(fields=['game', 'storage_location', 'material'], name='inventory_unique_key'),
+        ]
+        indexes = [
+            models.Index(fields=['game', 'material_description', 'storage_location'], name='inventory_game_mat_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.storage_location} - {self.material_description}"
+
+class ProductionOrder(models.Model):
+    game = models.ForeignKey(
+        Game, on_delete=models.PROTECT, editable=False, db_index=False, verbose_name="比赛",
+    )
+    order = models.CharField(max_length=20, verbose_name="生产订单")
+    material_description = models.CharField(max_length=255, verbose_name="物料描述")
+    start = models.DateField(verbose_name="开始日期")
+    finish = models.DateField(verbose_name="完成日期")
+    setup = models.FloatField(verbose_name="准备时间")
+    released = models.DateField(verbose_name="下达日期")
+    target = models.FloatField(verbose_name="计划数量")
+    confirmed = models.FloatField(verbose_name="已确认数量")
+    unit_cost = models.FloatField(verbose_name="单位成本")
+
+    class Meta:
+        verbose_name = "生产订单数据"
+        verbose_name_plural = "生产订单数据"
+        # 订单号只在一场比赛内唯一
+        constraints = [
+            models.UniqueConstraint(fields=['game', 'order'], name='production_unique_key'),
+        ]
+        indexes = [
+            models.Index(fields=['game', 'material_description', 'finish'], name='production_game_mat_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.order} - {self.material_description}"
+
+class DemandForecast(models.Model):
+    """每个 物料 × 区域 的需求预测模型（Holt 线性趋势指数平滑），保存参数与最新状态，便于新数据到来时增量更新"""
+    game = models.ForeignKey(
+        Game, on_delete=models.PROTECT, editable=False, db_index=False, verbose_name="比赛",
+    )
+    material_description = models.CharField(max_length=255, verbose_name="物料描述")
+    area = models.CharField(max_length=100, verbose_name="区域")
+    alpha = models.FloatField(verbose_name="水平平滑系数")
+    beta = models.FloatField(verbose_name="趋势平滑系数")
+    level = models.FloatField(verbose_name="水平")
+    trend = models.FloatField(verbose_name="趋势")
+    sse = models.FloatField(verbose_name="拟合误差平方和")
+    last_date = models.DateField(verbose_name="最后观测日期")
+    n_obs = models.IntegerField(verbose_name="观测数")
+    history_sum = models.FloatField(verbose_name="已拟合数量合计")
+    forecast = models.FloatField(verbose_name="下一期预测数量")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "需求预测"
+        verbose_name_plural = "需求预测"
+        constraints = [
+            models.UniqueConstraint(fields=['game', 'material_description', 'area'], name='forecast_unique_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.material_description} - {self.area}"
+
+
+class MaterialCost(models.Model):
+    """物料成本价：每场比赛按轮次登记，轮次内调整时可指定生效日期；全队共用，利润排行按当前有效的成本价计算"""
+    game = models.ForeignKey(
+        Game, on_delete=models.PROTECT, editable=False, db_index=False, verbose_name="比赛",
+    )
+    product = models.ForeignKey(Material, on_delete=models.PROTECT, verbose_name="物料")
+    round = models.PositiveSmallIntegerField(verbose_name="轮次")
+    effective_date = models.DateField(null=True, blank=True, verbose_name="生效日期", help_text="留空表示整轮有效")
+    cost = models.FloatField(verbose_name="成本价")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "成本价"
+        verbose_name_plural = "成本价"
+        constraints = [
+            models.UniqueConstraint(fields=['game', 'product', 'round', 'effective_date'], name='cost_unique_key'),
+        ]
+
+    def validate_constraints(self, exclude=None):
+        # 生效日期为空时唯一约束不起作用（NULL 互不相等），同一轮只允许一条整轮有效的成本价
+        super().validate_constraints(exclude)
+        if self.effective_date is None and self.product_id:
+            # 后台新增时比赛在保存前才由信号填入，这里按所查看的比赛检查
+            from .analytics.games import active_game_id
+
+            duplicate = MaterialCost.objects.filter(
+                game_id=self.game_id or active_game_id(), product_id=self.product_id, round=self.round, effective_date__isnull=True,
+            ).exclude(pk=self.pk)
+            if duplicate.exists():
+                raise ValidationError("该物料本轮已有整轮有效的成本价")
+
+    def __str__(self):
+        return f"{self.product} - 第{self.round}轮"
+
+
+class MaterialProfit(models.Model):
+    """利润排行的存储结果：成本价或市场价变化时整场比赛一次重算，所有用户共用；排名读取时由数据库窗口函数给出"""
+    game = models.ForeignKey(
+        Game, on_delete=models.PROTECT, editable=False, db_index=False, verbose_name="比赛",
+    )
+    product = models.ForeignKey(Material, on_delete=models.PROTECT, verbose_name="物料")
+    qty = models.FloatField(verbose_name="数量合计")
+    price = models.FloatField(verbose_name="最新最高价")
+    cost = models.FloatField(verbose_name="成本价")
+    profit = models.FloatField(verbose_name="单个利润")
+    margin = models.FloatField(null=True, blank=True, verbose_name="利润率")
+
+    class Meta:
+        verbose_name = "利润排行"
+        verbose_name_plural = "利润排行"
+        constraints = [
+            models.UniqueConstraint(fields=['game', 'product'], name='profit_unique_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.product}"
+
+class RoundCalendar(models.Model):
+    """
+    比赛日历：第 n 轮对应导出文件中的第 n 月，每轮为该月 first_day..last_day 日，市场数据每 report_interval 天更新一次。
+
+    导入补全年份、汇总表的轮次、价格对比图的日期网格都从当前启用的日历生成；未配置时使用默认的 4 轮日历。
+    """
+    name = models.CharField(max_length=50, verbose_name="名称")
+    year = models.PositiveSmallIntegerField(
+        null=True, blank=True, verbose_name="年份",
+        help_text="导出文件中 MM/DD 日期补全的年份；留空时导入按当年，分析按数据中最新的年份",
+    )
+    rounds = models.PositiveSmallIntegerField(
+        default=4, validators=[MinValueValidator(1), MaxValueValidator(12)], verbose_name="轮次数",
+    )
+    first_day = models.PositiveSmallIntegerField(
+        default=5, validators=[MinValueValidator(1), MaxValueValidator(31)], verbose_name="每轮第一天",
+    )
+    last_day = models.PositiveSmallIntegerField(
+        default=20, validators=[MinValueValidator(1), MaxValueValidator(31)], verbose_name="每轮最后一天",
+    )
+    report_interval = models.PositiveSmallIntegerField(
+        default=5, validators=[MinValueValidator(1)], verbose_name="市场报告间隔（天）",
+    )
+    is_active = models.BooleanField(default=True, verbose_name="启用")
+
+    class Meta:
+        verbose_name = "比赛日历"
+        verbose_name_plural = "比赛日历"
+
+    def clean(self):
+        if self.first_day is not None and self.last_day is not None and self.first_day > self.last_day:
+            raise ValidationError({'last_day': "最后一天不能早于第一天"})
 
     def __str__(self):
-        return f"第{self.round}轮-第{self.day}天-{self.material_description}"
\ No newline at end of file
+        return f"{self.name}（{self.rounds} 轮）"
@@ -0,0 +1,101 @@
+from django.db import connections, router, transaction
+from django.db.models import Max, Min
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch.dispatcher import _make_id
+
+from .analytics.cache import schedule_data_version_bump
+from .analytics.games import active_game_id, game_rows
+from .analytics.profit import refresh_profits
+from .models import DemandForecast, MarketSalesData, MarketSalesSummary
+
+# 快速清空：不经过 Django 的 Collector（把待删对象全部取进内存、逐行发送删除信号），按主键区间分块直接执行 DELETE；
+# 要删的正好是整张表时，PostgreSQL 用 TRUNCATE，SQLite 用不带 WHERE 的 DELETE（SQLite 对它有整表清空的优化）。
+# 派生的汇总行、预测与看板缓存在同一事务内一并失效。
+
+# signals.data_changed 的 dispatch_uid：它只负责更新数据版本号，快速清空会自行更新，不妨碍走快速路径
+DATA_VERSION_RECEIVER = 'erpsim_data_changed'
+DELETE_CHUNK_SIZE = 50000
+
+
+def delete_receivers(model):
+    """model 上除数据版本号外的删除信号接收者（含不限 sender 的接收者）"""
+    senders = {_make_id(model), _make_id(None)}
+    return [
+        receiver
+        for signal in (pre_delete, post_delete)
+        for (uid, sender), receiver, *_ in signal.receivers
+        if sender in senders and uid != DATA_VERSION_RECEIVER
+    ]
+
+
+def fast_delete(queryset, chunk_size=DELETE_CHUNK_SIZE):
+    """
+    删除 queryset 中的行，返回删除行数。
+
+    有其他删除信号接收者或被其他表的外键引用时退回 ORM 删除，保证信号与级联照常执行。
+    """
+    model = queryset.model
+    if delete_receivers(model) or model._meta.related_objects:
+        return queryset.delete()[0]
+    using = router.db_for_write(model)
+    connection = connections[using]
+    if not queryset.query.where and connection.vendor == 'postgresql':
+        # MySQL 的 TRUNCATE 会隐式提交事务，只在 PostgreSQL 上使用
+        count = queryset.count()
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE TABLE {connection.ops.quote_name(model._meta.db_table)}')
+        return count
+    if not queryset.query.where and connection.vendor == 'sqlite':
+        return queryset._raw_delete(using)
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return 0
+    deleted = 0
+    for start in range(bounds['low'], bounds['high'] + 1, chunk_size):
+        deleted += queryset.filter(pk__gte=start, pk__lt=start + chunk_size)._raw_delete(using)
+    return deleted
+
+
+def scoped_rows(queryset, start=None, end=None, rounds=None):
+    """按日期区间 [start, end] 与轮次限定范围；模型没有对应字段时报错"""
+    model = queryset.model
+    fields = {f.name for f in model._meta.fields}
+    if (start or end) and 'date' not in fields:
+        raise ValueError(f"{model._meta.verbose_name}没有日期字段，不能按日期范围删除")
+    if rounds and 'round' not in fields:
+        raise ValueError(f"{model._meta.verbose_name}没有轮次字段，不能按轮次删除")
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lte=end)
+    if rounds:
+        queryset = queryset.filter(round__in=rounds)
+    return queryset
+
+
+def _purge_rows(model, game, start, end, rounds):
+    rows = game_rows(model, game)
+    if start or end or rounds:
+        return fast_delete(scoped_rows(rows, start, end, rounds))
+    if not model.objects.exclude(game_id=game).exists():
+        # 表中只有这场比赛的数据时按整表清空
+        return fast_delete(model.objects.all())
+    return fast_delete(rows)
+
+
+def purge(model, game=None, start=None, end=None, rounds=None):
+    """
+    快速清空一场比赛（默认为当前比赛）中 model 的数据，可按日期区间或轮次限定范围，返回删除行数。
+
+    市场数据的汇总行按同一范围一并删除并重算利润排行，整场清空时同时删除需求预测；提交后更新数据版本号，看板缓存失效。
+    """
+    game = game or active_game_id()
+    with transaction.atomic():
+        count = _purge_rows(model, game, start, end, rounds)
+        if model is MarketSalesData:
+            _purge_rows(MarketSalesSummary, game, start, end, rounds)
+            if not (start or end or rounds):
+                _purge_rows(DemandForecast, game, None, None, None)
+            refresh_profits(game)
+        schedule_data_version_bump()
+    return count
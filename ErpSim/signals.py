@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from import_export.signals import post_import
+
+from .analytics.cache import schedule_data_version_bump
+from .analytics.games import active_game_id, import_game_id
+from .analytics.materials import material_id
+from .analytics.profit import schedule_profit_refresh
+from .analytics.summary import reassign_rounds
+from .models import (
+    Game, GroupSalesData, InventoryData, MarketSalesData, Material, MaterialCost, ProductionOrder, RoundCalendar,
+)
+from .purge import DATA_VERSION_RECEIVER
+
+TRACKED_MODELS = (MarketSalesData, GroupSalesData, InventoryData, ProductionOrder)
+
+
+def data_changed(sender, **kwargs):
+    schedule_data_version_bump()
+
+
+for tracked in TRACKED_MODELS + (Material,):
+    post_save.connect(data_changed, sender=tracked)
+    # 带 dispatch_uid，快速清空据此识别出它只更新版本号，可以跳过逐行删除
+    post_delete.connect(data_changed, sender=tracked, dispatch_uid=DATA_VERSION_RECEIVER)
+
+
+def assign_game(sender, instance, **kwargs):
+    # 逐行保存的新记录归入导入目标比赛；成本价是对所查看比赛的分析输入，归入所查看的比赛
+    if instance.game_id is None:
+        instance.game_id = active_game_id() if sender is MaterialCost else import_game_id()
+
+
+for tracked in TRACKED_MODELS + (MaterialCost,):
+    pre_save.connect(assign_game, sender=tracked)
+
+
+@receiver(pre_save, sender=MarketSalesData)
+@receiver(pre_save, sender=GroupSalesData)
+def link_material(sender, instance, **kwargs):
+    # 逐行保存（后台编辑、逐行导入）时关联物料维表；批量导入在 importers 中整块关联
+    instance.product_id = material_id(instance.material_description, getattr(instance, 'material', None))
+
+
+@receiver(post_import)
+def data_imported(sender, model=None, **kwargs):
+    if model in TRACKED_MODELS:
+        schedule_data_version_bump()
+
+
+@receiver(post_save, sender=MaterialCost)
+@receiver(post_delete, sender=MaterialCost)
+def cost_changed(sender, instance, **kwargs):
+    # 后台逐条修改成本价：提交后重算该比赛的利润排行，列表页批量修改时同一事务只重算一次
+    schedule_profit_refresh(instance.game_id)
+
+
+@receiver(post_save, sender=RoundCalendar)
+@receiver(post_delete, sender=RoundCalendar)
+def calendar_changed(sender, instance, **kwargs):
+    # 同时只启用一个日历；日历变化后重算汇总表的轮次，并让各进程缓存的查找表与看板缓存失效
+    if kwargs['signal'] is post_save and instance.is_active:
+        RoundCalendar.objects.filter(is_active=True).exclude(pk=instance.pk).update(is_active=False)
+    transaction.on_commit(reassign_rounds)
+    schedule_data_version_bump()
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+def game_changed(sender, instance, **kwargs):
+    # 同时只有一场导入目标；比赛变化后看板缓存与各进程缓存的导入目标、比赛列表一并失效
+    if kwargs['signal'] is post_save and instance.is_active:
+        Game.objects.filter(is_active=True).exclude(pk=instance.pk).update(is_active=False)
+    schedule_data_version_bump()
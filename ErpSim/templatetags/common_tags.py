@@ -1,7 +1,32 @@
 # 在你的app目录下新建 templatetags/common_tags.py
 from django import template
+from django.utils.safestring import mark_safe
+
+from ErpSim.analytics.games import active_game_id, import_game_id
+from ErpSim.models import Game
+from ErpSim.timing import TIMING_PANEL_MARKER
+
 register = template.Library()
 
 @register.filter
 def get_item(dictionary, key):
-    return dictionary.get(key, '')
\ No newline at end of file
+    return dictionary.get(key, '')
+
+@register.simple_tag
+def timing_panel():
+    # 只输出占位符，请求结束时由 ServerTimingMiddleware 替换为计时面板（此时各区块耗时才完整）
+    return mark_safe(TIMING_PANEL_MARKER)
+
+@register.inclusion_tag('admin/game_selector.html', takes_context=True)
+def game_selector(context):
+    # 看板页顶部的查看比赛选择框，切换后本会话的列表与看板只统计所选比赛；导入目标另在比赛列表中设置
+    request = context.get('request')
+    games = list(Game.objects.order_by('-id'))
+    target = import_game_id()
+    return {
+        'games': games,
+        'active_game': active_game_id(),
+        'import_game': next((game for game in games if game.pk == target), None),
+        'next': request.get_full_path() if request else '',
+        'csrf_token': context.get('csrf_token'),
+    }
@@ -1,3 +1,1303 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import date
+from functools import partial
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+import numpy as np
+import tablib
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models.signals import pre_delete
+from django.http import HttpResponse
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from import_export.admin import ImportExportModelAdmin
+
+from .admin import MarketData, ProductionOrderResource
+from .benchmarks.allocation import legacy_region_allocation, synthetic_region_rows
+from .benchmarks.group_chart import legacy_build, synthetic_rows, vectorized_build
+from .benchmarks.importer import write_market_export
+from .benchmarks.load import percentile
+from .benchmarks.pricing import legacy_fit, synthetic_observations, write_pricing_rows
+from .benchmarks.report import compare_reports
+from .benchmarks.startup import probe
+from .benchmarks.synthetic import load_exports, use_calendar, write_exports
+from .benchmarks.utils import admin_client, profile
+from .analytics.cache import bump_data_version, get_data_version
+from .analytics.games import active_game_id, game_rows, viewing_game
+from .analytics.service import compute_sections, market_sections, run_inline
+from .analytics.group_chart import group_charts
+from .analytics.live import live_state, live_update
+from .analytics.materials import ensure_materials, split_description
+from .analytics.prices import latest_max_price_map
+from .analytics.pricing import fit_curves, load_observations, price_recommendations, recommend_prices
+from .analytics.profit import current_costs, profit_table, save_costs
+from .analytics.query import aggregate, analytics_backend, duckdb, duckdb_connection, reset_duckdb, snapshot_path
+from .analytics.summary import check_market_summary, refresh_market_summary
+from .analytics.inventory import daily_sales_by_area, days_of_cover, production_summary
+from .analytics.allocation import allocate_stock, region_preference
+from .analytics.forecast import fit_all, holt_fit, refit_forecasts
+from .analytics.market import product_list, region_allocation, round_chart_data
+from .analytics.rounds import DEFAULT_CALENDAR, get_calendar
+from .exports import pa, pq, stream_export
+from .middleware import ServerTimingMiddleware
+from .importers import (
+    GROUP_SPEC, INVENT_SPEC, MARKET_SPEC, PRODUCTION_SPEC, bulk_import, detect_export_type, normalize_dates, parse_export,
+    read_header,
+)
+from .management.commands.ingest_exports import Command as IngestExportsCommand
+from .purge import fast_delete, purge
+from .timing import TIMING_PANEL_MARKER, collect_timings, timed
+from .models import (
+    DemandForecast, Game, GroupSalesData, InventoryData, MarketSalesData, MarketSalesSummary, Material, MaterialCost,
+    MaterialProfit, ProductionOrder, RoundCalendar,
+)
+
+
+def create_market_rows(materials, days=(5, 10), areas=('North', 'South', 'West')):
+    rows = []
+    ids = ensure_materials(materials)
+    game = active_game_id()
+    for i, mat in enumerate(materials):
+        for d in days:
+            for j, area in enumerate(areas):
+                rows.append(MarketSalesData(
+                    date=date(2025, 1, d), material_description=mat, area=area,
+                    qty=100 + i, value=(100 + i) * 4, price=4 + d / 10 + j + i / 100, round=1, game_day=d,
+                    product_id=ids[mat], game_id=game,
+                ))
+    MarketSalesData.objects.bulk_create(rows)
+    refresh_market_summary()
+    # bulk_create 不触发信号，与导入完成后一样手动更新数据版本
+    bump_data_version()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AnalyticsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+
+class LatestPriceTests(AnalyticsTestCase):
+    def test_latest_day_max_price(self):
+        create_market_rows(['1kg Nut Muesli', '500g Nut Muesli'])
+        MarketSalesData.objects.create(
+            date=date(2025, 1, 3), material_description='500g Nut Muesli',
+            area='North', qty=1, value=99, price=99,
+        )
+        with self.assertNumQueries(1):
+            price_map = latest_max_price_map()
+        # 最新一天为 1 月 10 日，West 最高价
+        self.assertAlmostEqual(price_map['1kg Nut Muesli'], 4 + 1.0 + 2)
+        self.assertAlmostEqual(price_map['500g Nut Muesli'], 4 + 1.0 + 2 + 0.01)
+
+    def test_empty_table(self):
+        self.assertEqual(latest_max_price_map(), {})
+
+
+class MarketChangelistQueryTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(user)
+        self.url = reverse('admin:ErpSim_marketsalesdata_changelist')
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_independent_of_product_count(self):
+        create_market_rows([f'1kg Product {i}' for i in range(3)])
+        few = self.count_queries()
+        create_market_rows([f'500g Product {i}' for i in range(12)])
+        many = self.count_queries()
+        self.assertEqual(few, many)
+
+
+class MarketSummaryTests(AnalyticsTestCase):
+    def import_market(self, rows):
+        dataset = tablib.Dataset(headers=['Date', 'Material Description', 'Area', 'Qty', 'Value', 'Price'])
+        for row in rows:
+            dataset.append(row)
+        result = MarketData().import_data(dataset, dry_run=False)
+        self.assertFalse(result.has_errors())
+
+    def test_import_refreshes_summary_incrementally(self):
+        self.import_market([
+            ('01/05', '1kg Nut Muesli', 'North', 100, 400, 4.0),
+            ('01/05', '1kg Nut Muesli', 'South', 50, 210, 4.2),
+            ('06/01', '1kg Nut Muesli', 'West', 10, 40, 4.0),
+        ])
+        self.assertEqual(check_market_summary(), [])
+        self.assertEqual(MarketSalesSummary.objects.count(), 3)
+        self.assertEqual(MarketSalesSummary.objects.filter(round=1).count(), 2)
+        self.assertIsNone(MarketSalesSummary.objects.get(area='West').round)
+
+        # 同一主键重复导入为更新，只刷新涉及的日期
+        self.import_market([('01/05', '1kg Nut Muesli', 'North', 300, 1200, 4.0)])
+        self.assertEqual(check_market_summary(), [])
+        self.assertEqual(MarketSalesSummary.objects.get(area='North').qty_sum, 300)
+
+    def test_dry_run_leaves_summary_untouched(self):
+        dataset = tablib.Dataset(('01/05', '1kg Nut Muesli', 'North', 100, 400, 4.0),
+                                 headers=['Date', 'Material Description', 'Area', 'Qty', 'Value', 'Price'])
+        MarketData().import_data(dataset, dry_run=True)
+        self.assertFalse(MarketSalesSummary.objects.exists())
+
+    def test_delete_all_records_clears_summary(self):
+        create_market_rows(['1kg Nut Muesli'])
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(user)
+        self.client.post(reverse('admin:ErpSim_marketsalesdata_changelist'), {
+            'action': 'delete_all_records',
+            '_selected_action': list(MarketSalesData.objects.values_list('pk', flat=True)[:1]),
+        })
+        self.assertFalse(MarketSalesData.objects.exists())
+        self.assertFalse(MarketSalesSummary.objects.exists())
+
+    def test_rebuild_command(self):
+        create_market_rows(['1kg Nut Muesli'])
+        MarketSalesSummary.objects.filter(area='North').update(qty_sum=0)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_market_summary', '--check-only', stdout=StringIO(), stderr=StringIO())
+        call_command('rebuild_market_summary', stdout=StringIO())
+        self.assertEqual(check_market_summary(), [])
+
+
+class GroupChartTests(AnalyticsTestCase):
+    def test_matches_legacy_builder(self):
+        market, group = synthetic_rows(materials=6, market_rows=600, seed=1)
+        # 同一天重复的小组记录取最后一条；旧年份的市场数据被忽略
+        group.append(dict(group[0], price=9.99))
+        market.append({'material_description': market[0]['material_description'], 'date': date(2024, 1, 5), 'price': 99.0})
+        legacy = legacy_build(market, group)
+        chart_1kg, chart_500g, mats_1kg, mats_500g = vectorized_build(market, group)
+        self.assertEqual(chart_1kg, legacy[0])
+        self.assertEqual(chart_500g, legacy[1])
+        self.assertEqual(mats_1kg, sorted(legacy[2]))
+        self.assertEqual(mats_500g, sorted(legacy[3]))
+
+    def test_empty_tables(self):
+        self.assertEqual(vectorized_build([], []), legacy_build([], []))
+
+
+@skipUnless(connection.vendor == 'sqlite', '查询计划格式以 SQLite 为准')
+class QueryPlanTests(AnalyticsTestCase):
+    """检查两个 changelist_view 与图表接口发出的统计查询都走索引，防止后续修改退化为全表扫描"""
+    # 维表与每条序列一行的小表，整表读取是预期行为
+    whole_table_reads = {'ErpSim_demandforecast', 'ErpSim_roundcalendar', 'ErpSim_material', 'ErpSim_game'}
+
+    def setUp(self):
+        super().setUp()
+        create_market_rows([f'1kg Product {i}' for i in range(3)] + [f'500g Product {i}' for i in range(3)])
+        GroupSalesData.objects.create(
+            round=1, day=5, area='NO', sloc='02N', distribution_channel='12', material='JJ-F01',
+            material_description='1kg Product 0', price=4.5, qty=100, value=450, cost=200,
+        )
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(user)
+
+    def analytics_queries(self, url):
+        # 屏蔽父类的列表渲染，只捕获自定义统计部分发出的查询
+        with mock.patch.object(ImportExportModelAdmin, 'changelist_view', return_value=HttpResponse()):
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(url)
+        return [q['sql'] for q in ctx.captured_queries if 'ErpSim_' in q['sql']]
+
+    def assert_indexed(self, url):
+        queries = self.analytics_queries(url)
+        self.assertTrue(queries)
+        for sql in queries:
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = [row[-1] for row in cursor.fetchall()]
+            # 窗口函数的子查询只扫描已按索引取出的中间结果
+            full_scans = [
+                step for step in plan
+                if step.startswith('SCAN') and 'USING' not in step and not step.startswith('SCAN (subquery')
+                and step.split()[1] not in self.whole_table_reads
+            ]
+            self.assertEqual(full_scans, [], f"{sql}\n{plan}")
+
+    def test_market_changelist_uses_indexes(self):
+        self.assert_indexed(reverse('admin:ErpSim_marketsalesdata_changelist'))
+
+    def test_group_changelist_uses_indexes(self):
+        self.assert_indexed(reverse('admin:ErpSim_groupsalesdata_changelist'))
+
+    def test_chart_api_uses_indexes(self):
+        self.assert_indexed(reverse('erpsim:market_rounds'))
+
+
+class DashboardCacheTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(user)
+        self.url = reverse('admin:ErpSim_marketsalesdata_changelist')
+        create_market_rows(['1kg Nut Muesli', '500g Nut Muesli'])
+
+    def analytics_query_count(self, url=None):
+        with mock.patch.object(ImportExportModelAdmin, 'changelist_view', return_value=HttpResponse()):
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(url or self.url)
+        return len([q for q in ctx.captured_queries if 'ErpSim_' in q['sql']])
+
+    def test_repeated_loads_served_from_cache(self):
+        self.assertGreater(self.analytics_query_count(), 0)
+        self.assertEqual(self.analytics_query_count(), 0)
+        group_url = reverse('admin:ErpSim_groupsalesdata_changelist')
+        self.assertGreater(self.analytics_query_count(group_url), 0)
+        self.assertEqual(self.analytics_query_count(group_url), 0)
+
+    def test_save_invalidates_after_commit(self):
+        self.analytics_query_count()
+        version = get_data_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            MarketSalesData.objects.create(
+                date=date(2025, 1, 5), material_description='1kg Raisin Muesli',
+                area='North', qty=1, value=4, price=4,
+            )
+        self.assertNotEqual(get_data_version(), version)
+        self.assertGreater(self.analytics_query_count(), 0)
+
+    def test_delete_invalidates_after_commit(self):
+        version = get_data_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            MarketSalesData.objects.filter(material_description='1kg Nut Muesli').delete()
+        self.assertNotEqual(get_data_version(), version)
+
+    def test_bump_scheduled_once_per_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            MarketSalesData.objects.all().delete()
+        self.assertEqual(len(callbacks), 1)
+
+    def test_cost_update_refreshes_all_users(self):
+        self.analytics_query_count()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {'cost_update': '1', 'cost_1kg Nut Muesli': '2.5'})
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        # 成本价全队共用：其他用户看到同一份利润排行
+        other = get_user_model().objects.create_superuser('other', 'other@example.com', 'pass')
+        self.client.force_login(other)
+        response = self.client.get(self.url)
+        profit = {row['material_description']: row for row in response.context['profit_sorted']}
+        self.assertEqual(profit['1kg Nut Muesli']['cost'], 2.5)
+        self.assertEqual(profit['500g Nut Muesli']['cost'], 0.0)
+        self.assertEqual(response.context['cost_dict'], {'1kg Nut Muesli': 2.5, '500g Nut Muesli': 0.0})
+
+
+class BulkImportTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'EXPORT_MAR.xlsx')
+        write_market_export(self.path, 300)
+
+    def snapshot(self):
+        return sorted(MarketSalesData.objects.values_list(
+            'date', 'material_description', 'area', 'qty', 'value', 'price', 'round', 'game_day'))
+
+    def test_matches_row_by_row_import(self):
+        with open(self.path, 'rb') as f:
+            dataset = tablib.Dataset().load(f.read(), format='xlsx')
+        self.assertFalse(MarketData().import_data(dataset, dry_run=False).has_errors())
+        expected = self.snapshot()
+        # 两种导入方式都按日历写入轮次与游戏日
+        self.assertTrue(all(row[6] == row[0].month and row[7] == row[0].day for row in expected))
+        MarketSalesData.objects.all().delete()
+
+        stats = bulk_import(self.path, MARKET_SPEC, chunk_size=70)
+        self.assertEqual((stats['rows'], stats['created'], stats['updated']), (300, 300, 0))
+        self.assertEqual(self.snapshot(), expected)
+        self.assertEqual(check_market_summary(), [])
+        self.assertFalse(MarketSalesData.objects.filter(product__isnull=True).exists())
+        self.assertFalse(MarketSalesSummary.objects.filter(product__isnull=True).exists())
+
+        # 再次导入同一文件：按主键更新，不产生重复
+        stats = bulk_import(self.path, MARKET_SPEC, chunk_size=70)
+        self.assertEqual((stats['created'], stats['updated']), (0, 300))
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_group_duplicates_are_skipped(self):
+        from openpyxl import Workbook
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(list(GROUP_SPEC.columns))
+        row = [4, 20, 'WE', '02W', 12, 'JJ-F06', '500g Mixed Fruit Muesli', 3.8, 8000, 30400.0, 9040.0]
+        sheet.append(row)
+        sheet.append(row)
+        sheet.append([4, 'x'] + row[2:])
+        path = os.path.join(os.path.dirname(self.path), 'EXPORT_DETAIL.xlsx')
+        workbook.save(path)
+        stats = bulk_import(path, GROUP_SPEC)
+        self.assertEqual((stats['created'], stats['skipped'], stats['invalid']), (1, 1, 1))
+        stats = bulk_import(path, GROUP_SPEC)
+        self.assertEqual((stats['created'], stats['skipped']), (0, 2))
+        self.assertEqual(GroupSalesData.objects.get().distribution_channel, '12')
+        # 批量导入同时登记物料维表并补上编码
+        material = GroupSalesData.objects.get().product
+        self.assertEqual((material.code, material.package_size, material.family), ('JJ-F06', '500g', 'Mixed Fruit Muesli'))
+
+    def test_normalize_dates(self):
+        dates = normalize_dates(['04/20', '2024-01-05', 'bad'], year=2025)
+        self.assertEqual(dates[0].date(), date(2025, 4, 20))
+        self.assertEqual(dates[1].date(), date(2024, 1, 5))
+        self.assertTrue(dates.isna()[2])
+
+    def test_admin_bulk_import_view(self):
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(user)
+        url = reverse('admin:ErpSim_marketsalesdata_bulk_import')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with open(self.path, 'rb') as f:
+            upload = SimpleUploadedFile('EXPORT_MAR.xlsx', f.read())
+        response = self.client.post(url, {'import_file': upload})
+        self.assertRedirects(response, reverse('admin:ErpSim_marketsalesdata_changelist'), fetch_redirect_response=False)
+        self.assertEqual(MarketSalesData.objects.count(), 300)
+
+
+class IngestExportsTests(AnalyticsTestCase):
+    datasets = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'datasets')
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        for name in os.listdir(self.datasets):
+            if name.endswith('.xlsx') and not name.startswith('~$'):
+                with open(os.path.join(self.datasets, name), 'rb') as src, \
+                        open(os.path.join(self.directory, name), 'wb') as dst:
+                    dst.write(src.read())
+
+    def test_detect_export_type(self):
+        for export_type in ('DETAIL', 'MAR', 'SUM', 'INVENT', 'PRODUCTION'):
+            path = os.path.join(self.datasets, f'EXPORT_20250605{export_type}.xlsx')
+            self.assertEqual(detect_export_type(path), export_type)
+
+    def test_ingest_directory(self):
+        out = StringIO()
+        call_command('ingest_exports', self.directory, workers=2, stdout=out)
+        self.assertGreater(MarketSalesData.objects.count(), 0)
+        self.assertGreater(GroupSalesData.objects.count(), 0)
+        self.assertEqual(check_market_summary(), [])
+        self.assertEqual(InventoryData.objects.count(), 58)
+        self.assertEqual(ProductionOrder.objects.count(), 55)
+        self.assertIn('SUM', out.getvalue())
+
+    def test_parse_export_does_not_touch_database(self):
+        # 在子进程中运行：日历由主进程传入，解析过程不查询数据库
+        calendar = get_calendar()
+        with self.assertNumQueries(0):
+            export_type, chunks = parse_export(os.path.join(self.datasets, 'EXPORT_20250605MAR.xlsx'), calendar)
+        self.assertEqual(export_type, 'MAR')
+        self.assertGreater(sum(rows for _, rows, _ in chunks), 0)
+
+    def test_only_changed_files_are_picked_up(self):
+        command = IngestExportsCommand()
+        seen = command.changed_files(self.directory, {})
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(command.changed_files(self.directory, seen), {})
+        # 只改 mtime、内容不变：不重新导入
+        path = os.path.join(self.directory, 'EXPORT_20250605MAR.xlsx')
+        os.utime(path, (0, 0))
+        self.assertEqual(command.changed_files(self.directory, seen), {})
+        with open(path, 'ab') as f:
+            f.write(b'\0')
+        self.assertEqual(list(command.changed_files(self.directory, seen)), [path])
+
+
+class InventoryProductionTests(AnalyticsTestCase):
+    datasets = IngestExportsTests.datasets
+
+    def add_group_sales(self, mat, area, qty, days=(1, 2)):
+        for day in days:
+            GroupSalesData.objects.create(
+                round=1, day=day, area=area, sloc='02', distribution_channel='12', material='JJ-F01',
+                material_description=mat, price=4, qty=qty, value=qty * 4, cost=qty,
+            )
+
+    def test_import_exports(self):
+        stats = bulk_import(os.path.join(self.datasets, 'EXPORT_20250605INVENT.xlsx'), INVENT_SPEC)
+        self.assertEqual((stats['created'], stats['invalid']), (58, 0))
+        self.assertEqual(InventoryData.objects.get(storage_location='02N', material='JJ-F02').stock, 16594)
+        stats = bulk_import(os.path.join(self.datasets, 'EXPORT_20250605PRODUCTION.xlsx'), PRODUCTION_SPEC)
+        self.assertEqual((stats['created'], stats['invalid']), (55, 0))
+        order = ProductionOrder.objects.get(order='1000744')
+        self.assertEqual((order.start.month, order.start.day, order.target, order.confirmed), (4, 20, 16000, 6666))
+
+    def test_production_resource_reads_calendar_once(self):
+        dataset = tablib.Dataset(headers=[
+            'Order', 'Material Description', 'Start', 'Finish', 'Setup', 'Released', 'Target', 'Confirmed', 'Unit Cost',
+        ])
+        for i in range(5):
+            dataset.append((str(i), '1kg Nut Muesli', '01/05', '01/07', 0, '01/05', 1000, 0, 2.5))
+        with mock.patch('ErpSim.admin.get_calendar', wraps=get_calendar) as calendar:
+            result = ProductionOrderResource().import_data(dataset, dry_run=False)
+        self.assertFalse(result.has_errors())
+        self.assertEqual(calendar.call_count, 1)
+        finish = ProductionOrder.objects.get(order='4').finish
+        self.assertEqual((finish.month, finish.day), (1, 7))
+
+    def test_days_of_cover(self):
+        mat, game = '1kg Nut Muesli', active_game_id()
+        InventoryData.objects.bulk_create([
+            InventoryData(game_id=game, storage_location='02N', material='JJ-F11', material_description=mat, stock=1000, reserved=100, unit='ST'),
+            InventoryData(game_id=game, storage_location='02S', material='JJ-F11', material_description=mat, stock=50, reserved=0, unit='ST'),
+            InventoryData(game_id=game, storage_location='02', material='JJ-F11', material_description=mat, stock=500, reserved=0, unit='ST'),
+        ])
+        ProductionOrder.objects.create(
+            order='1', material_description=mat, start=date(2025, 1, 1), finish=date(2025, 1, 3), setup=0,
+            released=date(2025, 1, 1), target=4000, confirmed=1000, unit_cost=2.5,
+        )
+        self.add_group_sales(mat, 'NO', 300)
+        self.add_group_sales(mat, 'SO', 100)
+        with self.assertNumQueries(5):
+            rows = days_of_cover()
+        row = rows[0]
+        north, south, west = row['areas']
+        self.assertEqual((north['stock'], north['daily'], north['cover']), (900, 300, 3.0))
+        self.assertEqual(south['cover'], 0.5)
+        self.assertIsNone(west['cover'])
+        self.assertEqual((row['central'], row['producing'], row['min_cover']), (500, 3000, 0.5))
+        self.assertEqual(row['total_cover'], round(1450 / 400, 1))
+
+        summary = production_summary()
+        self.assertEqual((summary[0]['remaining'], summary[0]['unit_cost']), (3000, 2.5))
+
+    def test_region_allocation_subtracts_on_hand_stock(self):
+        create_market_rows(['1kg Nut Muesli'])
+        InventoryData.objects.create(
+            storage_location='02N', material='JJ-F11', material_description='1kg Nut Muesli',
+            stock=5000, reserved=0, unit='ST',
+        )
+        row = region_allocation()[1][0]
+        targets = [int(v) for v in row['stock'].split(' : ')]
+        self.assertEqual(row['on_hand'], '5000 : 0 : 0')
+        self.assertEqual(row['replenish'], f"{targets[0] - 5000} : {targets[1]} : {targets[2]}")
+
+    def test_changelists(self):
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(user)
+        bulk_import(os.path.join(self.datasets, 'EXPORT_20250605INVENT.xlsx'), INVENT_SPEC)
+        bulk_import(os.path.join(self.datasets, 'EXPORT_20250605PRODUCTION.xlsx'), PRODUCTION_SPEC)
+        for name in ('inventorydata', 'productionorder'):
+            response = self.client.get(reverse(f'admin:ErpSim_{name}_changelist'))
+            self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '500g Strawberry Muesli')
+
+
+class ChartApiTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        create_market_rows(['1kg Nut Muesli', '500g Nut Muesli'])
+        GroupSalesData.objects.create(
+            round=1, day=5, area='NO', sloc='02N', distribution_channel='12', material='JJ-F11',
+            material_description='1kg Nut Muesli', price=4.5, qty=100, value=450, cost=200,
+        )
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(user)
+        self.chart_url = reverse('erpsim:group_chart', args=[1, '1kg Nut Muesli'])
+
+    def test_group_chart_series(self):
+        response = self.client.get(self.chart_url)
+        self.assertEqual(response.status_code, 200)
+        series = response.json()
+        self.assertEqual(series['group_price'][series['x'].index('1-05')], 4.5)
+        self.assertEqual(self.client.get(reverse('erpsim:group_chart', args=[1, 'Unknown'])).status_code, 404)
+
+    def test_not_modified_until_data_changes(self):
+        url = reverse('erpsim:market_rounds')
+        response = self.client.get(url)
+        self.assertEqual({row['name'] for row in response.json()['1']}, {'1kg Nut Muesli', '500g Nut Muesli'})
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        with self.assertNumQueries(2):  # 仅会话与用户
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        bump_data_version()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_gzip(self):
+        response = self.client.get(self.chart_url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        # 压缩后的 ETag 变为弱校验，仍可用于条件请求
+        response = self.client.get(self.chart_url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_requires_staff(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('erpsim:market_rounds')).status_code, 302)
+
+    def test_changelist_no_longer_embeds_series(self):
+        response = self.client.get(reverse('admin:ErpSim_groupsalesdata_changelist'))
+        self.assertEqual(response.context['group_materials'], {'1kg': ['1kg Nut Muesli'], '500g': ['500g Nut Muesli']})
+        self.assertNotContains(response, '"market_max"')
+
+
+class ServerTimingTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        create_market_rows(['1kg Nut Muesli', '500g Nut Muesli'])
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(user)
+        self.url = reverse('admin:ErpSim_marketsalesdata_changelist')
+
+    def metrics(self, response):
+        return {m.split(';')[0]: m for m in response['Server-Timing'].split(', ')}
+
+    def test_header_lists_sections(self):
+        metrics = self.metrics(self.client.get(self.url))
+        for name in ('market_profit', 'market_region_allocation', 'render', 'sql', 'total'):
+            self.assertIn(name, metrics)
+        self.assertIn('desc="miss"', metrics['market_profit'])
+        # 第二次请求各区块直接读缓存
+        self.assertIn('desc="hit"', self.metrics(self.client.get(self.url))['market_profit'])
+        self.assertIn('json', self.metrics(self.client.get(reverse('erpsim:market_rounds'))))
+
+    def test_query_count_matches(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', self.metrics(response)['total'])
+
+    def test_panel(self):
+        with override_settings(ERPSIM_TIMING_PANEL=False):
+            response = self.client.get(self.url)
+        self.assertNotContains(response, 'erpsim-timing-panel')
+        with override_settings(ERPSIM_TIMING_PANEL=True):
+            response = self.client.get(reverse('admin:ErpSim_inventorydata_changelist'))
+        self.assertContains(response, 'erpsim-timing-panel')
+        self.assertContains(response, 'inventory_cover')
+        self.assertNotContains(response, TIMING_PANEL_MARKER)
+
+    def test_not_for_anonymous(self):
+        self.client.logout()
+        self.assertFalse(self.client.get(self.url).has_header('Server-Timing'))
+
+    def test_timed_outside_request(self):
+        with timed('noop') as section:
+            self.assertIsNone(section)
+        with collect_timings() as timings:
+            with timed('outer'):
+                MarketSalesData.objects.count()
+        self.assertEqual(timings.sections['outer']['queries'], 1)
+
+
+class StartupTests(TestCase):
+    def test_setup_and_autodiscover_issue_no_queries(self):
+        # 新进程中执行 django.setup()（admin 自动发现）并加载 URL 配置，期间不应访问数据库
+        result = probe()
+        self.assertEqual(result['queries'], [])
+
+
+class RoundCalendarTests(AnalyticsTestCase):
+    def test_default_calendar(self):
+        self.assertEqual(DEFAULT_CALENDAR.round_of(date(2025, 1, 5)), 1)
+        self.assertEqual(DEFAULT_CALENDAR.round_of('2025-04-20'), 4)
+        self.assertIsNone(DEFAULT_CALENDAR.round_of(date(2025, 1, 4)))
+        self.assertIsNone(DEFAULT_CALENDAR.round_of(date(2025, 5, 10)))
+        grid = {(r, d): ref for r, d, ref in DEFAULT_CALENDAR.grid()}
+        self.assertEqual(len(grid), 4 * 16)
+        # 第 1 轮 1-5/6-10/...，之后各轮 5-10/11-15/16-20
+        self.assertEqual((grid[1, 5], grid[1, 6], grid[1, 20]), (5, 10, 20))
+        self.assertEqual((grid[2, 5], grid[2, 10], grid[2, 11]), (10, 10, 15))
+        rounds, days, refs = DEFAULT_CALENDAR.lookup([date(2025, 2, 5), date(2025, 2, 21)])
+        self.assertEqual((rounds.tolist(), days.tolist(), refs.tolist()), ([2, 0], [5, 0], [10, 0]))
+
+    def test_six_round_calendar(self):
+        create_market_rows(['1kg Nut Muesli'], days=(5, 10))
+        MarketSalesData.objects.create(
+            date=date(2025, 6, 10), material_description='1kg Nut Muesli', area='North', qty=7, value=28, price=4,
+        )
+        refresh_market_summary()
+        self.assertIsNone(MarketSalesSummary.objects.get(date=date(2025, 6, 10)).round)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RoundCalendar.objects.create(name='六轮', year=2025, rounds=6)
+        # 测试事务中之前登记过的版本号更新不会执行，手动更新
+        bump_data_version()
+        calendar = get_calendar()
+        self.assertEqual(calendar.rounds, [1, 2, 3, 4, 5, 6])
+        self.assertEqual(calendar.labels()[6], '第六轮（6月5日-6月20日）')
+        # 日历修改后市场数据与汇总表的轮次按新日历重算
+        self.assertEqual(MarketSalesSummary.objects.get(date=date(2025, 6, 10)).round, 6)
+        self.assertEqual(
+            list(MarketSalesData.objects.filter(date=date(2025, 6, 10)).values_list('round', 'game_day')), [(6, 10)])
+        self.assertEqual(normalize_dates(['06/10']).dt.year.tolist(), [2025])
+
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(user)
+        rounds = self.client.get(reverse('erpsim:market_rounds')).json()
+        self.assertEqual(rounds['6'], [{'name': '1kg Nut Muesli', 'qty': 7.0}])
+        response = self.client.get(reverse('admin:ErpSim_groupsalesdata_changelist'))
+        self.assertContains(response, '<option value="6">第6轮</option>', html=True)
+
+    def test_single_active_calendar(self):
+        first = RoundCalendar.objects.create(name='四轮')
+        RoundCalendar.objects.create(name='八轮', rounds=8)
+        first.refresh_from_db()
+        self.assertFalse(first.is_active)
+        bump_data_version()
+        self.assertEqual(len(get_calendar().rounds), 8)
+
+
+class AllocationTests(TestCase):
+    def test_matches_legacy_tiers(self):
+        rows = synthetic_region_rows(products=15, areas=3, seed=2)
+        # 无销量的产品均分比例；同销量的产品保持原顺序
+        rows += [
+            {'material_description': 'Zero', 'area': 'North', 'qty_sum': 0.0},
+            {'material_description': 'Tie A', 'area': ' south ', 'qty_sum': 150000.0},
+            {'material_description': 'Tie B', 'area': 'West', 'qty_sum': 150000.0},
+        ]
+        areas, region_list = region_preference(rows)
+        self.assertEqual(areas, ['north', 'south', 'west'])
+        self.assertEqual(region_list, legacy_region_allocation(rows))
+        stocks = [row['stock'] for row in region_list]
+        self.assertEqual([max(map(int, s.split(' : '))) for s in stocks[:11]], [12000] * 4 + [10000] * 3 + [8000] * 3 + [0])
+
+    def test_any_number_of_areas(self):
+        rows = synthetic_region_rows(products=30, areas=10, seed=3)
+        areas, region_list = region_preference(rows)
+        self.assertEqual(len(areas), 10)
+        self.assertEqual(areas[:3], ['north', 'south', 'west'])
+        self.assertEqual(region_list, legacy_region_allocation(rows, areas))
+
+    def test_allocate_stock_matrix(self):
+        qty = np.array([[0.0, 0.0], [10.0, 30.0], [40.0, 40.0]])
+        order, ratios, stock = allocate_stock(qty, tiers=((1, 900), (1, 600)))
+        self.assertEqual(order.tolist(), [2, 1, 0])
+        self.assertEqual(stock.tolist(), [[900, 900], [200, 600], [0, 0]])
+        self.assertEqual(ratios[2].tolist(), [0.5, 0.5])
+
+
+class ForecastTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        create_market_rows(['1kg Nut Muesli', '500g Nut Muesli'], days=(5, 10, 15, 20))
+
+    def test_holt_fit_linear_series(self):
+        alpha, beta, level, trend, sse = holt_fit([100, 110, 120, 130, 140, 150])
+        self.assertAlmostEqual(level + trend, 160)
+        self.assertAlmostEqual(sse, 0)
+
+    def test_incremental_refit(self):
+        stats = refit_forecasts()
+        self.assertEqual((stats['series'], stats['fitted']), (6, 6))
+        self.assertEqual(refit_forecasts()['unchanged'], 6)
+        before = DemandForecast.objects.get(material_description='1kg Nut Muesli', area='North')
+
+        # 新的一天只做增量递推，参数沿用原来的
+        MarketSalesData.objects.create(
+            date=date(2025, 2, 5), material_description='1kg Nut Muesli', area='North', qty=130, value=520, price=4,
+        )
+        refresh_market_summary([date(2025, 2, 5)])
+        stats = refit_forecasts()
+        self.assertEqual((stats['fitted'], stats['incremental'], stats['unchanged']), (0, 1, 5))
+        after = DemandForecast.objects.get(material_description='1kg Nut Muesli', area='North')
+        self.assertEqual((after.alpha, after.beta, after.n_obs), (before.alpha, before.beta, 5))
+        level = before.alpha * 130 + (1 - before.alpha) * (before.level + before.trend)
+        self.assertAlmostEqual(after.level, level)
+
+        # 修改了已拟合的历史数据时重新拟合
+        MarketSalesData.objects.filter(date=date(2025, 1, 5), area='South').update(qty=500)
+        refresh_market_summary([date(2025, 1, 5)])
+        stats = refit_forecasts()
+        self.assertEqual((stats['fitted'], stats['unchanged']), (2, 4))
+
+    def test_process_pool_matches_serial(self):
+        batches = [[np.arange(10.0) ** 1.5, np.ones(5)], [np.array([3.0, 1, 4, 1, 5, 9, 2, 6])]]
+        self.assertEqual(fit_all(batches, workers=2), fit_all(batches, workers=1))
+
+    def test_forecast_feeds_allocation(self):
+        rows = [
+            {'material_description': 'A', 'area': 'North', 'qty_sum': 300.0},
+            {'material_description': 'A', 'area': 'South', 'qty_sum': 100.0},
+        ]
+        _, (row,) = region_preference(rows, forecast={('A', 'north'): 100.0, ('A', 'south'): 100.0})
+        self.assertEqual((row['forecast'], row['stock'], row['ratio']), ('100 : 100', '12000 : 12000', '2.0 : 2.0'))
+
+    def test_market_changelist_shows_forecast(self):
+        refit_forecasts()
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(user)
+        response = self.client.get(reverse('admin:ErpSim_marketsalesdata_changelist'))
+        self.assertEqual(len(response.context['forecast_rows']), 2)
+        self.assertNotEqual(response.context['region_list'][0]['forecast'], '-')
+
+
+class MaterialTests(AnalyticsTestCase):
+    def test_split_description(self):
+        self.assertEqual(split_description('1kg Nut Muesli'), ('1kg', 'Nut Muesli'))
+        self.assertEqual(split_description(' 500 G Mixed Fruit Muesli '), ('500g', 'Mixed Fruit Muesli'))
+        self.assertEqual(split_description('Blueberry Muesli'), ('', 'Blueberry Muesli'))
+
+    def test_ensure_materials_is_idempotent(self):
+        ids = ensure_materials(['1kg Nut Muesli', '500g Nut Muesli'])
+        self.assertEqual(ensure_materials(['1kg Nut Muesli'], {'1kg Nut Muesli': 'NU-01'}), {'1kg Nut Muesli': ids['1kg Nut Muesli']})
+        self.assertEqual(Material.objects.count(), 2)
+        self.assertEqual(Material.objects.get(pk=ids['1kg Nut Muesli']).code, 'NU-01')
+
+    def test_single_row_save_links_material(self):
+        row = GroupSalesData.objects.create(
+            round=1, day=5, area='North', sloc='02N', distribution_channel='10', material='NU-02',
+            material_description='500g Nut Muesli', price=4.0, qty=10, value=40, cost=20,
+        )
+        self.assertEqual((row.product.description, row.product.code), ('500g Nut Muesli', 'NU-02'))
+
+    def test_package_split_uses_material_table(self):
+        # 描述中没有规格前缀的物料按维表中维护的包装规格归组
+        create_market_rows(['Nut Muesli Large', '1kg Raisin Muesli'])
+        Material.objects.filter(description='Nut Muesli Large').update(package_size='1kg')
+        _, _, mats_1kg, mats_500g = group_charts()
+        self.assertEqual(mats_1kg, ['1kg Raisin Muesli', 'Nut Muesli Large'])
+        self.assertEqual(mats_500g, [])
+        products = dict(product_list())
+        self.assertEqual(products['Nut Muesli Large'], '1kg')
+
+
+class GameTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(user)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'EXPORT_MAR.xlsx')
+        write_market_export(self.path, 60)
+        self.practice = active_game_id()
+        bulk_import(self.path, MARKET_SPEC)
+
+    def select_game(self, game, client=None):
+        url = reverse('admin:ErpSim_game_select')
+        response = (client or self.client).post(url, {'game': game.pk, 'next': '/admin/'})
+        self.assertRedirects(response, '/admin/', fetch_redirect_response=False)
+
+    def test_selected_game_is_per_session(self):
+        live = Game.objects.create(name='正式赛', team='JJ', is_active=False)
+        bump_data_version()
+        self.select_game(live)
+        # 只切换本会话查看的比赛：导入目标与其他用户不受影响
+        self.assertEqual(active_game_id(), self.practice)
+        self.assertTrue(Game.objects.get(pk=self.practice).is_active)
+        changelist = reverse('admin:ErpSim_marketsalesdata_changelist')
+        self.assertEqual(self.client.get(changelist).context['cl'].result_count, 0)
+        self.assertFalse(any(self.client.get(reverse('erpsim:market_rounds')).json().values()))
+        other = Client()
+        other.force_login(get_user_model().objects.create_superuser('teammate', 'mate@example.com', 'pass'))
+        self.assertEqual(other.get(changelist).context['cl'].result_count, 60)
+        self.assertTrue(any(other.get(reverse('erpsim:market_rounds')).json().values()))
+        with viewing_game(live.pk):
+            self.assertEqual(active_game_id(), live.pk)
+            self.assertEqual(region_allocation()[1], [])
+            # 新增记录写入导入目标而不是所查看的比赛
+            row = MarketSalesData.objects.create(
+                date=date(2025, 1, 15), material_description='1kg Nut Muesli', area='North', qty=1, value=1, price=1,
+            )
+        self.assertEqual(row.game_id, self.practice)
+        response = self.client.get(changelist)
+        self.assertContains(response, 'id="game-select"')
+        self.assertContains(response, f'导入目标：{Game.objects.get(pk=self.practice)}')
+
+    def test_import_target_is_separate_setting(self):
+        live = Game.objects.create(name='正式赛', team='JJ', is_active=False)
+        live.is_active = True
+        live.save()
+        bump_data_version()
+        self.assertEqual(active_game_id(), live.pk)
+        self.assertFalse(Game.objects.get(pk=self.practice).is_active)
+        # 同一文件导入新比赛：不会匹配到练习赛的行，两场比赛各有一份
+        stats = bulk_import(self.path, MARKET_SPEC)
+        self.assertEqual((stats['created'], stats['updated']), (60, 0))
+        self.assertEqual(MarketSalesData.objects.filter(game=self.practice).count(), 60)
+        self.assertEqual(check_market_summary(), [])
+        self.assertEqual(
+            MarketSalesSummary.objects.filter(game=live).count(),
+            MarketSalesSummary.objects.filter(game=self.practice).count(),
+        )
+        # 查看练习赛的会话仍只看到练习赛的行
+        self.select_game(Game.objects.get(pk=self.practice))
+        self.assertEqual(
+            self.client.get(reverse('admin:ErpSim_marketsalesdata_changelist')).context['cl'].result_count, 60,
+        )
+
+    def test_resource_import_uses_import_target_while_viewing_other_game(self):
+        live = Game.objects.create(name='正式赛', team='JJ', is_active=False)
+        bump_data_version()
+        day = date(get_calendar().import_year(), 1, 20)
+        MarketSalesData.objects.create(
+            game=live, date=day, material_description='1kg Test Muesli', area='North',
+            qty=100, value=400, price=4.0,
+        )
+        refresh_market_summary([day], game=live.pk)
+        dataset = tablib.Dataset(('01/20', '1kg Test Muesli', 'North', 300, 1200, 4.0),
+                                 headers=['Date', 'Material Description', 'Area', 'Qty', 'Value', 'Price'])
+        with viewing_game(live.pk):
+            self.assertFalse(MarketData().import_data(dataset, dry_run=False).has_errors())
+        # 查找、新增与汇总刷新都落在导入目标比赛，所查看比赛的行不被改写
+        key = {'material_description': '1kg Test Muesli', 'area': 'North', 'date': day}
+        self.assertEqual(MarketSalesData.objects.get(game=live, **key).qty, 100)
+        self.assertEqual(MarketSalesData.objects.get(game=self.practice, **key).qty, 300)
+        self.assertEqual(MarketSalesData.objects.filter(game=self.practice).count(), 61)
+        self.assertEqual(check_market_summary(), [])
+
+    def test_delete_all_records_keeps_other_games(self):
+        live = Game.objects.create(name='正式赛', team='JJ')
+        bump_data_version()
+        bulk_import(self.path, MARKET_SPEC)
+        self.client.post(reverse('admin:ErpSim_marketsalesdata_changelist'), {
+            'action': 'delete_all_records', '_selected_action': [MarketSalesData.objects.filter(game=live).first().pk],
+        })
+        self.assertFalse(MarketSalesData.objects.filter(game=live).exists())
+        self.assertFalse(MarketSalesSummary.objects.filter(game=live).exists())
+        self.assertEqual(MarketSalesData.objects.filter(game=self.practice).count(), 60)
+
+
+class PurgeTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        create_market_rows(['1kg Nut Muesli', '500g Nut Muesli'])
+        refit_forecasts(workers=1)
+
+    def test_purge_skips_collector_and_clears_derived_rows(self):
+        other = Game.objects.create(name='练习赛', is_active=False)
+        MarketSalesData.objects.filter(pk=MarketSalesData.objects.first().pk).update(game=other)
+        with CaptureQueriesContext(connection) as ctx, mock.patch('ErpSim.purge.schedule_data_version_bump') as bump:
+            count = purge(MarketSalesData)
+        self.assertEqual(count, 11)
+        # 不再逐行取出对象：没有按主键列表删除的语句
+        self.assertFalse([q for q in ctx.captured_queries if '"id" IN (' in q['sql']])
+        self.assertEqual(list(MarketSalesData.objects.values_list('game', flat=True)), [other.pk])
+        self.assertFalse(game_rows(MarketSalesSummary).exists())
+        self.assertFalse(game_rows(DemandForecast).exists())
+        bump.assert_called_once()
+
+    def test_scoped_purge_keeps_summary_consistent(self):
+        self.assertEqual(purge(MarketSalesData, start=date(2025, 1, 6)), 6)
+        self.assertEqual(set(MarketSalesData.objects.values_list('date', flat=True)), {date(2025, 1, 5)})
+        self.assertEqual(check_market_summary(), [])
+        # 部分删除时保留预测，下次增量更新发现历史变化会重新拟合
+        self.assertTrue(DemandForecast.objects.exists())
+        with self.assertRaises(ValueError):
+            purge(InventoryData, rounds=[1])
+
+    def test_other_delete_receivers_fall_back_to_orm_delete(self):
+        deleted = []
+
+        def receiver(sender, instance, **kwargs):
+            deleted.append(instance.pk)
+
+        pre_delete.connect(receiver, sender=MarketSalesData)
+        self.addCleanup(pre_delete.disconnect, receiver, sender=MarketSalesData)
+        self.assertEqual(fast_delete(MarketSalesData.objects.filter(round=1)), 12)
+        self.assertEqual(len(deleted), 12)
+
+
+class ExportTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        create_market_rows(['1kg Nut Muesli', '500g Nut Muesli'])
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(user)
+
+    def read_csv(self, response):
+        self.assertTrue(response.streaming)
+        return list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+
+    def test_raw_csv(self):
+        response = self.client.get(reverse('erpsim:export', args=['market']))
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="market.csv"')
+        rows = self.read_csv(response)
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(rows[0]['date'], '2025-01-05')
+        self.assertNotIn('game_id', rows[0])
+
+    def test_derived_datasets(self):
+        save_costs({'1kg Nut Muesli': 1.0})
+        profit = self.read_csv(self.client.get(reverse('erpsim:export', args=['profit_ranking'])))
+        self.assertEqual({row['material_description']: float(row['cost']) for row in profit},
+                         {'1kg Nut Muesli': 1.0, '500g Nut Muesli': 0.0})
+        regions = self.read_csv(self.client.get(reverse('erpsim:export', args=['region_allocation'])))
+        self.assertEqual(len(regions), 2 * len(region_allocation()[0]))
+        # 导出的是区域份额而不是看板上放大取整后的比例
+        nut = [row for row in regions if row['material_description'] == '1kg Nut Muesli']
+        total = sum(float(row['qty']) for row in nut)
+        for row in nut:
+            self.assertAlmostEqual(float(row['ratio']), float(row['qty']) / total)
+        self.assertEqual({row['forecast'] for row in nut}, {''})
+        prices = self.read_csv(self.client.get(reverse('erpsim:export', args=['group_prices'])))
+        self.assertEqual({row['package_size'] for row in prices}, {'1kg', '500g'})
+
+    @skipUnless(pa is not None, '需要 pyarrow')
+    def test_parquet(self):
+        _, chunks = stream_export('market', 'parquet')
+        table = pq.read_table(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(table.num_rows, 12)
+        self.assertEqual(str(table.schema.field('date').type), 'date32[day]')
+
+    def test_parquet_falls_back_to_csv_and_rejects_unknown(self):
+        with mock.patch('ErpSim.exports.pa', None):
+            response = self.client.get(reverse('erpsim:export', args=['market']), {'format': 'parquet'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(len(self.read_csv(response)), 12)
+        self.assertEqual(self.client.get(reverse('erpsim:export', args=['market']), {'format': 'xlsx'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('erpsim:export', args=['unknown'])).status_code, 404)
+
+    async def test_asgi_streams_chunks_without_collecting(self):
+        await self.async_client.aforce_login(await sync_to_async(get_user_model().objects.get)(username='admin'))
+        response = await self.async_client.get(reverse('erpsim:export', args=['market']))
+        # 同步迭代器在 ASGI 下会被 sync_to_async(list) 整个收集
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        rows = list(csv.DictReader(io.StringIO(b''.join(chunks).decode('utf-8'))))
+        self.assertEqual(len(rows), 12)
+
+
+class PricingTests(AnalyticsTestCase):
+    def test_batched_fit_matches_polyfit(self):
+        codes, x, qty = synthetic_observations(materials=20, per_material=30)
+        # 最后一个物料只保留 2 条观测，无法拟合
+        keep = (codes < 19) | (np.arange(codes.size) < 19 * 30 + 2)
+        a, b, n = fit_curves(codes[keep], x[keep], qty[keep], 20)
+        expected_a, expected_b = legacy_fit(codes[keep], x[keep], qty[keep], 19)
+        np.testing.assert_allclose(a[:19], expected_a)
+        np.testing.assert_allclose(b[:19], expected_b)
+        self.assertTrue(np.isnan(b[19]))
+        self.assertEqual(n[19], 2)
+
+    def test_recommended_price_maximizes_profit(self):
+        curves = {
+            'materials': ['A', 'B', 'C'], 'observations': np.array([10, 10, 1]),
+            'a': np.array([1200.0, 100.0, np.nan]), 'b': np.array([-900.0, 50.0, np.nan]),
+            'low': np.array([4.0, 4.0, 4.0]), 'high': np.array([7.0, 7.0, 7.0]),
+        }
+        a, b, c = recommend_prices(curves, {'A': 2.5})
+        # (4 + 3x - 2.5)(1200 - 900x) 在 x = 5/12 处最大
+        self.assertEqual(a['price'], 5.25)
+        self.assertEqual(a['qty'], 825)
+        # 销量随价格上升时取市场最高价，无法拟合时不给建议
+        self.assertEqual(b['price'], 7.0)
+        self.assertIsNone(c['price'])
+
+    def test_group_dashboard_recommendations(self):
+        names = write_pricing_rows(materials=3, rounds=2)
+        bump_data_version()
+        save_costs({names[0]: 3.0})
+        rows = price_recommendations()
+        self.assertEqual([row['material_description'] for row in rows], sorted(names))
+        for row in rows:
+            self.assertTrue(row['market_low'] <= row['price'] <= row['market_high'])
+            self.assertLess(row['elasticity'], 0)
+        # 曲线与建议价格都按数据版本缓存
+        with self.assertNumQueries(0):
+            price_recommendations()
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(user)
+        response = self.client.get(reverse('admin:ErpSim_groupsalesdata_changelist'))
+        self.assertEqual(len(response.context['price_rows']), 3)
+        self.assertContains(response, '定价建议')
+
+
+class MaterialCostTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        create_market_rows(['1kg Nut Muesli', '500g Nut Muesli'])
+        self.ids = ensure_materials(['1kg Nut Muesli', '500g Nut Muesli'])
+
+    def test_save_costs_recomputes_stored_profits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(save_costs({'1kg Nut Muesli': 2.0}), 1)
+        self.assertEqual(save_costs({'1kg Nut Muesli': 2.0}), 0)
+        with self.assertNumQueries(1):
+            rows = profit_table()
+        # 最新一天（1 月 10 日）的最高价：1kg 为 7.0，500g 为 7.01
+        self.assertEqual([row['material_description'] for row in rows], ['500g Nut Muesli', '1kg Nut Muesli'])
+        self.assertEqual([row['rank'] for row in rows], [1, 2])
+        self.assertEqual([row['qty_rank'] for row in rows], [1, 2])
+        self.assertAlmostEqual(rows[1]['profit'], 5.0)
+        self.assertAlmostEqual(rows[1]['margin'], 5.0 / 7.0)
+        self.assertEqual(rows[0]['cost'], 0.0)
+
+    def test_effective_cost_follows_round_and_date(self):
+        product = self.ids['1kg Nut Muesli']
+        game = active_game_id()
+        MaterialCost.objects.bulk_create([
+            MaterialCost(game_id=game, product_id=product, round=1, cost=2.0),
+            MaterialCost(game_id=game, product_id=product, round=1, effective_date=date(2025, 1, 10), cost=3.0),
+            # 尚未生效：日期晚于最新数据，或属于之后的轮次
+            MaterialCost(game_id=game, product_id=product, round=1, effective_date=date(2025, 1, 12), cost=4.0),
+            MaterialCost(game_id=game, product_id=product, round=2, cost=5.0),
+        ])
+        self.assertEqual(current_costs(), {'1kg Nut Muesli': 3.0})
+
+    def test_row_edit_refreshes_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            cost = MaterialCost.objects.create(product_id=self.ids['1kg Nut Muesli'], round=1, cost=1.5)
+            cost.cost = 2.5
+            cost.save()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(MaterialProfit.objects.get(product_id=self.ids['1kg Nut Muesli']).cost, 2.5)
+        duplicate = MaterialCost(product_id=self.ids['1kg Nut Muesli'], round=1, cost=3.0)
+        with self.assertRaises(ValidationError):
+            duplicate.full_clean()
+
+    def test_price_change_refreshes_profits(self):
+        save_costs({'1kg Nut Muesli': 2.0})
+        create_market_rows(['1kg Nut Muesli'], days=(12,), areas=('North',))
+        row = MaterialProfit.objects.get(product_id=self.ids['1kg Nut Muesli'])
+        self.assertAlmostEqual(row.price, 4 + 1.2)
+        self.assertAlmostEqual(row.profit, 4 + 1.2 - 2.0)
+
+
+class LiveUpdateTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        create_market_rows(['1kg Nut Muesli', '500g Nut Muesli'])
+
+    def test_delta_covers_only_changed_rounds(self):
+        game, cursor = live_state()
+        self.assertEqual(cursor, '2025-01-10')
+        MarketSalesData.objects.create(
+            date=date(2025, 1, 15), material_description='1kg Nut Muesli', area='North', qty=50, value=500, price=10,
+        )
+        refresh_market_summary([date(2025, 1, 15)])
+        bump_data_version()
+        update = live_update(game, cursor)
+        self.assertFalse(update['reset'])
+        self.assertEqual(update['cursor'], '2025-01-15')
+        self.assertEqual(list(update['rounds']), ['1'])
+        self.assertEqual(update['rounds']['1'][0], {'name': '1kg Nut Muesli', 'qty': 2 * 3 * 100 + 50})
+        self.assertEqual(update['prices']['1kg Nut Muesli'], 10)
+        # 切换比赛后整体替换
+        other = Game.objects.create(name='第二场')
+        bump_data_version()
+        update = live_update(game, cursor)
+        self.assertEqual((update['game'], update['reset'], update['cursor']), (other.pk, True, None))
+
+    @override_settings(ERPSIM_LIVE_POLL_INTERVAL=0.01)
+    async def test_event_stream_pushes_update_after_import(self):
+        user = await sync_to_async(get_user_model().objects.create_superuser)('admin', 'admin@example.com', 'pass')
+        await self.async_client.aforce_login(user)
+        game, cursor = await sync_to_async(live_state)()
+        version = await sync_to_async(get_data_version)()
+        response = await self.async_client.get(
+            reverse('erpsim:live'), {'version': version, 'game': game, 'cursor': cursor},
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b'retry: 1000\n\n')
+        await sync_to_async(bump_data_version)()
+        event = (await anext(events)).decode('utf-8')
+        self.assertIn('event: update', event)
+        self.assertEqual(json.loads(event.split('data: ', 1)[1])['cursor'], '2025-01-10')
+        await events.aclose()
+
+    @override_settings(ERPSIM_LIVE_POLL_INTERVAL=0.01)
+    def test_event_stream_is_sync_under_wsgi(self):
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        game, cursor = live_state()
+        response = self.client.get(
+            reverse('erpsim:live'), {'version': get_data_version(), 'game': game, 'cursor': cursor},
+        )
+        # 异步生成器在 WSGI 下要等整个连接结束才会发送
+        self.assertFalse(response.is_async)
+        events = iter(response.streaming_content)
+        self.assertEqual(next(events), b'retry: 1000\n\n')
+        bump_data_version()
+        self.assertIn('event: update', next(events).decode('utf-8'))
+        response.close()
+
+
+class MarketDashboardApiTests(AnalyticsTestCase):
+    async def test_async_view_returns_all_sections(self):
+        await sync_to_async(create_market_rows)(['1kg Nut Muesli', '500g Nut Muesli'])
+        user = await sync_to_async(get_user_model().objects.create_superuser)('admin', 'admin@example.com', 'pass')
+        await self.async_client.aforce_login(user)
+        data = (await self.async_client.get(reverse('erpsim:market_dashboard'))).json()
+        self.assertEqual([mat for mat, _ in data['products']], ['1kg Nut Muesli', '500g Nut Muesli'])
+        self.assertEqual(len(data['profit']), 2)
+        self.assertEqual(len(data['regions']['rows']), 2)
+        self.assertEqual(set(data['rounds']['1'][0]), {'name', 'qty'})
+
+    async def test_server_timing_runs_natively_async(self):
+        async def view(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(ServerTimingMiddleware(view)))
+        await sync_to_async(create_market_rows)(['1kg Nut Muesli'])
+        user = await sync_to_async(get_user_model().objects.create_superuser)('admin', 'admin@example.com', 'pass')
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse('erpsim:market_dashboard'))
+        total = [m for m in response['Server-Timing'].split(', ') if m.startswith('total;')][0]
+        self.assertNotIn('desc="0 queries"', total)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ConcurrentSectionTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        create_market_rows(['1kg Nut Muesli', '500g Nut Muesli'])
+
+    def test_sections_run_concurrently_on_separate_connections(self):
+        self.assertFalse(run_inline())
+        expected = {name: builder() for name, (builder, _) in market_sections().items()}
+        cache.clear()
+        self.assertEqual(compute_sections(market_sections()), expected)
+
+        def slow():
+            time.sleep(0.2)
+            return MarketSalesData.objects.count()
+
+        started = time.perf_counter()
+        results = compute_sections({f'slow_{i}': (slow, ()) for i in range(4)})
+        self.assertEqual(set(results.values()), {12})
+        self.assertLess(time.perf_counter() - started, 0.6)
+
+    def test_inline_inside_transaction(self):
+        with transaction.atomic():
+            self.assertTrue(run_inline())
+
+
+@skipUnless(duckdb is not None, '需要 duckdb')
+class AnalyticsBackendTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(reset_duckdb)
+        settings = override_settings(ERPSIM_PARQUET_DIR=tmp.name, ERPSIM_DUCKDB_SOURCE='parquet')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        create_market_rows(['1kg Nut Muesli', '500g Nut Muesli'])
+        write_pricing_rows(materials=3, rounds=2)
+        bump_data_version()
+
+    def on_both(self, func):
+        results = []
+        for backend in ('django', 'duckdb'):
+            with override_settings(ERPSIM_ANALYTICS_BACKEND=backend):
+                self.assertEqual(analytics_backend(), backend)
+                results.append(func())
+        return results
+
+    def test_backends_agree(self):
+        for func in (round_chart_data, region_allocation, daily_sales_by_area):
+            expected, result = self.on_both(func)
+            self.assertEqual(result, expected, func.__name__)
+        expected, result = self.on_both(load_observations)
+        for a, b in zip(expected[:3], result[:3]):
+            np.testing.assert_allclose(a, b)
+        self.assertEqual(expected[3], result[3])
+        query = partial(
+            aggregate, MarketSalesSummary, ['area'], {'rows': ('count', 'id'), 'low': ('min', 'min_price')},
+            {'date__lt': date(2025, 1, 10), 'area__in': ['North', 'West'], 'product__isnull': False},
+            order_by=['-area'],
+        )
+        expected, result = self.on_both(query)
+        self.assertEqual([row['area'] for row in result], ['West', 'North'])
+        self.assertEqual(result, expected)
+
+    def test_snapshot_follows_data_version(self):
+        with override_settings(ERPSIM_ANALYTICS_BACKEND='duckdb'):
+            before = region_allocation()
+            old_path = snapshot_path(MarketSalesSummary, active_game_id(), get_data_version())
+            self.assertTrue(os.path.exists(old_path))
+            create_market_rows(['1kg Raisin Muesli'])
+            self.assertNotEqual(region_allocation(), before)
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(snapshot_path(MarketSalesSummary, active_game_id(), get_data_version())))
+
+    def test_snapshot_covers_only_current_game(self):
+        practice = active_game_id()
+        live = Game.objects.create(name='正式赛', team='JJ')
+        bump_data_version()
+        create_market_rows(['1kg Raisin Muesli'])
+        with override_settings(ERPSIM_ANALYTICS_BACKEND='duckdb'):
+            rows = round_chart_data()
+        self.assertEqual([item['name'] for item in rows['1']], ['1kg Raisin Muesli'])
+        path = snapshot_path(MarketSalesSummary, live.pk, get_data_version())
+        count = duckdb.sql(f"SELECT COUNT(*) FROM read_parquet('{path}')").fetchone()[0]
+        self.assertEqual(count, MarketSalesSummary.objects.filter(game=live).count())
+        # 历史比赛没有随这次数据变化重新导出
+        self.assertFalse(os.path.exists(snapshot_path(MarketSalesSummary, practice, get_data_version())))
+
+    def test_snapshot_of_one_game_keeps_other_games_views(self):
+        practice = active_game_id()
+        with override_settings(ERPSIM_ANALYTICS_BACKEND='duckdb'):
+            round_chart_data()
+            live = Game.objects.create(name='正式赛', team='JJ')
+            bump_data_version()
+            create_market_rows(['1kg Raisin Muesli'])
+            round_chart_data()
+            # 正式赛导出新快照后，练习赛仍在使用的视图（其他线程、尚未更新版本号的进程）照常可查
+            connection, _ = duckdb_connection(MarketSalesSummary, live.pk)
+            count = connection.execute(f'SELECT COUNT(*) FROM "{MarketSalesSummary._meta.db_table}__{practice}"')
+            self.assertEqual(count.fetchone()[0], MarketSalesSummary.objects.filter(game=practice).count())
+
+    def test_falls_back_inside_transaction(self):
+        with override_settings(ERPSIM_ANALYTICS_BACKEND='duckdb'), transaction.atomic():
+            self.assertEqual(analytics_backend(), 'django')
+
+
+class BenchmarkHarnessTests(AnalyticsTestCase):
+    def test_synthetic_exports_match_real_files(self):
+        datasets = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'datasets')
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = write_exports(tmp, days=5, materials=4, areas=2, teams=2)
+            for export_type, path in paths.items():
+                self.assertEqual(detect_export_type(path), export_type)
+                self.assertEqual(read_header(path), read_header(os.path.join(datasets, f'EXPORT_20250605{export_type}.xlsx')))
+            use_calendar(days=5)
+            rows = load_exports(paths)
+        # 4 轮 x 1 个报告日 x 4 个物料 x 2 个区域，全部落在合成日历的轮次内
+        self.assertEqual(rows['MAR'], 32)
+        self.assertFalse(MarketSalesData.objects.filter(round__isnull=True).exists())
+        self.assertEqual(GroupSalesData.objects.count(), rows['DETAIL'])
+        self.assertEqual(InventoryData.objects.count(), 2 * 3 * 4)
+        self.assertEqual(set(GroupSalesData.objects.values_list('material', flat=True)), {
+            f'{team}-F{i:03d}' for team in ('AA', 'AB') for i in range(1, 5)
+        })
+        with self.assertRaises(ValueError):
+            write_exports(tmp, days=30)
+
+    def test_profile_counts_queries_through_test_client(self):
+        create_market_rows(['1kg Nut Muesli', '500g Nut Muesli'])
+        client = admin_client()
+        stats = profile(client.get, reverse('erpsim:market_rounds'), repeat=1)
+        self.assertGreater(stats['queries'], 0)
+        self.assertEqual(set(stats), {'seconds', 'queries', 'peak_mb'})
+
+    def test_percentile(self):
+        self.assertEqual(percentile([0.2], 95), 0.2)
+        self.assertAlmostEqual(percentile([i / 100 for i in range(101)], 50), 0.5)
+        self.assertAlmostEqual(percentile([i / 100 for i in range(101)], 95), 0.95)
+
+    def test_compare_reports(self):
+        baseline = {'commit': 'abc', 'results': {'suite': {
+            'a_seconds': 1.0, 'b_seconds': 0.001, 'c_queries': 3, 'd_rows_per_second': 1000, 'e_p95_ms': 100,
+        }}}
+        report = {'results': {'suite': {
+            'a_seconds': 1.5, 'b_seconds': 0.004, 'c_queries': 4, 'd_rows_per_second': 10, 'e_p95_ms': 110,
+        }, 'load': {'f_p95_ms': 1}}}
+        # 小于噪声下限的耗时增幅、吞吐量下降与基准中没有的指标不计入
+        self.assertEqual(compare_reports(baseline, report), [
+            ('suite', 'a_seconds', 1.0, 1.5), ('suite', 'c_queries', 3, 4),
+        ])
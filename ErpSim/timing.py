@@ -0,0 +1,112 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# 请求级性能计时：中间件为每个请求创建一个 RequestTimings，期间执行的 SQL 与 timed() 标记的区块都记到这里。
+# 不在请求中（管理命令、测试直接调用）时 timed() 什么也不做。
+
+_current = ContextVar('erpsim_timings', default=None)
+
+# 模板中 {% timing_panel %} 输出的占位符，响应渲染完成后由中间件替换为计时面板
+TIMING_PANEL_MARKER = '<!-- erpsim:timing-panel -->'
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        # 区块名 -> {seconds, queries, sql, desc}，同名区块多次执行时累加
+        self.sections = {}
+
+    def record_query(self, execute, sql, params, many, context):
+        """connection.execute_wrapper 的回调，统计查询次数与耗时"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - start
+            self.queries += 1
+
+    def section(self, name):
+        return self.sections.setdefault(name, {'seconds': 0.0, 'queries': 0, 'sql': 0.0, 'desc': ''})
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def rows(self):
+        """按耗时降序的区块列表，另附 SQL 与总计两行，供面板展示"""
+        rows = [dict(section, name=name) for name, section in self.sections.items()]
+        rows.sort(key=lambda r: r['seconds'], reverse=True)
+        rows.append({'name': 'sql', 'seconds': self.sql, 'queries': self.queries, 'sql': self.sql, 'desc': ''})
+        rows.append({'name': 'total', 'seconds': self.total(), 'queries': self.queries, 'sql': self.sql, 'desc': ''})
+        for row in rows:
+            row['ms'], row['sql_ms'] = round(row['seconds'] * 1000, 1), round(row['sql'] * 1000, 1)
+        return rows
+
+    def server_timing(self):
+        """Server-Timing 响应头，dur 单位为毫秒"""
+        metrics = []
+        for row in self.rows():
+            desc = f"{row['queries']} queries" if row['name'] in ('sql', 'total') else row['desc']
+            metric = f"{row['name']};dur={row['ms']}"
+            if desc:
+                metric += f';desc="{desc}"'
+            metrics.append(metric)
+        return ', '.join(metrics)
+
+
+def current_timings():
+    return _current.get()
+
+
+def record_current_query(execute, sql, params, many, context):
+    """
+    装在每个数据库连接上的 execute_wrapper：当前上下文正在收集计时时记录查询。
+
+    计时对象存放在 ContextVar 中，sync_to_async 与看板线程池都会把上下文带到执行查询的线程，
+    因此异步视图、工作线程中的查询也计入所在请求。
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.record_query(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs):
+    """connection_created 信号的接收函数；放在最前面，connection.execute_wrapper() 退出时弹出的仍是它自己的包装"""
+    if record_current_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_current_query)
+
+
+@contextmanager
+def collect_timings():
+    """在 with 块内收集计时，供中间件与测试使用"""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """
+    记录一个区块的耗时及其间执行的查询数与 SQL 耗时。
+
+    yield 出区块的记录（不在请求中时为 None），调用方可以写入 desc（如缓存命中情况）。
+    """
+    timings = _current.get()
+    if timings is None:
+        yield None
+        return
+    section = timings.section(name)
+    start, queries, sql = time.perf_counter(), timings.queries, timings.sql
+    try:
+        yield section
+    finally:
+        section['seconds'] += time.perf_counter() - start
+        section['queries'] += timings.queries - queries
+        section['sql'] += timings.sql - sql
+
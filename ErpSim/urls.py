@@ -0,0 +1,13 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'erpsim'
+
+urlpatterns = [
+    path('market-rounds/', views.market_rounds, name='market_rounds'),
+    path('market-dashboard/', views.market_dashboard, name='market_dashboard'),
+    path('group-chart/<int:round_num>/<str:material>/', views.group_chart, name='group_chart'),
+    path('export/<str:dataset>/', views.export, name='export'),
+    path('live/', views.live, name='live'),
+]
@@ -1,10 +1,197 @@
-from django.shortcuts import render, redirect
-from django.contrib.auth.decorators import login_required
-from django import forms
-import pandas as pd
-from .models import MarketSalesData, GroupSalesData
-import datetime
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition, require_GET
 
+from .analytics.cache import cached_section, get_data_version
+from .analytics.games import active_game_id, viewing_game
+from .analytics.group_chart import group_charts
+from .analytics.live import live_update
+from .analytics.market import round_chart_data
+from .analytics.service import acompute_sections, market_sections
+from .exports import CONTENT_TYPES, DATASETS, async_chunks, stream_export
+from .timing import timed
 
+# 看板图表的 JSON 接口：页面只渲染骨架，选中的数据由前端按需请求。
+# ETag/Last-Modified 由数据版本号（ETag 还带上所查看的比赛）生成，数据未变时直接返回 304，不再计算也不再传输。
+
+
+def data_etag(request, *args, **kwargs):
+    key = ':'.join([request.path, str(get_data_version()), str(active_game_id())])
+    return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+
+def data_last_modified(request, *args, **kwargs):
+    # 版本号是更新时的纳秒时间戳
+    return datetime.fromtimestamp(get_data_version() / 1e9, tz=timezone.utc)
+
+
+def chart_api(view):
+    """接口通用装饰：仅后台用户可访问、GET、条件请求（304）、gzip 压缩，浏览器每次使用前先验证"""
+    view = condition(etag_func=data_etag, last_modified_func=data_last_modified)(view)
+    view = cache_control(private=True, no_cache=True)(view)
+    view = gzip_page(view)
+    return staff_member_required(require_GET(view))
+
+
+def serialize(data):
+    with timed('json'):
+        return json.dumps(data, ensure_ascii=False)
+
+
+@chart_api
+def market_rounds(request):
+    """各轮次市场偏好数据 {轮次: [{name, qty}, ...]}"""
+    payload = cached_section('market_rounds', lambda: serialize(round_chart_data()))
+    return HttpResponse(payload, content_type='application/json')
+
+
+@chart_api
+def group_chart(request, round_num, material):
+    """某一轮某个产品的小组价格与市场最高/最低价序列 {x, market_max, market_min, group_price}"""
+    chart_1kg, chart_500g, _, _ = cached_section('group_chart_series', group_charts)
+    for charts in (chart_1kg, chart_500g):
+        series = charts.get(round_num, {}).get(material)
+        if series is not None:
+            with timed('json'):
+                return JsonResponse(series, json_dumps_params={'ensure_ascii': False})
+    raise Http404("没有该轮次或产品的数据")
+
+
+@staff_member_required
+@require_GET
+def export(request, dataset):
+    """
+    流式下载原始数据或分析结果，?format=csv|parquet（未安装 pyarrow 时 parquet 退回 csv）。
+
+    ASGI 下返回异步迭代器，否则 Django 会先把整个导出读进内存；WSGI 下直接返回同步迭代器。
+    """
+    if dataset not in DATASETS:
+        raise Http404("没有该数据集")
+    try:
+        fmt, chunks = stream_export(dataset, request.GET.get('format', 'csv'))
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    if isinstance(request, ASGIRequest):
+        chunks = async_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{fmt}"'
+    return response
+
+
+@staff_member_required
+@require_GET
+@cache_control(private=True, no_cache=True)
+async def market_dashboard(request):
+    """市场看板全部区块 {products, profit, regions: {areas, rows}, forecast, rounds}，各区块在线程池中并发计算"""
+    sections = await acompute_sections(market_sections(rounds=True))
+    areas, rows = sections['market_region_allocation']
+    data = {
+        'products': sections['market_products'],
+        'profit': sections['market_profit'],
+        'regions': {'areas': areas, 'rows': rows},
+        'forecast': sections['market_forecast'],
+        'rounds': sections['market_round_chart'],
+    }
+    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+
+
+def sse_event(event, data, event_id=None):
+    lines = [f'event: {event}']
+    if event_id:
+        lines.append(f'id: {event_id}')
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False))
+    return '\n'.join(lines) + '\n\n'
+
+
+def live_step(version, game, cursor, viewing):
+    """
+    数据版本号与 version 不同时返回 (新状态, update 事件)，否则返回 None。
+
+    事件流在请求处理结束后才迭代，所查看的比赛 viewing 由视图取出后显式传入。
+    """
+    current = get_data_version()
+    if current == version:
+        return None
+    with viewing_game(viewing):
+        update = live_update(game, cursor)
+    state = (current, update['game'], update['cursor'])
+    return state, sse_event('update', {'version': current, **update}, f'{current}|{state[1]}|{state[2] or ""}')
+
+
+async def live_events(version, game, cursor, viewing=None):
+    """
+    数据版本号变化后推送 update 事件（看板需要的变化部分），其余时间定期发送注释行保持连接。
+
+    每次连接最长 ERPSIM_LIVE_STREAM_SECONDS 秒，之后由浏览器带着 Last-Event-ID 自动重连，避免长期占用连接。
+    """
+    loop = asyncio.get_running_loop()
+    interval = getattr(settings, 'ERPSIM_LIVE_POLL_INTERVAL', 0.25)
+    deadline = loop.time() + getattr(settings, 'ERPSIM_LIVE_STREAM_SECONDS', 300)
+    last_sent = loop.time()
+    yield 'retry: 1000\n\n'
+    while loop.time() < deadline:
+        step = await sync_to_async(live_step)(version, game, cursor, viewing)
+        if step is not None:
+            (version, game, cursor), event = step
+            yield event
+            last_sent = loop.time()
+        elif loop.time() - last_sent >= 15:
+            yield ': keep-alive\n\n'
+            last_sent = loop.time()
+        await asyncio.sleep(interval)
+
+
+def live_events_sync(version, game, cursor, viewing=None):
+    """WSGI 下的 live_events()：同步生成器，连接期间占用一个工作线程"""
+    interval = getattr(settings, 'ERPSIM_LIVE_POLL_INTERVAL', 0.25)
+    deadline = time.monotonic() + getattr(settings, 'ERPSIM_LIVE_STREAM_SECONDS', 300)
+    last_sent = time.monotonic()
+    yield 'retry: 1000\n\n'
+    while time.monotonic() < deadline:
+        step = live_step(version, game, cursor, viewing)
+        if step is not None:
+            (version, game, cursor), event = step
+            yield event
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= 15:
+            yield ': keep-alive\n\n'
+            last_sent = time.monotonic()
+        time.sleep(interval)
+
+
+@staff_member_required
+@require_GET
+async def live(request):
+    """
+    看板实时刷新（Server-Sent Events）：?version=&game=&cursor= 为页面渲染时的状态，重连时改用 Last-Event-ID。
+
+    ASGI 下（见 ERP/asgi.py）返回异步生成器；WSGI 下会把异步生成器整个收集后才发送，因此改用同步生成器，
+    每个连接占用一个工作线程。
+    """
+    last_event = request.headers.get('Last-Event-ID', '')
+    if last_event.count('|') == 2:
+        version, game, cursor = last_event.split('|')
+    else:
+        version, game, cursor = (request.GET.get(name, '') for name in ('version', 'game', 'cursor'))
+    try:
+        version, game = int(version), int(game) if game else None
+    except ValueError:
+        return HttpResponseBadRequest("version 参数无效")
+    events = live_events if isinstance(request, ASGIRequest) else live_events_sync
+    viewing = await sync_to_async(active_game_id)()
+    response = StreamingHttpResponse(events(version, game, cursor or None, viewing), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # 禁止 nginx 等反向代理缓冲事件流
+    response['X-Accel-Buffering'] = 'no'
+    return response